@@ -0,0 +1,94 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from argparse import ArgumentParser
+from metadata_converter.generate import get_builtin_template
+from metadata_converter.lazy_values import load_lazy_values
+from metadata_converter.loaders import load_values
+import os
+import tempfile
+import time
+import tracemalloc
+
+#
+# Compares the time and memory it takes to load a placeholder values
+# file with a long 'content' list and render the DLF template using
+# it, loading the complete file or only the properties that the
+# template references.
+#
+# Usage: python benchmarks/bench_lazy.py [--entries N]
+#
+
+DESCRIPTOR = 'dax-data-set-descriptors/gmb.yaml'
+
+CONTENT_ENTRY = """  - pattern: data/part-{0:08d}.txt
+    description: Part {0} of the data set
+    records: {0}
+    size: 14.8M
+    type: file
+    format: IOB
+    mime_type: text/plain
+"""
+
+
+def large_descriptor(output_file, entries):
+    # the DAX descriptor, with entries files in its content list
+    with open(DESCRIPTOR, 'r') as input_file:
+        for line in input_file:
+            output_file.write(line)
+            if line.startswith('content:'):
+                for entry in range(entries):
+                    output_file.write(CONTENT_ENTRY.format(entry))
+
+
+def measure(function):
+    # (seconds, peak bytes allocated) of function()
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(
+                description='Benchmark lazy loading of large placeholder '
+                            'values files.')
+    parser.add_argument('--entries', type=int, default=20000,
+                        help='Number of content list entries. '
+                             'Default: 20000')
+    args = parser.parse_args()
+
+    template = get_builtin_template('dlf')
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'large.yaml')
+        with open(file_name, 'w') as output_file:
+            large_descriptor(output_file, args.entries)
+        print('descriptor: {:.1f}MB, {} content entries'
+              .format(os.path.getsize(file_name) / 1024 / 1024,
+                      args.entries))
+        loaders = [
+            ('complete', lambda: template.render(load_values(file_name))),
+            ('lazy', lambda: template.render(
+                        load_lazy_values(file_name, [template])))
+        ]
+        print('{:<12} {:>12} {:>14}'.format('loading', 'time', 'peak memory'))
+        for name, function in loaders:
+            seconds, peak = measure(function)
+            print('{:<12} {:>10.1f}ms {:>12.1f}KB'
+                  .format(name, seconds * 1000, peak / 1024))
@@ -0,0 +1,80 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from argparse import ArgumentParser
+from metadata_converter.loaders import template_yaml
+from metadata_converter.loaders import values_yaml
+import glob
+import io
+import json
+import timeit
+
+#
+# Compares the time it takes to load placeholder values documents
+# using the round-trip loader, the (C-accelerated) safe loader
+# and the json module.
+#
+# Usage: python benchmarks/bench_loaders.py [-n NUMBER] [descriptors ...]
+#
+
+
+def benchmark(descriptor, number):
+
+    with open(descriptor, 'r') as f:
+        text = f.read()
+    json_text = json.dumps(values_yaml.load(text), default=str)
+
+    loaders = [
+        ('round-trip', lambda: template_yaml.load(text)),
+        ('safe', lambda: values_yaml.load(text)),
+        ('json', lambda: json.load(io.StringIO(json_text)))
+    ]
+    return [(name, min(timeit.repeat(loader, number=number, repeat=3))
+             / number)
+            for name, loader in loaders]
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(
+                description='Benchmark placeholder values loaders.')
+    parser.add_argument('descriptors', nargs='*',
+                        default=sorted(
+                            glob.glob('dax-data-set-descriptors/*.yaml')),
+                        help='YAML files to load. Default: the '
+                             'DAX data set descriptors')
+    parser.add_argument('-n', '--number', type=int, default=50,
+                        help='Number of loads per measurement')
+    args = parser.parse_args()
+
+    print('safe loader: {}'.format(values_yaml.instance.Parser.__name__))
+    print('{:<50} {:>12} {:>12} {:>12} {:>8}'
+          .format('descriptor', 'round-trip', 'safe', 'json', 'speedup'))
+    totals = [0.0, 0.0, 0.0]
+    for descriptor in args.descriptors:
+        timings = benchmark(descriptor, args.number)
+        totals = [total + t for total, (_, t) in zip(totals, timings)]
+        print('{:<50} {:>10.3f}ms {:>10.3f}ms {:>10.3f}ms {:>7.1f}x'
+              .format(descriptor,
+                      timings[0][1] * 1000,
+                      timings[1][1] * 1000,
+                      timings[2][1] * 1000,
+                      timings[0][1] / timings[1][1]))
+    print('{:<50} {:>10.3f}ms {:>10.3f}ms {:>10.3f}ms {:>7.1f}x'
+          .format('total',
+                  totals[0] * 1000,
+                  totals[1] * 1000,
+                  totals[2] * 1000,
+                  totals[0] / totals[1]))
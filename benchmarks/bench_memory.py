@@ -0,0 +1,119 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from argparse import ArgumentParser
+from metadata_converter.annotations import parse_comment
+from metadata_converter.apply import get_metadata
+from metadata_converter.loaders import load_template
+from synthetic import template_text
+import io
+import timeit
+import tracemalloc
+
+#
+# Compares the memory used by the metadata (comment and annotations)
+# of all properties of a large template, stored as interned Metadata
+# records or as one dict per property (the representation that
+# get_metadata() used to return), and the time it takes to obtain it.
+#
+# Usage: python benchmarks/bench_memory.py [--depth D] [--width W]
+#                                          [--list-length L]
+#
+
+
+def template_properties(template_dict):
+    # (dict, key) of every dict property of the template
+    properties = []
+    stack = [template_dict]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key, value in node.items():
+                properties.append((node, key))
+                stack.append(value)
+        elif isinstance(node, list):
+            stack.extend(node)
+    return properties
+
+
+def records(properties):
+    return [get_metadata(node, key) for node, key in properties]
+
+
+def dicts(properties):
+    # one dict and annotations set per property, parsed for each
+    # property, as get_metadata() did before metadata was interned
+    metadata = []
+    for node, key in properties:
+        record = get_metadata(node, key)
+        if record is not None:
+            record = parse_comment.__wrapped__(record.comment)
+            record = {
+                'comment': record.comment,
+                'comment_text': record.comment_text,
+                'annotations': set(record.annotations)
+            }
+        metadata.append(record)
+    return metadata
+
+
+def measure_memory(function, properties):
+    # bytes allocated by function(properties) and still in use
+    parse_comment.cache_clear()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function(properties)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(
+                description='Benchmark the memory used by template '
+                            'property metadata.')
+    parser.add_argument('--depth', type=int, default=3,
+                        help='Nesting depth of the synthetic template')
+    parser.add_argument('--width', type=int, default=20,
+                        help='Number of properties per dict')
+    parser.add_argument('--list-length', type=int, default=20,
+                        help='Number of items per list')
+    parser.add_argument('-n', '--number', type=int, default=10,
+                        help='Number of runs per time measurement')
+    args = parser.parse_args()
+
+    template_dict = load_template(io.StringIO(
+                        template_text(depth=args.depth,
+                                      width=args.width,
+                                      list_length=args.list_length,
+                                      density=1.0)))
+    properties = template_properties(template_dict)
+    print('template properties: {}, distinct records: {}'
+          .format(len(properties),
+                  len(set(id(record) for record in records(properties)))))
+    print('{:<20} {:>14} {:>14} {:>12}'
+          .format('representation', 'memory', 'per property', 'time'))
+    for name, function in [('dicts', dicts), ('interned records', records)]:
+        size = measure_memory(function, properties)
+        seconds = min(timeit.repeat(lambda: function(properties),
+                                    number=args.number,
+                                    repeat=3)) / args.number
+        print('{:<20} {:>12.1f}KB {:>13.1f}B {:>10.2f}ms'
+              .format(name,
+                      size / 1024,
+                      size / len(properties),
+                      seconds * 1000))
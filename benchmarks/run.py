@@ -0,0 +1,274 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from argparse import ArgumentParser
+from metadata_converter.apply import replace
+from metadata_converter.compiler import compile_template
+from metadata_converter.emit import render_to_stream
+from metadata_converter.generate import generate_dlf_yaml
+from metadata_converter.generate import generate_oah_yaml
+from metadata_converter.generate import generate_targets_yaml
+from metadata_converter.generate import get_builtin_template
+from metadata_converter.incremental import IncrementalRender
+from metadata_converter.index import build_index
+from metadata_converter.loaders import load_template
+from metadata_converter.loaders import load_values
+from metadata_converter.render_cache import RenderCache
+from metadata_converter.validate import Validator
+from ruamel.yaml import YAML
+from synthetic import CASES
+from synthetic import nested_template
+from synthetic import nested_values
+from synthetic import NESTED_CASES
+from synthetic import template_text
+from synthetic import values_text
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+
+#
+# Conversion throughput benchmarks. Load, replace and dump are measured
+# separately on synthetic templates (see synthetic.py); generate_* and
+# the apply.py command line are measured on a DAX data set descriptor.
+# Very deep and very wide templates are created as dicts, and only
+# their processing is measured.
+#
+# Usage: python benchmarks/run.py [-o results.json] [--compare old.json]
+#
+
+dumper = YAML()
+dumper.indent(mapping=2, sequence=4, offset=2)
+
+DESCRIPTOR = 'dax-data-set-descriptors/gmb.yaml'
+TEMPLATE = 'templates/dlf_out.yaml'
+
+
+def measure(function, repeat):
+    # determine the number of calls that takes at least 0.2 seconds
+    # (like the timeit command line) and report seconds per call
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'number': number,
+        'min': min(times),
+        'mean': sum(times) / len(times)
+    }
+
+
+def synthetic_benchmarks(case, params, repeat):
+
+    t_text = template_text(**params)
+    v_text = values_text(params['depth'], params['width'], padding=100)
+    template_yamls = load_template(io.StringIO(t_text))
+    in_yamls = load_values(io.StringIO(v_text))
+    compiled = compile_template(template_yamls)
+    out_yamls = replace(in_yamls, template_yamls)
+    index = build_index(in_yamls)
+    incremental = IncrementalRender(compiled, in_yamls)
+    # a value that is referenced by the template
+    leaf = '.'.join(['values'] +
+                    ['level_{}'.format(level)
+                     for level in range(params['depth'])] +
+                    ['leaf_0'])
+
+    benchmarks = [
+        ('load_template', lambda: load_template(io.StringIO(t_text))),
+        ('load_values', lambda: load_values(io.StringIO(v_text))),
+        ('load_values_round_trip',
+         lambda: load_values(io.StringIO(v_text), fast=False)),
+        ('compile', lambda: compile_template(template_yamls)),
+        ('replace', lambda: replace(in_yamls, template_yamls)),
+        ('render', lambda: compiled.render(in_yamls)),
+        ('build_index', lambda: build_index(in_yamls)),
+        ('replace_indexed',
+         lambda: replace(in_yamls, template_yamls, index=index)),
+        ('render_indexed', lambda: compiled.render(in_yamls, index=index)),
+        ('incremental_update', lambda: incremental.update(in_yamls, [leaf])),
+        ('dump', lambda: dumper.dump(out_yamls, io.StringIO())),
+        ('emit_yaml',
+         lambda: render_to_stream(compiled, in_yamls, io.StringIO())),
+        ('emit_json',
+         lambda: render_to_stream(compiled, in_yamls, io.StringIO(),
+                                  format='json')),
+    ]
+    for name, function in benchmarks:
+        result = measure(function, repeat)
+        result.update({'name': name, 'case': case, 'params': params})
+        yield result
+
+
+def nested_benchmarks(case, params, repeat):
+
+    template_dict = nested_template(**params)
+    in_yamls = nested_values(params['width'])
+    compiled = compile_template(template_dict)
+
+    benchmarks = [
+        ('compile', lambda: compile_template(template_dict)),
+        ('replace', lambda: replace(in_yamls, template_dict)),
+        ('render', lambda: compiled.render(in_yamls)),
+    ]
+    for name, function in benchmarks:
+        result = measure(function, repeat)
+        result.update({'name': name, 'case': case, 'params': params})
+        yield result
+
+
+def generate_benchmarks(repeat):
+
+    in_yamls = load_values(DESCRIPTOR)
+    validator = Validator({'dlf': get_builtin_template('dlf'),
+                           'oah': get_builtin_template('oah')})
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = RenderCache(tmp_dir)
+        benchmarks = [
+            ('generate_dlf_yaml', lambda: generate_dlf_yaml(in_yamls)),
+            ('generate_oah_yaml', lambda: generate_oah_yaml(in_yamls)),
+            # both templates, resolving shared placeholders once
+            ('generate_targets_yaml',
+             lambda: generate_targets_yaml(in_yamls)),
+            # check the descriptor against both templates
+            ('validate', lambda: validator.check(in_yamls)),
+            # repeat conversions are answered from the render cache
+            ('generate_dlf_yaml_cached',
+             lambda: generate_dlf_yaml(in_yamls, cache=cache)),
+            ('generate_oah_yaml_cached',
+             lambda: generate_oah_yaml(in_yamls, cache=cache)),
+        ]
+        for name, function in benchmarks:
+            result = measure(function, repeat)
+            result.update({'name': name,
+                           'case': 'dax',
+                           'params': {'descriptor': DESCRIPTOR}})
+            yield result
+
+
+def cli_benchmarks(repeat):
+
+    apply_py = os.path.join('metadata_converter', 'apply.py')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, 'out.yaml')
+        commands = [
+            ('cli_single',
+             [sys.executable, apply_py, DESCRIPTOR, TEMPLATE, '-o', output]),
+            ('cli_batch',
+             [sys.executable, apply_py, 'dax-data-set-descriptors',
+              TEMPLATE, '-d', tmp_dir]),
+        ]
+        for name, command in commands:
+            # process start-up dominates; a few runs are sufficient
+            times = timeit.repeat(lambda: subprocess.run(command,
+                                                         check=True,
+                                                         stdout=subprocess
+                                                         .DEVNULL),
+                                  repeat=repeat, number=1)
+            yield {'name': name,
+                   'case': 'dax',
+                   'params': {'command': ' '.join(command[1:])},
+                   'number': 1,
+                   'min': min(times),
+                   'mean': sum(times) / len(times)}
+
+
+def compare(results, baseline, threshold):
+    # Print the change relative to baseline; return the number of
+    # benchmarks that are slower than threshold * baseline
+    previous = {(r['name'], r['case']): r for r in baseline['results']}
+    regressions = 0
+    for result in results:
+        old = previous.get((result['name'], result['case']))
+        if old is None:
+            continue
+        ratio = result['min'] / old['min']
+        flag = ''
+        if ratio > threshold:
+            flag = '  REGRESSION'
+            regressions = regressions + 1
+        print('{:<24} {:<12} {:>8.2f}x{}'
+              .format(result['name'], result['case'], ratio, flag))
+    return regressions
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(
+                description='Run the conversion benchmarks.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Save results to this JSON file')
+    parser.add_argument('-c', '--cases', nargs='*',
+                        choices=sorted(CASES.keys()) +
+                        sorted(NESTED_CASES.keys()),
+                        default=sorted(CASES.keys()) +
+                        sorted(NESTED_CASES.keys()),
+                        help='Synthetic cases to run. Default: all')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Number of measurements per benchmark')
+    parser.add_argument('--no-cli', action='store_true',
+                        help='Skip the command line benchmarks')
+    parser.add_argument('--compare', default=None,
+                        help='Compare results with a previously saved '
+                             'JSON file')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Report a regression if a benchmark is '
+                             'slower than threshold * baseline. '
+                             'Default: 1.2')
+    args = parser.parse_args()
+
+    results = []
+    for case in args.cases:
+        if case in NESTED_CASES:
+            results.extend(nested_benchmarks(case,
+                                             NESTED_CASES[case],
+                                             args.repeat))
+        else:
+            results.extend(synthetic_benchmarks(case,
+                                                CASES[case],
+                                                args.repeat))
+    results.extend(generate_benchmarks(args.repeat))
+    if not args.no_cli:
+        results.extend(cli_benchmarks(args.repeat))
+
+    print('{:<24} {:<12} {:>14} {:>14}'
+          .format('benchmark', 'case', 'min', 'mean'))
+    for result in results:
+        print('{:<24} {:<12} {:>12.2f}us {:>12.2f}us'
+              .format(result['name'], result['case'],
+                      result['min'] * 1e6, result['mean'] * 1e6))
+
+    report = {
+        'metadata': {
+            'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+        },
+        'results': results
+    }
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(results, baseline, args.threshold) > 0:
+            sys.exit(1)
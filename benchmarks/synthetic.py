@@ -0,0 +1,155 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+# Generates synthetic templates and placeholder values documents
+# (as YAML text) for benchmarking. Their size is controlled by
+#  - depth: nesting level of template dicts and of placeholder paths
+#  - width: number of properties per dict
+#  - list_length: number of items in the list each template dict contains
+#  - density: fraction (0..1) of template strings that are placeholders
+#
+# Every fourth placeholder is annotated with @optional.
+#
+# nested_template() and nested_values() create documents as dicts
+# instead, because the YAML parser cannot load very deeply nested
+# documents.
+#
+
+
+def is_placeholder(index, density):
+    # spreads placeholders evenly across the template strings
+    return int((index + 1) * density) > int(index * density)
+
+
+def placeholder(index, depth, width):
+    path = ['values'] + ['level_{}'.format(level) for level in range(depth)]
+    path.append('leaf_{}'.format(index % width))
+    return '{{' + '.'.join(path) + '}}'
+
+
+def template_text(depth, width, list_length, density):
+    """
+    Return the YAML text of a synthetic template.
+    """
+
+    lines = []
+    counter = [0, 0]
+
+    def string(indent, prefix):
+        index = counter[0]
+        counter[0] = counter[0] + 1
+        if not is_placeholder(index, density):
+            lines.append('{}{}constant value {}'
+                         .format(' ' * indent, prefix, index))
+            return
+        line = '{}{}\'{}\''.format(' ' * indent,
+                                   prefix,
+                                   placeholder(counter[1], depth, width))
+        if counter[1] % 4 == 3:
+            line = line + '  # @optional'
+        counter[1] = counter[1] + 1
+        lines.append(line)
+
+    def mapping(level, indent):
+        for w in range(width):
+            key = 'key_{}_{}'.format(level, w)
+            if level < depth - 1:
+                lines.append('{}{}:'.format(' ' * indent, key))
+                mapping(level + 1, indent + 2)
+            else:
+                string(indent, '{}: '.format(key))
+        if list_length > 0:
+            lines.append('{}list_{}:'.format(' ' * indent, level))
+            for i in range(list_length):
+                string(indent + 2, '- ')
+
+    mapping(0, 0)
+    return '\n'.join(lines) + '\n'
+
+
+def values_text(depth, width, padding=0):
+    """
+    Return the YAML text of a placeholder values document that
+    defines every placeholder of the matching synthetic template.
+    padding adds unreferenced properties.
+    """
+
+    lines = ['values:']
+    indent = 2
+    for level in range(depth):
+        lines.append('{}level_{}:'.format(' ' * indent, level))
+        indent = indent + 2
+    for w in range(width):
+        lines.append('{}leaf_{}: value {}'.format(' ' * indent, w, w))
+    for p in range(padding):
+        lines.append('unused_{}:'.format(p))
+        lines.append('  name: unused property {}'.format(p))
+        lines.append('  items: [1, 2, 3]')
+    return '\n'.join(lines) + '\n'
+
+
+def nested_template(depth, width, density):
+    """
+    Return a synthetic template as a dict. Each of the depth nested
+    dicts has width string properties and, except for the innermost
+    one, a 'nested' property. Placeholders reference the properties
+    of nested_values(width).
+    """
+
+    root = {}
+    container = root
+    index = 0
+    for level in range(depth):
+        for w in range(width):
+            key = 'key_{}_{}'.format(level, w)
+            if is_placeholder(index, density):
+                container[key] = '{{{{values.leaf_{}}}}}'.format(w)
+            else:
+                container[key] = 'constant value {}'.format(index)
+            index = index + 1
+        if level < depth - 1:
+            container['nested'] = {}
+            container = container['nested']
+    return root
+
+
+def nested_values(width):
+    """
+    Return a placeholder values document (as a dict) that defines
+    every placeholder of nested_template(depth, width, density).
+    """
+
+    return {'values': {'leaf_{}'.format(w): 'value {}'.format(w)
+                       for w in range(width)}}
+
+
+# Benchmark cases; each one scales a different dimension
+CASES = {
+    'small': dict(depth=2, width=4, list_length=2, density=0.5),
+    'deep': dict(depth=10, width=2, list_length=0, density=0.5),
+    'wide': dict(depth=1, width=1000, list_length=0, density=0.5),
+    'long_lists': dict(depth=2, width=4, list_length=250, density=0.5),
+    'sparse': dict(depth=3, width=10, list_length=10, density=0.05),
+    'dense': dict(depth=3, width=10, list_length=10, density=1.0),
+}
+
+# Benchmark cases for nested_template(), which scale nesting depth
+# and dict width beyond what YAML templates are practically limited to
+NESTED_CASES = {
+    'very_deep': dict(depth=5000, width=2, density=0.5),
+    'very_wide': dict(depth=1, width=100000, density=0.5),
+}
@@ -0,0 +1,206 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.compiler import CompiledTemplate
+from metadata_converter import generate
+import asyncio
+import functools
+
+#
+# asyncio API for services. Template loading (file I/O and parsing),
+# rendering and YAML output block, and are therefore run in an
+# executor, so that the event loop remains responsive while
+# conversions are in progress.
+#
+
+
+# asyncio.get_running_loop() was added in Python 3.7; in 3.6,
+# get_event_loop() returns the running loop when called in a coroutine
+get_running_loop = getattr(asyncio, 'get_running_loop',
+                           asyncio.get_event_loop)
+
+
+def render_template(template, values, index=None):
+    # Executor entry point of AsyncConverter.render()
+    if not isinstance(template, CompiledTemplate):
+        template = generate.load_compiled_template(template)
+    return template.render(values, index=index)
+
+
+class AsyncConverter(object):
+    """
+    Runs conversions in an executor, optionally limiting the number
+    of conversions that are in progress at the same time. Conversions
+    that exceed the limit wait (without blocking the event loop) until
+    another one completes.
+
+    Semaphores are bound to an event loop; use one instance per loop
+    if max_concurrency is set.
+    """
+
+    def __init__(self, executor=None, max_concurrency=None):
+        """
+        :param executor: executor that runs conversions. Default:
+        the default executor of the event loop (a thread pool).
+        With a ProcessPoolExecutor, values and templates must be
+        picklable
+        :type executor: concurrent.futures.Executor
+        :param max_concurrency: maximum number of conversions that run
+        at the same time. Default: no limit
+        :type max_concurrency: int
+        :raises ValueError: max_concurrency is less than 1
+        """
+
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError('Parameter \'max_concurrency\' must be at '
+                             'least 1 not {}.'.format(max_concurrency))
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        # created on first use, in the running event loop
+        self.semaphore = None
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Run function(*args, **kwargs) in the executor.
+
+        :return: the result of function
+        """
+
+        loop = get_running_loop()
+        call = functools.partial(function, *args, **kwargs)
+        if self.max_concurrency is None:
+            return await loop.run_in_executor(self.executor, call)
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self.semaphore:
+            return await loop.run_in_executor(self.executor, call)
+
+    async def load_compiled_template(self, template_path):
+        """
+        Load and compile a user-supplied template, see
+        metadata_converter.generate.load_compiled_template.
+
+        :param template_path: template file location
+        :type template_path: str or pathlib.Path
+        :raises FileNotFoundError: the template file does not exist
+        :return: compiled template
+        :rtype: CompiledTemplate
+        """
+
+        return await self.run(generate.load_compiled_template, template_path)
+
+    async def render(self, template, values, index=None):
+        """
+        Replace {{...}} placeholders in template with values.
+
+        :param template: compiled template, or location of a template
+        file, which is loaded and cached like load_compiled_template() does
+        :type template: CompiledTemplate or str or pathlib.Path
+        :param values: dict representation of a YAML document defining
+        placeholder values
+        :type values: dict
+        :param index: optional flat index of values, created by
+        metadata_converter.index.build_index(values)
+        :type index: dict
+        :raises PlaceholderNotFoundError: a {{...}} placeholder in the
+        template was not found in values
+        :raises ValueError: values is not of type dict
+        :return: the template with all '{{...}}' replaced
+        :rtype: dict
+        """
+
+        return await self.run(render_template, template, values, index)
+
+    async def generate_dlf_yaml(self, in_yaml):
+        """
+        Asynchronous variant of generate.generate_dlf_yaml.
+
+        :rtype: str
+        """
+
+        return await self.run(generate.generate_dlf_yaml, in_yaml)
+
+    async def generate_dlf_yaml_dict(self, in_yaml):
+        """
+        Asynchronous variant of generate.generate_dlf_yaml_dict.
+
+        :rtype: dict
+        """
+
+        return await self.run(generate.generate_dlf_yaml_dict, in_yaml)
+
+    async def generate_oah_yaml(self, in_yaml):
+        """
+        Asynchronous variant of generate.generate_oah_yaml.
+
+        :rtype: str
+        """
+
+        return await self.run(generate.generate_oah_yaml, in_yaml)
+
+    async def generate_oah_yaml_dict(self, in_yaml):
+        """
+        Asynchronous variant of generate.generate_oah_yaml_dict.
+
+        :rtype: dict
+        """
+
+        return await self.run(generate.generate_oah_yaml_dict, in_yaml)
+
+
+# Converter used by the module-level functions; it runs conversions
+# in the default executor of the event loop, without a limit
+default_converter = AsyncConverter()
+
+
+async def render(template, values, index=None):
+    """
+    Replace {{...}} placeholders in template with values, see
+    AsyncConverter.render.
+    """
+
+    return await default_converter.render(template, values, index=index)
+
+
+async def generate_dlf_yaml(in_yaml):
+    """
+    Asynchronous variant of generate.generate_dlf_yaml.
+    """
+
+    return await default_converter.generate_dlf_yaml(in_yaml)
+
+
+async def generate_dlf_yaml_dict(in_yaml):
+    """
+    Asynchronous variant of generate.generate_dlf_yaml_dict.
+    """
+
+    return await default_converter.generate_dlf_yaml_dict(in_yaml)
+
+
+async def generate_oah_yaml(in_yaml):
+    """
+    Asynchronous variant of generate.generate_oah_yaml.
+    """
+
+    return await default_converter.generate_oah_yaml(in_yaml)
+
+
+async def generate_oah_yaml_dict(in_yaml):
+    """
+    Asynchronous variant of generate.generate_oah_yaml_dict.
+    """
+
+    return await default_converter.generate_oah_yaml_dict(in_yaml)
@@ -0,0 +1,126 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import functools
+import re
+
+#
+# Template property metadata, which is extracted from the comment of a
+# template property, e.g. "# @optional another comment". Metadata is
+# immutable and depends only on the comment text, so one record is
+# created per distinct comment and shared by all template properties
+# (of all templates) that have this comment.
+#
+
+# Flags of known annotations
+FLAG_OPTIONAL = 1
+
+ANNOTATION_FLAGS = {
+    'optional': FLAG_OPTIONAL
+}
+
+# Maximum number of distinct comments whose metadata is retained
+MAX_INTERNED_COMMENTS = 4096
+
+annotation_pattern = re.compile('@([a-zA-Z]+)', re.I)
+
+
+class Metadata(object):
+    """
+    Immutable metadata of a template property. For compatibility with
+    the dict that get_metadata() returned in previous versions, the
+    attributes can also be read as items, e.g. metadata['annotations'].
+    """
+
+    __slots__ = ('comment', 'comment_text', 'annotations', 'flags')
+
+    def __init__(self, comment, comment_text, annotations):
+        """
+        :param comment: raw comment, e.g. "# @optional another comment\\n"
+        :type comment: str
+        :param comment_text: comment without annotations, comment
+        characters and surrounding whitespace, e.g. "another comment"
+        :type comment_text: str
+        :param annotations: lower case annotation names, e.g. {'optional'}
+        :type annotations: frozenset
+        """
+
+        flags = 0
+        for annotation in annotations:
+            flags = flags | ANNOTATION_FLAGS.get(annotation, 0)
+        object.__setattr__(self, 'comment', comment)
+        object.__setattr__(self, 'comment_text', comment_text)
+        object.__setattr__(self, 'annotations', annotations)
+        object.__setattr__(self, 'flags', flags)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Metadata is immutable.')
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    @property
+    def optional(self):
+        return (self.flags & FLAG_OPTIONAL) != 0
+
+    def __repr__(self):
+        return 'Metadata(comment={!r}, comment_text={!r}, ' \
+               'annotations={!r})'.format(self.comment,
+                                          self.comment_text,
+                                          set(self.annotations))
+
+
+# Metadata of template properties without comment
+NO_COMMENT = Metadata(None, None, frozenset())
+
+
+@functools.lru_cache(maxsize=MAX_INTERNED_COMMENTS)
+def parse_comment(comment):
+    """
+    Return the metadata of a template property comment. Equal
+    comments yield the same (interned) record.
+
+    :param comment: raw comment, e.g. "# @optional another comment\\n",
+    or None
+    :type comment: str
+    :return: metadata
+    :rtype: Metadata
+    """
+
+    if comment is None:
+        return NO_COMMENT
+    # Extract @... annotations
+    annotations = set(match.group(1).lower()
+                      for match in annotation_pattern.finditer(comment))
+    # Remove noise from the comment, such as annotations
+    # comment characters and whitespace characters
+    #  - Remove annotations
+    comment_text = comment
+    for annotation in annotations:
+        comment_text = comment_text.replace('@{}'.format(annotation), '')
+    #  - Remove '#' and whitespaces from the beginning of each line
+    #    This needs to be done twice to handle empty comments properly.
+    comment_text = re.sub(r'^\s*#\s*', '', comment_text, flags=re.MULTILINE)
+    comment_text = re.sub(r'^\s*#\s*', '', comment_text, flags=re.MULTILINE)
+    #  - remove whitespace chars from the end of each line
+    comment_text = re.sub(r'\s*$', '', comment_text, flags=re.MULTILINE)
+    #  - remove newline from the end
+    comment_text = comment_text.strip()
+    if len(comment_text) == 0:
+        comment_text = None
+    return Metadata(comment, comment_text, frozenset(annotations))
@@ -13,15 +13,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from argparse import ArgumentParser
-from pathlib import Path
-from ruamel.yaml import YAML
-from ruamel.yaml.tokens import CommentToken
-from ruamel.yaml.comments import CommentedMap
+from functools import lru_cache
+from metadata_converter.annotations import FLAG_OPTIONAL
+from metadata_converter.annotations import parse_comment
+import json
 import re
 import sys
-
-yaml = YAML()
+import time
 
 
 # Raised if template contains a placeholder
@@ -33,7 +31,125 @@ class PlaceholderNotFoundError(Exception):
         super().__init__(self.message)
 
 
-def replace(yaml_dict, template_dict):
+# pre-compile the {{...}} placeholder search expression
+# once, at module level, to avoid doing it multiple times
+placeholder_pattern = re.compile(r'{{([\w\.]+)}}', re.VERBOSE)
+
+# maximum number of distinct template strings whose format is cached
+MAX_CACHED_FORMATS = 4096
+
+
+@lru_cache(maxsize=MAX_CACHED_FORMATS)
+def compile_format(text):
+    """Compile a template string that contains placeholders and other
+    text, e.g. 'https://cdn/{{id}}/{{version}}.tar.gz', into a format
+    string for str.format() ('https://cdn/{}/{}.tar.gz') and its
+    placeholders. Strings that consist of a single placeholder are not
+    formatted; their placeholder value replaces the string.
+
+    :param text: template string
+    :type text: str
+    :return: (format string, ((placeholder, pre-split path), ...))
+    :rtype: tuple
+    """
+
+    # literal text and placeholder names alternate
+    parts = placeholder_pattern.split(text)
+    literals = [part.replace('{', '{{').replace('}', '}}')
+                for part in parts[0::2]]
+    placeholders = tuple((placeholder, tuple(placeholder.split('.')))
+                         for placeholder in parts[1::2])
+    return '{}'.join(literals), placeholders
+
+
+def format_value(value):
+    """Return the text that represents a placeholder value within
+    a string: booleans are spelled as in YAML, lists and dicts are
+    represented as JSON.
+
+    :param value: placeholder value, not None
+    :rtype: str
+    """
+
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def interpolate(format_string, placeholders, values, index=None):
+    """Replace the placeholders of a format string created by
+    compile_format() with their values.
+
+    :param format_string: format string
+    :type format_string: str
+    :param placeholders: (placeholder, pre-split path) tuples
+    :type placeholders: tuple
+    :param values: dict representation of a YAML document defining
+    placeholder values
+    :type values: dict
+    :param index: optional flat index of values, which is used to
+    resolve placeholders
+    :type index: dict
+    :return: (completed string, placeholders that were not found);
+    the string is None unless all placeholders were found
+    :rtype: tuple
+    """
+
+    strings = []
+    missing = []
+    for placeholder, path in placeholders:
+        if index is None:
+            value = values
+            for property in path:
+                if not isinstance(value, dict):
+                    value = None
+                    break
+                value = value.get(property)
+        else:
+            value = index.get(placeholder)
+        if value is None:
+            missing.append(placeholder)
+        else:
+            strings.append(format_value(value))
+    if len(missing) > 0:
+        return None, missing
+    return format_string.format(*strings), missing
+
+
+def get_metadata(template_dict, key):
+    """Return the metadata of the template_dict property key
+
+    :param template_dict: template dict
+    :type template_dict: dict
+    :param key: property key
+    :return: metadata, which is shared by all properties with the same
+    comment, or None if template_dict is not an instance of
+    ruamel.yaml.comments.CommentedMap
+    :rtype: metadata_converter.annotations.Metadata
+    """
+
+    # ruamel.yaml is not imported by this module; if it was never
+    # imported, template_dict cannot be a CommentedMap
+    comments = sys.modules.get('ruamel.yaml.comments')
+    if comments is None or\
+       not isinstance(template_dict, comments.CommentedMap):
+        return None
+    from ruamel.yaml.tokens import CommentToken
+
+    # raw comment, e.g. "# @optional another comment\n"
+    comment = None
+    items = template_dict.ca.items.get(key)
+    if items is not None and len(items) > 2 and\
+       isinstance(items[2], CommentToken):
+        comment = items[2].value
+    return parse_comment(comment)
+
+
+def replace(yaml_dict, template_dict, stats=None, index=None, cache=None):
     """Replace matched {{...}} in template_dict with values from yaml_dict
 
     :param yaml_dict: dict representation of a YAML document defining
@@ -42,6 +158,18 @@ def replace(yaml_dict, template_dict):
     :param template_dict: dict representation of a YAML document containing
     '{{...}}' string placeholders
     :type template_dict: dict
+    :param stats: optional statistics, which are updated with the
+    time spent processing comments and resolving placeholders, and
+    with node and placeholder counts
+    :type stats: metadata_converter.stats.ConversionStats
+    :param index: optional flat index of yaml_dict, created by
+    metadata_converter.index.build_index(yaml_dict), which is used to
+    resolve placeholders
+    :type index: dict
+    :param cache: optional render cache; if the result of the same
+    template and values is cached, it is returned without processing
+    the template
+    :type cache: metadata_converter.render_cache.RenderCache
     :raises PlaceholderNotFoundError: a {{...}} placeholder in template_dict
     was not found in yaml_dict
     :raises ValueError: at least one input parameter is invalid
@@ -50,191 +178,342 @@ def replace(yaml_dict, template_dict):
     :rtype: dict
     """
 
-    def get_metadata(template_dict, key):
-        # If d is an instance of ruamel.yaml.comments.CommentedMap
-        # this method returns the metadata associated with the
-        # provided property key
-
-        if not isinstance(template_dict, CommentedMap):
-            return None
-
-        d = template_dict
-
-        metadata = {
-            'comment': None,
-            'comment_text': None,
-            'annotations': set()
-        }
-        # raw comment, e.g. "# @optional another comment\n"
-        if key in d.ca.items:
-            if (len(d.ca.items.get(key)) > 2) and \
-               isinstance(d.ca.items.get(key)[2], CommentToken):
-                metadata['comment'] = d.ca.items.get(key)[2].value
-        # comment text, e.g. "another comment"
-        metadata['comment_text'] = metadata['comment']
-        # extract embedded annotations, e.g. "@optional"
-        if metadata['comment'] is not None:
-            # Extract @... annotations
-            for match in re.finditer('@([a-zA-Z]+)',
-                                     metadata['comment'],
-                                     re.I):
-                metadata['annotations'].add(match.group(1).lower())
-            # Remove noise from the comment, such as annotations
-            # comment characters and whitespace characters
-            #  - Remove annotations
-            for annotation in metadata['annotations']:
-                metadata['comment_text'] =\
-                    metadata['comment_text'].replace('@{}'.format(annotation),
-                                                     '')
-            #  - Remove '#' and whitespaces from the beginning of each line
-            #    This needs to be done twice to handle empty comments properly.
-            metadata['comment_text'] = re.sub(r'^\s*#\s*',
-                                              '',
-                                              metadata['comment_text'],
-                                              flags=re.MULTILINE)
-            metadata['comment_text'] = re.sub(r'^\s*#\s*',
-                                              '',
-                                              metadata['comment_text'],
-                                              flags=re.MULTILINE)
-            #  - remove whitespace chars from the end of each line
-            metadata['comment_text'] = re.sub(r'\s*$',
-                                              '',
-                                              metadata['comment_text'],
-                                              flags=re.MULTILINE)
-
-            #  - remove newline from the end
-            metadata['comment_text'] = metadata['comment_text'].strip()
-
-            if len(metadata['comment_text']) == 0:
-                metadata['comment_text'] = None
-        return metadata
-
-    # pre-compile the {{...}} placeholder search expression
-    # outside `do_replace` to avoid doing it multiple times
-    p = re.compile(r'{{([\w\.]+)}}', re.VERBOSE)
-
-    def process_string(yaml_dict, str, metadata):
-        # determine whether {{...}} placeholder
-        # replacement is required
-        r = p.search(str)
-        if r is None:
-            return str
-        else:
-            root = yaml_dict
-            for property in r.group(1).split('.'):
-                root = root.get(property)
-                if root is None:
+    if cache is not None:
+        return cache.fetch(cache.key(template_dict, yaml_dict, 'replace'),
+                           replace, yaml_dict, template_dict,
+                           stats=stats, index=index)
+
+    if yaml_dict is None or template_dict is None:
+        # nothing to do
+        return None
+
+    if not isinstance(yaml_dict, dict):
+        raise ValueError('Parameter \'yaml_dict\' must be of type '
+                         '\'dict\' not {}.'.format(type(yaml_dict)))
+
+    if not isinstance(template_dict, dict):
+        raise ValueError('Parameter \'template_dict\' must be of type '
+                         '\'dict\' not {}.'.format(type(template_dict)))
+
+    template_out = {}
+    # explicit stack, see compile_template(); one entry per open
+    # template dict or list:
+    # (template container, iterator over its keys or items,
+    #  output container, metadata of the list property or None)
+    stack = [(template_dict, iter(template_dict.keys()), template_out, None)]
+    # ids of the open template containers; YAML aliases can make
+    # a container contain itself
+    open_containers = {id(template_dict)}
+    while stack:
+        container, items, container_out, list_metadata = stack[-1]
+        in_dict = isinstance(container_out, dict)
+        for item in items:
+            if stats is not None:
+                stats.nodes_visited += 1
+            if in_dict:
+                key = item
+                val = container[key]
+                if stats is None:
+                    metadata = get_metadata(container, key)
+                else:
+                    start = time.perf_counter()
+                    metadata = get_metadata(container, key)
+                    stats.add_time('metadata', time.perf_counter() - start)
+            else:
+                val = item
+                metadata = list_metadata
+
+            if val is None and in_dict:
+                # NoneType - no value
+                value = None
+            elif isinstance(val, str):
+                # determine whether {{...}} placeholder
+                # replacement is required
+                if stats is not None:
+                    start = time.perf_counter()
+                r = placeholder_pattern.search(val)
+                if r is None:
+                    value = val
+                else:
+                    if r.start() == 0 and r.end() == len(val):
+                        # the string is a single placeholder, whose
+                        # value (of any type) replaces the string
+                        if index is None:
+                            value = yaml_dict
+                            for property in r.group(1).split('.'):
+                                if not isinstance(value, dict):
+                                    value = None
+                                    break
+                                value = value.get(property)
+                        else:
+                            value = index.get(r.group(1))
+                        count = 1
+                        missing = [] if value is not None else [r.group(1)]
+                    else:
+                        # the placeholder values are substituted into
+                        # the string
+                        format_string, placeholders = compile_format(val)
+                        value, missing = interpolate(format_string,
+                                                     placeholders,
+                                                     yaml_dict,
+                                                     index)
+                        count = len(placeholders)
+                    if len(missing) == 0:
+                        if stats is not None:
+                            stats.placeholders_resolved += count
                     # check annotations to determine appropriate
                     # behavior
-                    if metadata is not None and\
-                       'optional' in metadata['annotations']:
-                        return None
+                    elif metadata is not None and\
+                            metadata.flags & FLAG_OPTIONAL:
+                        if stats is not None:
+                            stats.placeholders_resolved += \
+                                count - len(missing)
+                            stats.optional_dropped += len(missing)
                     else:
-                        raise PlaceholderNotFoundError(r.group(1))
-            return root
-
-    def process_list(yaml_dict, list_in, metadata):
-        list_out = []
-        for v in list_in:
-            # if v is a string process it
-            if(isinstance(v, str)):
-                list_out.append(process_string(yaml_dict, v, metadata))
-            elif(isinstance(v, dict)):
-                list_out.append(do_replace(yaml_dict, v))
-            elif(isinstance(v, list)):
-                list_out.append(process_list(yaml_dict, v, metadata))
+                        if stats is not None:
+                            stats.add_time('resolve',
+                                           time.perf_counter() - start)
+                        raise PlaceholderNotFoundError(missing[0])
+                if stats is not None:
+                    stats.add_time('resolve', time.perf_counter() - start)
+            elif isinstance(val, (dict, list)):
+                if id(val) in open_containers:
+                    raise ValueError('Parameter \'template_dict\' must not '
+                                     'contain itself.')
+                # process the dictionary or list items before
+                # continuing with the remaining items of container
+                if isinstance(val, dict):
+                    value = {}
+                    stack.append((val, iter(val.keys()), value, None))
+                else:
+                    value = []
+                    stack.append((val, iter(val), value, metadata))
+                open_containers.add(id(val))
+                if in_dict:
+                    container_out[key] = value
+                else:
+                    container_out.append(value)
+                break
+            elif in_dict:
+                raise NotImplementedError(
+                        'Support for properties of type {} is not implemented.'
+                        .format(type(val)))
             else:
                 raise NotImplementedError(
                         'Support for properties of type {} in lists '
                         'is not implemented.'
-                        .format(type(v)))
-        return list_out
-
-    # Recursive function does the actual work
-    def do_replace(yaml_dict, template_dict):
-
-        if yaml_dict is None or template_dict is None:
-            # nothing to do
-            return None
-
-        if not isinstance(yaml_dict, dict):
-            raise ValueError('Parameter \'yaml_dict\' must be of type '
-                             '\'dict\' not {}.'.format(type(yaml_dict)))
-
-        if not isinstance(template_dict, dict):
-            raise ValueError('Parameter \'template_dict\' must be of type '
-                             '\'dict\' not {}.'.format(type(template_dict)))
-
-        template_out = {}
-        # replace placeholders in the template, one value at a time
-        for key in template_dict.keys():
-            val = template_dict[key]
-            # print('Key: {} Value: {} Type: {}'.format(key, val, type(val)))
-            metadata = get_metadata(template_dict, key)
-            if val is None:
-                # NoneType - no value
-                template_out[key] = None
-            elif isinstance(val, str):
-                # process string
-                template_out[key] = process_string(yaml_dict,
-                                                   val,
-                                                   metadata)
-            elif isinstance(val, dict):
-                # process the dictionary recursively
-                template_out[key] = do_replace(yaml_dict, val)
-            elif isinstance(val, list):
-                # process each list item
-                template_out[key] = process_list(yaml_dict,
-                                                 val,
-                                                 metadata)
-            else:
-                raise NotImplementedError(
-                        'Support for properties of type {} is not implemented.'
                         .format(type(val)))
 
-        return template_out
+            if in_dict:
+                container_out[key] = value
+            else:
+                container_out.append(value)
+        else:
+            # all items of container were processed
+            stack.pop()
+            open_containers.discard(id(container))
 
-    return do_replace(yaml_dict, template_dict)
+    return template_out
 
 
 # Main entry point
 if __name__ == "__main__":
 
+    from argparse import ArgumentParser
+
     parser = ArgumentParser(
                 description='Populate a template file using '
                             'values from a YAML file.')
-    parser.add_argument('input_yaml',
-                        help='YAML file containing placeholder values')
+    parser.add_argument('input_yaml', nargs='+',
+                        help='YAML file containing placeholder values. '
+                             'In batch mode (--output-dir) multiple '
+                             'files, directories or glob patterns '
+                             'may be specified.')
     parser.add_argument('template',
                         help='Template file to be completed')
     parser.add_argument('-o', '--output', default=None,
                         help='Output file name. If not specified '
                               'output is sent to STDOUT.')
+    parser.add_argument('-d', '--output-dir', default=None,
+                        help='Batch mode: complete the template for '
+                             'each input file and store the results '
+                             'in this directory.')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='Batch mode: number of worker processes. '
+                             'Specify 0 to use one process per CPU. '
+                             'Default: 1')
+    parser.add_argument('--chunk-size', type=int, default=16,
+                        help='Batch mode: number of input files sent to '
+                             'a worker process at a time. Default: 16')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream mode: input_yaml is a stream of '
+                             'documents (\'-\' for STDIN). One completed '
+                             'template is written per document.')
+    parser.add_argument('--input-format', choices=['yaml', 'jsonl'],
+                        default='yaml',
+                        help='Stream mode: input stream format, multi-'
+                             'document YAML or JSON Lines. Default: yaml')
+    parser.add_argument('--output-format', choices=['yaml', 'jsonl'],
+                        default=None,
+                        help='Stream mode: output stream format. '
+                             'Default: the input stream format')
+    parser.add_argument('--fast-values', action='store_true',
+                        help='Load placeholder values using the fast '
+                             'safe YAML loader instead of the round-trip '
+                             'loader. Comments in placeholder values are '
+                             'not copied to the output.')
+    parser.add_argument('--lazy-values', action='store_true',
+                        help='Only load the top-level properties of '
+                             'placeholder values files that the template '
+                             'references. Speeds up loading of large '
+                             'files, e.g. descriptors with long content '
+                             'lists.')
     args = parser.parse_args()
 
+    if args.stream:
+        from json import JSONDecodeError
+        from metadata_converter.compiler import compile_template
+        from metadata_converter.loaders import load_template
+        from metadata_converter.stream import render_documents
+        from metadata_converter.stream import iter_documents
+        from metadata_converter.stream import write_document
+        # errors raised by the compiled template are instances of
+        # the metadata_converter.apply class, not of this __main__ one
+        from metadata_converter.apply import PlaceholderNotFoundError \
+            as StreamPlaceholderNotFoundError
+        from ruamel.yaml.error import YAMLError
+
+        if args.output_dir is not None or len(args.input_yaml) > 1:
+            parser.error('stream mode requires exactly one input_yaml '
+                         'and does not support -d/--output-dir')
+        if args.lazy_values:
+            parser.error('argument --lazy-values is not supported '
+                         'in stream mode')
+        count = 0
+        fast = args.fast_values
+        output_format = args.output_format or args.input_format
+        in_stream = sys.stdin
+        out_stream = sys.stdout
+        try:
+            template = compile_template(load_template(args.template))
+        except FileNotFoundError as fnfe:
+            # The template file was not found
+            print(str(fnfe), file=sys.stderr)
+            sys.exit(1)
+        except YAMLError as pe:
+            # The template file is not valid
+            print('Error parsing file {}: {}'.format(args.template, str(pe)),
+                  file=sys.stderr)
+            sys.exit(1)
+        try:
+            if args.input_yaml[0] != '-':
+                in_stream = open(args.input_yaml[0], 'r')
+            if args.output is not None:
+                out_stream = open(args.output, 'w')
+            for out_yaml in render_documents(template,
+                                             iter_documents(
+                                                in_stream,
+                                                args.input_format,
+                                                fast=fast)):
+                write_document(out_yaml, out_stream, output_format)
+                count = count + 1
+        except FileNotFoundError as fnfe:
+            # One of the input files was not found
+            print(str(fnfe), file=sys.stderr)
+            sys.exit(1)
+        except StreamPlaceholderNotFoundError as pnfe:
+            # A document does not define a placeholder
+            print('Error processing template "{}". Document {} in "{}" '
+                  'does not define property "{}"'
+                  .format(args.template, count + 1,
+                          args.input_yaml[0], pnfe.placeholder),
+                  file=sys.stderr)
+            sys.exit(1)
+        except (YAMLError, JSONDecodeError) as pe:
+            # A document in the input stream is not valid
+            print('Error parsing document {} in "{}": {}'
+                  .format(count + 1, args.input_yaml[0], str(pe)),
+                  file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if in_stream is not sys.stdin:
+                in_stream.close()
+            if out_stream is not sys.stdout:
+                out_stream.close()
+        sys.exit(0)
+
+    if args.output_dir is not None:
+        from metadata_converter.batch import convert_files
+
+        if args.output is not None:
+            parser.error('argument -o/--output is not supported '
+                         'in batch mode')
+        try:
+            results = convert_files(args.input_yaml,
+                                    args.template,
+                                    args.output_dir,
+                                    workers=args.workers or None,
+                                    chunksize=args.chunk_size,
+                                    fast=args.fast_values,
+                                    lazy=args.lazy_values)
+        except FileNotFoundError as fnfe:
+            # The template file was not found
+            print(str(fnfe))
+            sys.exit(1)
+        except ValueError as ve:
+            parser.error(str(ve))
+        failed = [result for result in results if result.error is not None]
+        for result in failed:
+            print('Error processing template "{}". {}'
+                  .format(args.template, result.error))
+        print('Converted {} of {} file(s).'
+              .format(len(results) - len(failed), len(results)))
+        sys.exit(1 if len(failed) > 0 else 0)
+
+    if len(args.input_yaml) > 1:
+        parser.error('multiple input files require -d/--output-dir')
+    args.input_yaml = args.input_yaml[0]
+
+    from metadata_converter.loaders import load_template
+    from metadata_converter.loaders import load_values
+    from metadata_converter.loaders import ThreadLocalYAML
+    from ruamel.yaml.error import YAMLError
+
+    dumper = ThreadLocalYAML(indent=dict(mapping=2, sequence=4, offset=2))
+
     try:
-        # load the input YAML
-        in_yaml = yaml.load(Path(args.input_yaml))
+        if args.lazy_values:
+            from metadata_converter.compiler import compile_template
+            from metadata_converter.lazy_values import load_lazy_values
 
-        # load template YAML
-        in_template = yaml.load(Path(args.template))
+            # load template YAML, and the input YAML properties
+            # that the template references
+            in_template = load_template(args.template)
+            in_yaml = load_lazy_values(args.input_yaml,
+                                       [compile_template(in_template)],
+                                       fast=args.fast_values)
+        else:
+            # load the input YAML
+            in_yaml = load_values(args.input_yaml,
+                                  fast=args.fast_values)
+
+            # load template YAML
+            in_template = load_template(args.template)
 
         # replace placeholders in template
         out_yaml = replace(in_yaml, in_template)
 
-        yaml.indent(mapping=2, sequence=4, offset=2)
-
         # save completed template in file or STDOUT
         if args.output is not None:
             with open(args.output, 'w') as output_file:
-                yaml.dump(out_yaml, output_file)
+                dumper.dump(out_yaml, output_file)
         else:
-            yaml.dump(out_yaml, sys.stdout)
+            dumper.dump(out_yaml, sys.stdout)
 
     except FileNotFoundError as fnfe:
         # One of the input files was not found
         print(str(fnfe))
-    except yaml.parser.ParserError as pe:
+    except YAMLError as pe:
         # Input YAML file is not valid
         print('Error parsing file {}: {}'.format(args.input_yaml, str(pe)))
     except PlaceholderNotFoundError as pnfe:
@@ -0,0 +1,305 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from collections import deque
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.compiler import CompiledTemplate
+from metadata_converter.compiler import compile_template
+from metadata_converter.loaders import load_template
+from metadata_converter.loaders import load_values
+from metadata_converter.loaders import ThreadLocalYAML
+from pathlib import Path
+import glob
+import os
+
+yaml = ThreadLocalYAML(indent=dict(mapping=2, sequence=4, offset=2))
+
+# Outcome of converting one input file. error is None if the
+# conversion succeeded, and a description of the problem otherwise.
+ConversionResult = namedtuple('ConversionResult',
+                              ['input', 'output', 'error'])
+
+# Compiled template of a worker process, see init_worker
+worker_template = None
+
+
+def init_worker(template):
+    # Runs once in each worker process; the template is shipped
+    # to the worker once instead of once per chunk
+    global worker_template
+    worker_template = template
+
+
+def run_in_worker(function, chunk):
+    return function(worker_template, chunk)
+
+
+def map_chunks(function, items, template, workers, chunksize):
+    """
+    Apply function(template, chunk) to consecutive chunks of items
+    using a pool of worker processes and yield the results in order.
+    Only a bounded number of chunks is in flight at any time, so items
+    may be an arbitrarily long iterator.
+
+    :param function: module-level function that takes a compiled
+    template and a list of items and returns a list of results
+    :type function: callable
+    :param items: items to process
+    :type items: iterable
+    :param template: compiled template
+    :type template: CompiledTemplate
+    :param workers: number of worker processes; None to use one
+    process per CPU, 1 to process the items in the calling process
+    :type workers: int
+    :param chunksize: number of items per chunk
+    :type chunksize: int
+    :raises ValueError: workers or chunksize is invalid
+    :return: results
+    :rtype: iterator
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError('Parameter \'workers\' must be a positive '
+                         'integer or None not {}.'.format(workers))
+    if chunksize < 1:
+        raise ValueError('Parameter \'chunksize\' must be a positive '
+                         'integer not {}.'.format(chunksize))
+
+    items = iter(items)
+    chunks = iter(lambda: list(islice(items, chunksize)), [])
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from function(template, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=init_worker,
+                             initargs=(template,)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(run_in_worker, function, chunk))
+            # keep all workers busy without queueing every chunk
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def render_chunk(template, chunk):
+    results = []
+    for values in chunk:
+        try:
+            results.append((template.render(values), None))
+        except Exception as ex:
+            results.append((None, ex))
+    return results
+
+
+def convert_many(inputs, template, workers=None, chunksize=64):
+    """
+    Replace the placeholders in template with values from each
+    input, using a pool of worker processes. The compiled template is
+    sent to each worker once; inputs are distributed in chunks.
+
+    :param inputs: dict representations of YAML documents defining
+    placeholder values
+    :type inputs: iterable
+    :param template: template file or compiled template
+    :type template: str, pathlib.Path or CompiledTemplate
+    :param workers: number of worker processes; None to use one
+    process per CPU, 1 to render in the calling process
+    :type workers: int
+    :param chunksize: number of inputs sent to a worker at a time
+    :type chunksize: int
+    :raises PlaceholderNotFoundError: a {{...}} placeholder in template
+    was not found in an input; raised when that input's result is reached
+    :raises ValueError: an input is not of type dict, or workers or
+    chunksize is invalid
+    :return: the completed templates, in input order
+    :rtype: iterator
+    """
+
+    if not isinstance(template, CompiledTemplate):
+        template = compile_template(load_template(template))
+
+    for out_yaml, error in map_chunks(render_chunk,
+                                      inputs,
+                                      template,
+                                      workers,
+                                      chunksize):
+        if error is not None:
+            raise error
+        yield out_yaml
+
+
+def expand_inputs(inputs):
+    """
+    Expand a list of file names, directories and glob patterns into
+    the list of files they identify. Directories are expanded into
+    the YAML files (*.yaml, *.yml) they contain.
+
+    :param inputs: file names, directory names or glob patterns
+    :type inputs: list
+    :return: file names, in order of appearance, without duplicates
+    :rtype: list
+    """
+
+    files = []
+    seen = set()
+    for pattern in inputs:
+        pattern = str(pattern)
+        if Path(pattern).is_dir():
+            matches = sorted(glob.glob(str(Path(pattern) / '*.yaml')) +
+                             glob.glob(str(Path(pattern) / '*.yml')))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+        else:
+            matches = [pattern]
+        for match in matches:
+            if match not in seen:
+                seen.add(match)
+                files.append(match)
+    return files
+
+
+def convert_file(input_yaml, template, output_dir, fast=True, lazy=False):
+    """
+    Replace the placeholders in template with values from input_yaml
+    and store the result in output_dir, using the name of input_yaml.
+    Errors are reported in the result instead of being raised.
+
+    :param input_yaml: YAML file containing placeholder values
+    :type input_yaml: str or pathlib.Path
+    :param template: compiled template
+    :type template: CompiledTemplate
+    :param output_dir: output directory, which must exist
+    :type output_dir: str or pathlib.Path
+    :param fast: load input_yaml using the fast loader, see
+    metadata_converter.loaders.load_values
+    :type fast: bool
+    :param lazy: only load the top-level properties of input_yaml that
+    template references, see metadata_converter.lazy_values
+    :type lazy: bool
+    :return: conversion outcome
+    :rtype: ConversionResult
+    """
+
+    output = Path(output_dir) / Path(input_yaml).name
+    try:
+        if lazy:
+            from metadata_converter.lazy_values import load_lazy_values
+
+            in_yaml = load_lazy_values(input_yaml, [template], fast=fast)
+        else:
+            in_yaml = load_values(input_yaml, fast=fast)
+        out_yaml = template.render(in_yaml)
+        with open(output, 'w') as output_file:
+            yaml.dump(out_yaml, output_file)
+    except PlaceholderNotFoundError as pnfe:
+        return ConversionResult(str(input_yaml), None,
+                                '"{}" does not define property "{}"'
+                                .format(input_yaml, pnfe.placeholder))
+    except Exception as ex:
+        return ConversionResult(str(input_yaml), None,
+                                'Error processing "{}": {}'
+                                .format(input_yaml, str(ex)))
+    return ConversionResult(str(input_yaml), str(output), None)
+
+
+def convert_chunk(output_dir, fast, lazy, template, chunk):
+    return [convert_file(input_yaml, template, output_dir, fast=fast,
+                         lazy=lazy)
+            for input_yaml in chunk]
+
+
+def convert_files(inputs,
+                  template,
+                  output_dir,
+                  workers=1,
+                  chunksize=16,
+                  fast=True,
+                  lazy=False):
+    """
+    Replace the placeholders in template with values from each input
+    file and store the results in output_dir. The template is loaded
+    and compiled once. A failed conversion does not stop processing
+    of the remaining inputs. Set workers to convert the inputs in
+    parallel in multiple processes.
+
+    :param inputs: file names, directory names or glob patterns
+    identifying YAML files containing placeholder values
+    :type inputs: list
+    :param template: template file or compiled template
+    :type template: str, pathlib.Path or CompiledTemplate
+    :param output_dir: output directory, which is created if it
+    does not exist
+    :type output_dir: str or pathlib.Path
+    :param workers: number of worker processes; None to use one
+    process per CPU, 1 to convert in the calling process
+    :type workers: int
+    :param chunksize: number of input files sent to a worker at a time
+    :type chunksize: int
+    :param fast: load input files using the fast loader, see
+    metadata_converter.loaders.load_values
+    :type fast: bool
+    :param lazy: only load the top-level properties of the input files
+    that the template references, see metadata_converter.lazy_values
+    :type lazy: bool
+    :raises FileNotFoundError: the template file was not found
+    :raises ValueError: workers or chunksize is invalid
+    :return: one conversion outcome per input file, in input order
+    :rtype: list
+    """
+
+    if not isinstance(template, CompiledTemplate):
+        template = compile_template(load_template(template))
+
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    # None marks inputs that are yet to be converted
+    results = []
+    input_yamls = []
+    outputs = set()
+    for input_yaml in expand_inputs(inputs):
+        name = Path(input_yaml).name
+        if name in outputs:
+            # don't overwrite the output of a previous input
+            results.append(ConversionResult(input_yaml, None,
+                                            'Error processing "{}": '
+                                            'output file "{}" was already '
+                                            'generated for another input'
+                                            .format(input_yaml, name)))
+            continue
+        outputs.add(name)
+        results.append(None)
+        input_yamls.append(input_yaml)
+
+    converted = iter(list(map_chunks(partial(convert_chunk,
+                                             output_dir,
+                                             fast,
+                                             lazy),
+                                     input_yamls,
+                                     template,
+                                     workers,
+                                     chunksize)))
+    return [next(converted) if result is None else result
+            for result in results]
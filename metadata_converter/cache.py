@@ -0,0 +1,120 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from collections import OrderedDict
+from metadata_converter.compiler import compile_template
+from metadata_converter.loaders import load_template
+from pathlib import Path
+import hashlib
+import io
+import os
+import threading
+
+
+def fingerprint(path):
+    """
+    Return a value that changes whenever the content of the template
+    file changes: its modification time and size for files, or a hash
+    of the content for resources that are not stored in the file
+    system, such as templates in a zip archive.
+
+    :param path: template location
+    :type path: pathlib.Path or importlib_resources.abc.Traversable
+    :raises FileNotFoundError: the template does not exist
+    :return: fingerprint
+    :rtype: tuple or str
+    """
+    try:
+        stat = os.stat(path)
+    except TypeError:
+        # not a file system path
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def cache_key(path):
+    # str paths are normalized like pathlib.Path does, so that e.g.
+    # './templates/dlf_out.yaml' and 'templates/dlf_out.yaml' share
+    # an entry
+    if isinstance(path, str):
+        path = Path(path)
+    return str(path)
+
+
+class TemplateCache(object):
+    """
+    Thread-safe, process-level cache of compiled templates, keyed by
+    template location. A cached template is reloaded if its fingerprint
+    has changed since it was compiled. If maxsize is not None, the
+    least recently used template is evicted once the cache holds more
+    than maxsize templates.
+    """
+
+    def __init__(self, maxsize=None):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError('Parameter \'maxsize\' must be a positive '
+                             'integer or None not {}.'.format(maxsize))
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, path):
+        """Return the compiled template stored at path
+
+        :param path: template location
+        :type path: str, pathlib.Path or importlib_resources.abc.Traversable
+        :raises FileNotFoundError: the template does not exist
+        :return: compiled template
+        :rtype: CompiledTemplate
+        """
+        key = cache_key(path)
+        if isinstance(path, str):
+            path = Path(path)
+        current = fingerprint(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == current:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        # load and compile outside of the lock; concurrent
+        # misses for the same template are harmless
+        compiled = compile_template(
+                        load_template(io.StringIO(path.read_text())))
+
+        with self._lock:
+            self._entries[key] = (current, compiled)
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, path=None):
+        """Remove the template stored at path from the cache, or all
+        templates if path is None
+
+        :param path: template location
+        :type path: str, pathlib.Path or importlib_resources.abc.Traversable
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(cache_key(path), None)
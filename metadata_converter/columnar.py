@@ -0,0 +1,509 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.stream import write_document
+from pathlib import Path
+import csv
+import sys
+
+#
+# Batch rendering of a compiled template from a table with one row per
+# placeholder values document, e.g. a catalog with one row per data
+# set. Dotted column names are placeholder paths: the column
+# 'repository.url' provides {{repository.url}}, and the columns
+# 'repository.url' and 'repository.mime_type' together provide
+# {{repository}}. Struct columns (Arrow, Parquet) provide the
+# placeholders within them.
+#
+# The table is read in batches of rows. The placeholders of the
+# template are mapped to columns once; for each batch, only the
+# columns that the template references are read, and each placeholder
+# is resolved for all rows of the batch at once. The completed
+# templates are written as a YAML or JSON Lines stream.
+#
+# CSV tables are read using the csv module; all values are strings and
+# empty cells are missing values. Arrow (IPC file / Feather) and Parquet
+# tables require pyarrow.
+#
+# Usage: python -m metadata_converter.columnar catalog.csv -t dlf
+#            [-o out.jsonl] [--output-format jsonl]
+#
+
+# Supported table formats
+TABLE_FORMATS = ['csv', 'parquet', 'arrow']
+
+# Table format by file name suffix
+TABLE_SUFFIXES = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow'
+}
+
+# Default number of rows per batch
+DEFAULT_BATCH_SIZE = 1024
+
+
+def table_format(source, format=None):
+    """
+    Return the format of a table.
+
+    :param source: table file, text stream (CSV) or pyarrow.Table
+    :type source: str, pathlib.Path, file-like object or pyarrow.Table
+    :param format: table format; default: determined by the file name
+    suffix, 'csv' for text streams
+    :type format: str
+    :raises ValueError: the format is not supported or cannot be
+    determined
+    :rtype: str
+    """
+
+    if format is None:
+        if isinstance(source, (str, Path)):
+            format = TABLE_SUFFIXES.get(Path(source).suffix.lower())
+            if format is None:
+                raise ValueError('The format of table "{}" cannot be '
+                                 'determined; specify one of {}.'
+                                 .format(source, TABLE_FORMATS))
+        elif hasattr(source, 'read'):
+            format = 'csv'
+        else:
+            format = 'arrow'
+    if format not in TABLE_FORMATS:
+        raise ValueError('Table format must be one of {} not \'{}\'.'
+                         .format(TABLE_FORMATS, format))
+    return format
+
+
+def import_pyarrow():
+    # pyarrow is an optional dependency
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('Arrow and Parquet tables require pyarrow. '
+                          'Install exchange-metadata-converter[arrow].')
+    return pyarrow
+
+
+class RowBatch(object):
+    """
+    Rows of a CSV table.
+    """
+
+    def __init__(self, names, rows):
+        self.names = names
+        self.rows = rows
+        self.num_rows = len(rows)
+        self.positions = {name: position
+                          for position, name in enumerate(names)}
+
+    def column(self, name):
+        """
+        Return the values of a column; empty cells are None.
+        """
+
+        position = self.positions[name]
+        return [row[position] if position < len(row) and
+                row[position] != '' else None
+                for row in self.rows]
+
+
+class ArrowBatch(object):
+    """
+    A pyarrow.RecordBatch.
+    """
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.names = batch.schema.names
+        self.num_rows = batch.num_rows
+
+    def column(self, name):
+        """
+        Return the values of a column; nulls are None, structs dicts.
+        """
+
+        return self.batch.column(
+                    self.batch.schema.get_field_index(name)).to_pylist()
+
+
+def iter_csv_batches(stream, batch_size):
+    reader = csv.reader(stream)
+    names = next(reader, None)
+    if names is None:
+        # empty table
+        return
+    names = [name.strip() for name in names]
+    rows = []
+    for row in reader:
+        if len(row) == 0:
+            continue
+        rows.append(row)
+        if len(rows) == batch_size:
+            yield RowBatch(names, rows)
+            rows = []
+    if len(rows) > 0:
+        yield RowBatch(names, rows)
+
+
+def iter_batches(source, format=None, batch_size=DEFAULT_BATCH_SIZE,
+                 columns=None):
+    """
+    Read a table in batches of rows.
+
+    :param source: table file, text stream (CSV) or pyarrow.Table
+    :type source: str, pathlib.Path, file-like object or pyarrow.Table
+    :param format: table format, see table_format()
+    :type format: str
+    :param batch_size: maximum number of rows per batch
+    :type batch_size: int
+    :param columns: optional function that is passed the column names
+    and returns the names of the columns that are used; Parquet tables
+    only read these columns
+    :type columns: callable
+    :raises ValueError: the format is not supported, or batch_size is
+    not positive
+    :raises ImportError: format is 'arrow' or 'parquet' and pyarrow is
+    not installed
+    :return: batches with `names`, `num_rows` and `column(name)`, which
+    returns the values of a column as a list
+    :rtype: iterator
+    """
+
+    if batch_size < 1:
+        raise ValueError('Parameter \'batch_size\' must be positive '
+                         'not {}.'.format(batch_size))
+    format = table_format(source, format)
+    if format == 'csv':
+        if hasattr(source, 'read'):
+            yield from iter_csv_batches(source, batch_size)
+        else:
+            with open(source, 'r', newline='', encoding='utf-8') as stream:
+                yield from iter_csv_batches(stream, batch_size)
+        return
+
+    pyarrow = import_pyarrow()
+    if format == 'parquet':
+        import pyarrow.parquet
+
+        parquet_file = pyarrow.parquet.ParquetFile(str(source))
+        names = parquet_file.schema_arrow.names
+        used = names if columns is None else columns(names)
+        for batch in parquet_file.iter_batches(batch_size=batch_size,
+                                               columns=used):
+            yield ArrowBatch(batch)
+        return
+
+    if isinstance(source, (str, Path)):
+        import pyarrow.ipc
+
+        # memory-mapped; batches are not copied
+        with pyarrow.memory_map(str(source), 'r') as arrow_file:
+            table = pyarrow.ipc.open_file(arrow_file).read_all()
+            for batch in table.to_batches(max_chunksize=batch_size):
+                yield ArrowBatch(batch)
+        return
+    for batch in source.to_batches(max_chunksize=batch_size):
+        yield ArrowBatch(batch)
+
+
+class ColumnMapping(object):
+    """
+    Maps the placeholders of a compiled template to the columns of
+    a table.
+    """
+
+    def __init__(self, template, names):
+        """
+        :param template: compiled template
+        :type template: CompiledTemplate
+        :param names: column names
+        :type names: list
+        :raises ValueError: names contains duplicates
+        """
+
+        if len(set(names)) != len(names):
+            raise ValueError('Column names must be unique: {}'
+                             .format(names))
+        columns = set(names)
+        # placeholder -> source of its values, one of
+        #  ('column', name): the column with the placeholder name
+        #  ('field', name, path): a property within the values of
+        #    a struct column
+        #  ('nested', ((name, path), ...)): a dict of the columns
+        #    whose names start with the placeholder
+        #  ('missing',)
+        self.sources = {}
+        for placeholder, path, _ in template.placeholders():
+            if placeholder in self.sources:
+                continue
+            if placeholder in columns:
+                self.sources[placeholder] = ('column', placeholder)
+                continue
+            # the longest column name that is a prefix of the path
+            for length in range(len(path) - 1, 0, -1):
+                name = '.'.join(path[:length])
+                if name in columns:
+                    self.sources[placeholder] = ('field', name,
+                                                 path[length:])
+                    break
+            else:
+                prefix = placeholder + '.'
+                children = tuple((name, tuple(name[len(prefix):].split('.')))
+                                 for name in names
+                                 if name.startswith(prefix))
+                if len(children) > 0:
+                    self.sources[placeholder] = ('nested', children)
+                else:
+                    self.sources[placeholder] = ('missing',)
+        # the columns that provide placeholder values
+        self.columns = []
+        for source in self.sources.values():
+            if source[0] == 'column' or source[0] == 'field':
+                self.columns.append(source[1])
+            elif source[0] == 'nested':
+                self.columns.extend(name for name, _ in source[1])
+        self.columns = [name for name in names if name in set(self.columns)]
+
+    def resolve(self, batch):
+        """
+        Resolve the placeholders for all rows of a batch.
+
+        :param batch: rows, see iter_batches()
+        :return: placeholder -> list of values, one per row (None if
+        the value is missing)
+        :rtype: dict
+        """
+
+        columns = {name: batch.column(name) for name in self.columns}
+        resolved = {}
+        for placeholder, source in self.sources.items():
+            kind = source[0]
+            if kind == 'column':
+                resolved[placeholder] = columns[source[1]]
+            elif kind == 'field':
+                values = []
+                for value in columns[source[1]]:
+                    for property in source[2]:
+                        if not isinstance(value, dict):
+                            value = None
+                            break
+                        value = value.get(property)
+                    values.append(value)
+                resolved[placeholder] = values
+            elif kind == 'nested':
+                resolved[placeholder] = nest(
+                                            [(path, columns[name])
+                                             for name, path in source[1]],
+                                            batch.num_rows)
+            else:
+                resolved[placeholder] = [None] * batch.num_rows
+        return resolved
+
+    def indexes(self, batch):
+        """
+        Yield one flat index (placeholder -> value) per row of a batch,
+        which can be passed as `index` to CompiledTemplate.render().
+
+        :param batch: rows, see iter_batches()
+        :rtype: iterator
+        """
+
+        resolved = self.resolve(batch)
+        placeholders = list(resolved.keys())
+        for row in zip(*resolved.values()):
+            yield dict(zip(placeholders, row))
+        if len(placeholders) == 0:
+            for _ in range(batch.num_rows):
+                yield {}
+
+
+def nest(columns, num_rows):
+    # one dict per row, built from (path, values) columns; None for
+    # rows in which all values are missing
+    rows = []
+    for row in range(num_rows):
+        document = None
+        for path, values in columns:
+            value = values[row]
+            if value is None:
+                continue
+            if document is None:
+                document = {}
+            container = document
+            for property in path[:-1]:
+                child = container.get(property)
+                if not isinstance(child, dict):
+                    child = container[property] = {}
+                container = child
+            container[path[-1]] = value
+        rows.append(document)
+    return rows
+
+
+def render_rows(template, source, format=None,
+                batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Replace the placeholders in template with values from each row
+    of a table.
+
+    :param template: compiled template
+    :type template: CompiledTemplate
+    :param source: table file, text stream (CSV) or pyarrow.Table
+    :type source: str, pathlib.Path, file-like object or pyarrow.Table
+    :param format: table format, see table_format()
+    :type format: str
+    :param batch_size: number of rows that are resolved at a time
+    :type batch_size: int
+    :raises PlaceholderNotFoundError: a {{...}} placeholder in template
+    was not found in a row
+    :raises ValueError: the format is not supported, or the table has
+    duplicate column names
+    :raises ImportError: format is 'arrow' or 'parquet' and pyarrow is
+    not installed
+    :return: the completed templates, in row order
+    :rtype: iterator
+    """
+
+    mappings = {}
+
+    def columns(names):
+        mappings['mapping'] = ColumnMapping(template, list(names))
+        return mappings['mapping'].columns
+
+    mapping = None
+    for batch in iter_batches(source, format, batch_size, columns=columns):
+        if mapping is None:
+            mapping = mappings.get('mapping')
+            if mapping is None:
+                mapping = ColumnMapping(template, list(batch.names))
+        for index in mapping.indexes(batch):
+            yield template.render(index, index=index)
+
+
+def render_table(template,
+                 source,
+                 out_stream,
+                 format=None,
+                 output_format='jsonl',
+                 batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Replace the placeholders in template with values from each row of
+    a table and write one completed template per row to out_stream.
+
+    :param template: compiled template
+    :type template: CompiledTemplate
+    :param source: table file, text stream (CSV) or pyarrow.Table
+    :type source: str, pathlib.Path, file-like object or pyarrow.Table
+    :param out_stream: stream to write completed templates to
+    :type out_stream: file-like object
+    :param format: table format, see table_format()
+    :type format: str
+    :param output_format: format of out_stream, 'yaml' or 'jsonl'
+    :type output_format: str
+    :param batch_size: number of rows that are resolved at a time
+    :type batch_size: int
+    :raises PlaceholderNotFoundError: a {{...}} placeholder in template
+    was not found in a row; the completed templates of the preceding
+    rows were written
+    :raises ValueError: a format is not supported, or the table has
+    duplicate column names
+    :raises ImportError: format is 'arrow' or 'parquet' and pyarrow is
+    not installed
+    :return: number of documents written
+    :rtype: int
+    """
+
+    count = 0
+    for document in render_rows(template, source, format, batch_size):
+        write_document(document, out_stream, output_format)
+        count = count + 1
+    return count
+
+
+# Main entry point
+if __name__ == "__main__":
+
+    from argparse import ArgumentParser
+    from metadata_converter.apply import PlaceholderNotFoundError
+    from metadata_converter.generate import BUILTIN_TEMPLATES
+    from metadata_converter.generate import get_builtin_template
+    from metadata_converter.generate import load_compiled_template
+    from metadata_converter.stream import STREAM_FORMATS
+
+    parser = ArgumentParser(
+                description='Complete a template using the values of '
+                            'each row of a table. Dotted column names, '
+                            'e.g. repository.url, identify placeholders.')
+    parser.add_argument('table',
+                        help='CSV, Arrow or Parquet file, or \'-\' to '
+                             'read CSV from STDIN')
+    parser.add_argument('-t', '--template', required=True,
+                        help='Template file, or the name of a built-in '
+                             'template ({})'
+                             .format(', '.join(sorted(BUILTIN_TEMPLATES))))
+    parser.add_argument('-o', '--output', default=None,
+                        help='Output file name. If not specified '
+                             'output is sent to STDOUT.')
+    parser.add_argument('--format', choices=TABLE_FORMATS, default=None,
+                        help='Table format. Default: determined by the '
+                             'file name suffix')
+    parser.add_argument('--output-format', choices=STREAM_FORMATS,
+                        default='jsonl',
+                        help='Output stream format. Default: jsonl')
+    parser.add_argument('--batch-size', type=int,
+                        default=DEFAULT_BATCH_SIZE,
+                        help='Number of rows that are resolved at a time. '
+                             'Default: {}'.format(DEFAULT_BATCH_SIZE))
+    args = parser.parse_args()
+
+    source = args.table
+    if source == '-':
+        source = sys.stdin
+    out_stream = sys.stdout
+    count = 0
+    try:
+        if args.template in BUILTIN_TEMPLATES:
+            template = get_builtin_template(args.template)
+        else:
+            template = load_compiled_template(args.template)
+        if args.output is not None:
+            out_stream = open(args.output, 'w')
+        for document in render_rows(template,
+                                    source,
+                                    format=args.format,
+                                    batch_size=args.batch_size):
+            write_document(document, out_stream, args.output_format)
+            count = count + 1
+    except (FileNotFoundError, ImportError) as ex:
+        # The table or template file was not found, or pyarrow is
+        # not installed
+        print(str(ex), file=sys.stderr)
+        sys.exit(1)
+    except PlaceholderNotFoundError as pnfe:
+        # A row does not define a placeholder
+        print('Error processing template "{}". Row {} of "{}" does not '
+              'define property "{}"'
+              .format(args.template, count + 1, args.table,
+                      pnfe.placeholder),
+              file=sys.stderr)
+        sys.exit(1)
+    except ValueError as ve:
+        parser.error(str(ve))
+    finally:
+        if out_stream is not sys.stdout:
+            out_stream.close()
+    print('Completed {} row(s).'.format(count), file=sys.stderr)
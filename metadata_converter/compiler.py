@@ -0,0 +1,296 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import compile_format
+from metadata_converter.apply import get_metadata
+from metadata_converter.apply import interpolate
+from metadata_converter.apply import placeholder_pattern
+from metadata_converter.apply import PlaceholderNotFoundError
+import time
+
+# Instruction opcodes. A compiled template is a flat list of
+# (opcode, key, arg, path, optional) tuples:
+#  - OP_DICT/OP_LIST open a new container, which is stored under `key`
+#    in the enclosing container once the matching OP_END is reached
+#  - OP_CONST stores `arg` (a template value without placeholder)
+#  - OP_LOOKUP stores the value of placeholder `arg`, which is located
+#    by walking `path` (the pre-split placeholder) in the values document
+#  - OP_FORMAT stores the format string `arg` (a template string with
+#    placeholders and other text), formatted with the values of the
+#    placeholders in `path`, a tuple of (placeholder, pre-split path)
+OP_DICT = 0
+OP_LIST = 1
+OP_END = 2
+OP_CONST = 3
+OP_LOOKUP = 4
+OP_FORMAT = 5
+
+
+class CompiledTemplate(object):
+    """
+    Pre-parsed representation of a template. Annotations and {{...}}
+    placeholders are extracted once, at compile time, so that
+    rendering neither parses comments nor evaluates regular expressions.
+    Use `compile_template` to create instances.
+    """
+
+    def __init__(self, instructions):
+        self.instructions = instructions
+        # statistics counters that are known at compile time: the
+        # number of template nodes (excluding the root) and placeholders
+        self.node_count = 0
+        self.lookup_count = 0
+        if instructions is not None:
+            self.node_count = sum(1 for instruction in instructions
+                                  if instruction[0] != OP_END) - 1
+            self.lookup_count = sum(1 for _ in self.placeholders())
+
+    def placeholders(self):
+        """Yield (placeholder, pre-split path, optional) for each
+        placeholder of the template, in template order. Placeholders
+        that occur multiple times are yielded multiple times.
+        """
+
+        if self.instructions is None:
+            return
+        for op, _, arg, path, optional in self.instructions:
+            if op == OP_LOOKUP:
+                yield arg, path, optional
+            elif op == OP_FORMAT:
+                for placeholder, placeholder_path in path:
+                    yield placeholder, placeholder_path, optional
+
+    def render(self, values, stats=None, index=None, dependencies=None):
+        """Replace {{...}} placeholders with values from `values`
+
+        :param values: dict representation of a YAML document defining
+        placeholder values
+        :type values: dict
+        :param stats: optional statistics, which are updated with the
+        render time and with node and placeholder counts
+        :type stats: metadata_converter.stats.ConversionStats
+        :param index: optional flat index of values, created by
+        metadata_converter.index.build_index(values), which is used to
+        resolve placeholders
+        :type index: dict
+        :param dependencies: optional list, to which one
+        (container, key, output path, placeholder, path, optional, format)
+        tuple is appended per placeholder; the placeholder value is
+        stored at container[key] in the output, and output path is the
+        tuple of keys (and list indexes) that leads to it from the root.
+        If the value is substituted into a string, format is the
+        (format string, placeholders) of the string, else None
+        :type dependencies: list
+        :raises PlaceholderNotFoundError: a {{...}} placeholder in the
+        template was not found in values
+        :raises ValueError: values is not of type dict
+        :return: the template with all '{{...}}' replaced, None if the
+        template or values is None
+        :rtype: dict
+        """
+
+        if values is None or self.instructions is None:
+            # nothing to do
+            return None
+
+        if not isinstance(values, dict):
+            raise ValueError('Parameter \'values\' must be of type '
+                             '\'dict\' not {}.'.format(type(values)))
+
+        if stats is not None:
+            start = time.perf_counter()
+        # number of @optional placeholders replaced with None
+        dropped = 0
+        stack = []
+        container = None
+        for op, key, arg, path, optional in self.instructions:
+            if op == OP_LOOKUP:
+                if index is None:
+                    value = values
+                    for property in path:
+                        # as with an index, paths through scalars
+                        # and lists are not found
+                        if not isinstance(value, dict):
+                            value = None
+                            break
+                        value = value.get(property)
+                else:
+                    value = index.get(arg)
+                if value is None:
+                    if not optional:
+                        raise PlaceholderNotFoundError(arg)
+                    dropped = dropped + 1
+                if dependencies is not None:
+                    self.record(dependencies, stack, container, key,
+                                ((arg, path),), optional, None)
+            elif op == OP_FORMAT:
+                value, missing = interpolate(arg, path, values, index)
+                if value is None:
+                    if not optional:
+                        raise PlaceholderNotFoundError(missing[0])
+                    dropped = dropped + len(missing)
+                if dependencies is not None:
+                    self.record(dependencies, stack, container, key,
+                                path, optional, (arg, path))
+            elif op == OP_CONST:
+                value = arg
+            elif op == OP_END:
+                value = container
+                container, key = stack.pop()
+                if container is None:
+                    # the root container was closed
+                    if stats is not None:
+                        stats.add_time('render',
+                                       time.perf_counter() - start)
+                        stats.nodes_visited += self.node_count
+                        stats.placeholders_resolved += \
+                            self.lookup_count - dropped
+                        stats.optional_dropped += dropped
+                    return value
+            else:
+                stack.append((container, key))
+                container = {} if op == OP_DICT else []
+                continue
+
+            if isinstance(container, list):
+                container.append(value)
+            else:
+                container[key] = value
+
+    @staticmethod
+    def record(dependencies, stack, container, key, placeholders, optional,
+               format):
+        # Record the location of a placeholder value in the output;
+        # called by render() before the value is stored. Containers are
+        # stored in their parent once they are complete, so a list item
+        # ends up at the current length of the list.
+        output_path = []
+        for parent, parent_key in stack[1:]:
+            output_path.append(parent_key if isinstance(parent, dict)
+                               else len(parent))
+        if isinstance(container, list):
+            key = len(container)
+        output_path.append(key)
+        output_path = tuple(output_path)
+        for placeholder, path in placeholders:
+            dependencies.append((container, key, output_path,
+                                 placeholder, path, optional, format))
+
+
+def compile_template(template_dict):
+    """Compile template_dict into a reusable CompiledTemplate
+
+    :param template_dict: dict representation of a YAML document containing
+    '{{...}}' string placeholders
+    :type template_dict: dict
+    :raises ValueError: template_dict is not of type dict, or
+    contains itself
+    :raises NotImplementedError: template_dict contains a property of
+    an unsupported type
+    :return: compiled template
+    :rtype: CompiledTemplate
+    """
+
+    if template_dict is None:
+        # nothing to do; rendering always yields None
+        return CompiledTemplate(None)
+
+    if not isinstance(template_dict, dict):
+        raise ValueError('Parameter \'template_dict\' must be of type '
+                         '\'dict\' not {}.'.format(type(template_dict)))
+
+    instructions = [(OP_DICT, None, None, None, False)]
+    # The template is compiled depth-first, in document order, using an
+    # explicit stack instead of recursion, so that the nesting depth of
+    # templates is not limited by the Python recursion limit. There is
+    # one entry per open template dict or list:
+    # (template container, iterator over its keys or items,
+    #  metadata of the list property or None)
+    stack = [(template_dict, iter(template_dict.keys()), None)]
+    # ids of the open template containers; YAML aliases can make
+    # a container contain itself
+    open_containers = {id(template_dict)}
+    while stack:
+        container, items, list_metadata = stack[-1]
+        in_dict = isinstance(container, dict)
+        for item in items:
+            if in_dict:
+                key = item
+                val = container[key]
+                metadata = None
+            else:
+                key = None
+                val = item
+                metadata = list_metadata
+            if val is None and in_dict:
+                # NoneType - no value
+                instructions.append((OP_CONST, key, None, None, False))
+            elif isinstance(val, str):
+                if in_dict:
+                    metadata = get_metadata(container, key)
+                r = placeholder_pattern.search(val)
+                if r is None:
+                    instructions.append((OP_CONST, key, val, None, False))
+                else:
+                    optional = metadata is not None and\
+                        metadata.optional
+                    if r.start() == 0 and r.end() == len(val):
+                        # the placeholder value replaces the string
+                        instructions.append((OP_LOOKUP,
+                                             key,
+                                             r.group(1),
+                                             tuple(r.group(1).split('.')),
+                                             optional))
+                    else:
+                        # the placeholder values are substituted into
+                        # the string
+                        format_string, placeholders = compile_format(val)
+                        instructions.append((OP_FORMAT,
+                                             key,
+                                             format_string,
+                                             placeholders,
+                                             optional))
+            elif isinstance(val, (dict, list)):
+                if id(val) in open_containers:
+                    raise ValueError('Parameter \'template_dict\' must not '
+                                     'contain itself.')
+                # compile the dictionary or list items before
+                # continuing with the remaining items of container
+                if isinstance(val, dict):
+                    instructions.append((OP_DICT, key, None, None, False))
+                    stack.append((val, iter(val.keys()), None))
+                else:
+                    if in_dict:
+                        metadata = get_metadata(container, key)
+                    instructions.append((OP_LIST, key, None, None, False))
+                    stack.append((val, iter(val), metadata))
+                open_containers.add(id(val))
+                break
+            elif in_dict:
+                raise NotImplementedError(
+                        'Support for properties of type {} is not implemented.'
+                        .format(type(val)))
+            else:
+                raise NotImplementedError(
+                        'Support for properties of type {} in lists '
+                        'is not implemented.'
+                        .format(type(val)))
+        else:
+            # all items of container were compiled
+            instructions.append((OP_END, None, None, None, False))
+            stack.pop()
+            open_containers.discard(id(container))
+
+    return CompiledTemplate(instructions)
@@ -0,0 +1,375 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from collections import namedtuple
+from metadata_converter.batch import expand_inputs
+from metadata_converter.cache import fingerprint
+from metadata_converter.compiler import compile_template
+from metadata_converter.compiler import OP_DICT
+from metadata_converter.compiler import OP_END
+from metadata_converter.compiler import OP_FORMAT
+from metadata_converter.compiler import OP_LIST
+from metadata_converter.compiler import OP_LOOKUP
+from metadata_converter.loaders import load_template
+import json
+import os
+import sys
+
+#
+# Static dependency index: which templates, and which output properties
+# of these templates, reference a placeholder value path. The index is
+# built from the compiled templates, without rendering them, and can be
+# saved to and loaded from a JSON file. Templates whose files have not
+# changed since the index was saved are not parsed again.
+#
+# Usage: python -m metadata_converter.dependency_index build
+#            index.json templates/ 'more/*.yaml'
+#        python -m metadata_converter.dependency_index query
+#            index.json repository.mime_type
+#
+
+# Version of the index file format
+INDEX_FORMAT_VERSION = 1
+
+# A placeholder reference. output_path is the tuple of keys (and list
+# indexes) that leads to the placeholder in the template.
+Reference = namedtuple('Reference',
+                       ['template', 'output_path', 'placeholder', 'optional'])
+
+# Outcome of indexing a template file; error is None on success
+IndexResult = namedtuple('IndexResult', ['template', 'error'])
+
+
+def template_references(template):
+    """
+    Return the placeholders of a compiled template and their location.
+
+    :param template: compiled template
+    :type template: CompiledTemplate
+    :return: (placeholder, output path, optional) tuples, in template order
+    :rtype: list
+    """
+
+    references = []
+    if template.instructions is None:
+        return references
+    # keys (or list indexes) of the open containers, excluding the root
+    path = []
+    # [is list, number of items] of each open container
+    containers = []
+    for op, key, arg, placeholders, optional in template.instructions:
+        if op == OP_END:
+            containers.pop()
+            if len(path) > 0 and len(containers) > 0:
+                path.pop()
+            continue
+        if len(containers) > 0:
+            parent = containers[-1]
+            if parent[0]:
+                key = parent[1]
+            parent[1] = parent[1] + 1
+            if op == OP_LOOKUP:
+                references.append((arg, tuple(path) + (key,), optional))
+            elif op == OP_FORMAT:
+                for placeholder, _ in placeholders:
+                    references.append((placeholder, tuple(path) + (key,),
+                                       optional))
+            elif op == OP_DICT or op == OP_LIST:
+                path.append(key)
+        if op == OP_DICT or op == OP_LIST:
+            containers.append([op == OP_LIST, 0])
+    return references
+
+
+def format_path(output_path):
+    """
+    Format an output path, e.g. ('spec', 'tags', 0) as 'spec.tags[0]'.
+
+    :param output_path: keys and list indexes
+    :type output_path: tuple
+    :rtype: str
+    """
+
+    text = ''
+    for key in output_path:
+        if isinstance(key, int) and not isinstance(key, bool):
+            text = text + '[{}]'.format(key)
+        elif len(text) == 0:
+            text = str(key)
+        else:
+            text = text + '.' + str(key)
+    return text
+
+
+class DependencyIndex(object):
+    """
+    Inverted index from placeholder path to the templates (and output
+    properties) that reference it.
+    """
+
+    def __init__(self):
+        # template name -> {'fingerprint': ..., 'references': [...]}
+        self.templates = {}
+        # placeholder -> list of Reference
+        self._references = None
+        # dotted path -> placeholders that it is a prefix of
+        self._prefixes = None
+        # Reference -> position in the index, for ordering query results
+        self._positions = None
+
+    def __len__(self):
+        return len(self.templates)
+
+    def add_template(self, name, template, template_fingerprint=None):
+        """
+        Add a compiled template to the index, replacing the template
+        that was added under the same name, if any.
+
+        :param name: template name, e.g. its file name
+        :type name: str
+        :param template: compiled template
+        :type template: CompiledTemplate
+        :param template_fingerprint: optional value that changes whenever
+        the template changes; see update()
+        """
+
+        self.templates[name] = {
+            'fingerprint': template_fingerprint,
+            'references': template_references(template)
+        }
+        self._references = None
+
+    def remove_template(self, name):
+        """
+        Remove a template from the index.
+
+        :param name: template name
+        :type name: str
+        """
+
+        if self.templates.pop(name, None) is not None:
+            self._references = None
+
+    def update(self, inputs):
+        """
+        Index template files. Templates that were indexed before are
+        only loaded again if their file has changed. Templates that
+        were indexed before but are not in inputs, or that cannot be
+        loaded, are removed. Errors are reported in the results instead
+        of being raised.
+
+        :param inputs: template file names, directories or glob patterns
+        :type inputs: list
+        :return: one outcome per template that was loaded
+        :rtype: list
+        """
+
+        names = expand_inputs(inputs)
+        results = []
+        for name in names:
+            try:
+                current = fingerprint(name)
+                if isinstance(current, tuple):
+                    # as stored in the JSON index file
+                    current = list(current)
+                entry = self.templates.get(name)
+                if entry is not None and entry['fingerprint'] == current:
+                    continue
+                self.add_template(name,
+                                  compile_template(load_template(name)),
+                                  current)
+                results.append(IndexResult(name, None))
+            except Exception as ex:
+                self.remove_template(name)
+                results.append(IndexResult(name,
+                                           'Error indexing "{}": {}'
+                                           .format(name, str(ex))))
+        for name in set(self.templates.keys()) - set(names):
+            self.remove_template(name)
+        return results
+
+    def build_lookup(self):
+        # create the inverted index on first use after a change
+        references = {}
+        prefixes = {}
+        positions = {}
+        for name in sorted(self.templates.keys()):
+            for placeholder, output_path, optional in \
+                    self.templates[name]['references']:
+                entries = references.get(placeholder)
+                if entries is None:
+                    entries = references[placeholder] = []
+                    parts = placeholder.split('.')
+                    for i in range(1, len(parts) + 1):
+                        prefixes.setdefault('.'.join(parts[:i]),
+                                            []).append(placeholder)
+                reference = Reference(name,
+                                      tuple(output_path),
+                                      placeholder,
+                                      optional)
+                entries.append(reference)
+                positions[reference] = len(positions)
+        self._references = references
+        self._prefixes = prefixes
+        self._positions = positions
+
+    def placeholders(self):
+        """
+        Return all indexed placeholders.
+
+        :rtype: list
+        """
+
+        if self._references is None:
+            self.build_lookup()
+        return sorted(self._references.keys())
+
+    def query(self, path, exact=False):
+        """
+        Return the references of templates that consume the value at
+        path: placeholders that reference path itself, a property
+        within it (e.g. 'repository.url' for path 'repository') or a
+        property that contains it (e.g. 'repository' for path
+        'repository.url').
+
+        :param path: dotted placeholder value path
+        :type path: str
+        :param exact: only return placeholders that reference path itself
+        :type exact: bool
+        :return: references, ordered by template name and by position
+        in the template
+        :rtype: list
+        """
+
+        if self._references is None:
+            self.build_lookup()
+        if exact:
+            placeholders = [path] if path in self._references else []
+        else:
+            placeholders = set(self._prefixes.get(path, ()))
+            parts = path.split('.')
+            for i in range(1, len(parts)):
+                prefix = '.'.join(parts[:i])
+                if prefix in self._references:
+                    placeholders.add(prefix)
+        result = []
+        for placeholder in placeholders:
+            result.extend(self._references[placeholder])
+        return sorted(result, key=self._positions.get)
+
+    def save(self, index_file):
+        """
+        Save the index to a JSON file.
+
+        :param index_file: file name
+        :type index_file: str or pathlib.Path
+        """
+
+        document = {
+            'version': INDEX_FORMAT_VERSION,
+            'templates': self.templates
+        }
+        # write to a temporary file first, so that readers never
+        # see an incomplete index
+        tmp_file = '{}.tmp{}'.format(index_file, os.getpid())
+        with open(tmp_file, 'w') as output_file:
+            json.dump(document, output_file, default=str)
+        os.replace(tmp_file, index_file)
+
+    @classmethod
+    def load(cls, index_file):
+        """
+        Load an index that was saved with save().
+
+        :param index_file: file name
+        :type index_file: str or pathlib.Path
+        :raises FileNotFoundError: the file does not exist
+        :raises ValueError: the file is not a dependency index of
+        the supported version
+        :return: the index
+        :rtype: DependencyIndex
+        """
+
+        with open(index_file, 'r') as input_file:
+            document = json.load(input_file)
+        if not isinstance(document, dict) or\
+           document.get('version') != INDEX_FORMAT_VERSION:
+            raise ValueError('{} is not a dependency index of version {}.'
+                             .format(index_file, INDEX_FORMAT_VERSION))
+        index = cls()
+        index.templates = document['templates']
+        return index
+
+
+# Main entry point
+if __name__ == "__main__":
+
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(
+                description='Build and query an index of the placeholder '
+                            'paths that templates reference.')
+    subparsers = parser.add_subparsers(dest='command')
+    build_parser = subparsers.add_parser(
+                        'build',
+                        help='Create or update an index file')
+    build_parser.add_argument('index', help='Index file')
+    build_parser.add_argument('templates', nargs='+',
+                              help='Template files, directories or glob '
+                                   'patterns')
+    query_parser = subparsers.add_parser(
+                        'query',
+                        help='List the templates and output properties '
+                             'that consume a placeholder value path')
+    query_parser.add_argument('index', help='Index file')
+    query_parser.add_argument('path', nargs='+',
+                              help='Dotted path, e.g. repository.url')
+    query_parser.add_argument('--exact', action='store_true',
+                              help='Ignore placeholders that reference '
+                                   'properties within or containing path')
+    args = parser.parse_args()
+
+    if args.command is None:
+        parser.error('a command is required')
+
+    try:
+        if args.command == 'build':
+            try:
+                index = DependencyIndex.load(args.index)
+            except (FileNotFoundError, ValueError):
+                index = DependencyIndex()
+            results = index.update(args.templates)
+            index.save(args.index)
+            failed = [result for result in results
+                      if result.error is not None]
+            for result in failed:
+                print(result.error, file=sys.stderr)
+            print('Indexed {} template(s), {} template(s) in index.'
+                  .format(len(results) - len(failed), len(index)))
+            if len(failed) > 0:
+                sys.exit(1)
+        else:
+            index = DependencyIndex.load(args.index)
+            for path in args.path:
+                for reference in index.query(path, exact=args.exact):
+                    print('{}\t{}\t{}\t{}'
+                          .format(path,
+                                  reference.template,
+                                  format_path(reference.output_path),
+                                  '@optional' if reference.optional
+                                  else ''))
+    except (FileNotFoundError, ValueError) as ex:
+        print(str(ex), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,321 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import interpolate
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.compiler import OP_CONST
+from metadata_converter.compiler import OP_DICT
+from metadata_converter.compiler import OP_END
+from metadata_converter.compiler import OP_FORMAT
+from metadata_converter.compiler import OP_LIST
+from metadata_converter.compiler import OP_LOOKUP
+from metadata_converter.loaders import ThreadLocalYAML
+import json
+import time
+
+#
+# Renders compiled templates directly to a stream, without building
+# the completed template in memory first. Output is written while the
+# template is walked, so memory usage is bounded by the template depth
+# and by the size of individual placeholder values.
+#
+# Unlike yaml.dump, YAML output never contains anchors and aliases:
+# a placeholder value that is referenced multiple times is written
+# out in full each time.
+#
+
+# Supported output formats
+EMIT_FORMATS = ['yaml', 'json']
+
+
+# Same settings as the generate_* functions
+default_dumper = ThreadLocalYAML(default_flow_style=False)
+
+
+class CountingStream(object):
+    """
+    Wraps a text stream and counts the UTF-8 encoded bytes written
+    to it.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_written = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            self.bytes_written += len(data.encode('utf-8'))
+        else:
+            self.bytes_written += len(data)
+        return self.stream.write(data)
+
+    def __getattr__(self, name):
+        # e.g. flush() and encoding
+        return getattr(self.stream, name)
+
+
+def iter_values(template, values, stats=None, index=None):
+    """
+    Walk the compiled template and yield (opcode, key, value) for
+    each template node in output order; value is the resolved value
+    for OP_CONST, OP_LOOKUP and OP_FORMAT nodes. See
+    CompiledTemplate.render().
+    """
+
+    if values is None or template.instructions is None:
+        return
+
+    if not isinstance(values, dict):
+        raise ValueError('Parameter \'values\' must be of type '
+                         '\'dict\' not {}.'.format(type(values)))
+
+    dropped = 0
+    for op, key, arg, path, optional in template.instructions:
+        if op == OP_LOOKUP:
+            if index is None:
+                value = values
+                for property in path:
+                    if not isinstance(value, dict):
+                        value = None
+                        break
+                    value = value.get(property)
+            else:
+                value = index.get(arg)
+            if value is None:
+                if not optional:
+                    raise PlaceholderNotFoundError(arg)
+                dropped = dropped + 1
+            yield op, key, value
+        elif op == OP_FORMAT:
+            value, missing = interpolate(arg, path, values, index)
+            if value is None:
+                if not optional:
+                    raise PlaceholderNotFoundError(missing[0])
+                dropped = dropped + len(missing)
+            yield op, key, value
+        elif op == OP_CONST:
+            yield op, key, arg
+        else:
+            yield op, key, None
+
+    if stats is not None:
+        stats.nodes_visited += template.node_count
+        stats.placeholders_resolved += template.lookup_count - dropped
+        stats.optional_dropped += dropped
+
+
+def emit_yaml(template, values, stream, dumper=None, stats=None,
+              index=None):
+    """Render template as YAML to stream
+
+    :param template: compiled template
+    :type template: CompiledTemplate
+    :param values: dict representation of a YAML document defining
+    placeholder values
+    :type values: dict
+    :param stream: text stream
+    :type stream: file-like object
+    :param dumper: YAML instance that defines the output settings; must
+    not be used concurrently. Defaults to the generate_* settings
+    :type dumper: ruamel.yaml.YAML or ThreadLocalYAML
+    :param stats: optional statistics
+    :type stats: metadata_converter.stats.ConversionStats
+    :param index: optional flat index of values, created by
+    metadata_converter.index.build_index(values)
+    :type index: dict
+    :raises PlaceholderNotFoundError: a {{...}} placeholder in the
+    template was not found in values; output that was already written
+    to stream is incomplete
+    :raises ValueError: values is not of type dict
+    """
+
+    from ruamel.yaml.events import DocumentEndEvent
+    from ruamel.yaml.events import DocumentStartEvent
+    from ruamel.yaml.events import MappingEndEvent
+    from ruamel.yaml.events import MappingStartEvent
+    from ruamel.yaml.events import SequenceEndEvent
+    from ruamel.yaml.events import SequenceStartEvent
+
+    if dumper is None:
+        dumper = default_dumper
+    if isinstance(dumper, ThreadLocalYAML):
+        dumper = dumper.instance
+
+    # The serializer, representer and emitter are driven directly and
+    # their private state is reset below (serialized_nodes, anchors,
+    # represented_objects, object_keeper, alias_key, and the dumper's
+    # _serializer and _emitter attributes). These internals were checked
+    # against ruamel.yaml 0.17.21, 0.18.6 and 0.19.1; setup.py restricts
+    # ruamel.yaml to this range.
+    serializer, representer, emitter = \
+        dumper.get_serializer_representer_emitter(stream, None)
+
+    def emit_data(data):
+        # emit a key or value, reusing the representer and serializer
+        # to get the same scalar styles and quoting as yaml.dump
+        node = representer.represent_data(data)
+        serializer.anchor_node(node)
+        serializer.serialize_node(node, None, None)
+        # forget the node, so that memory usage does not grow; the
+        # representer writes None as 'null' only at document level,
+        # which is detected by represented_objects being empty
+        serializer.serialized_nodes = {}
+        serializer.anchors = {}
+        representer.represented_objects = {None: None}
+        representer.object_keeper = []
+        representer.alias_key = None
+
+    representer.represented_objects = {None: None}
+
+    # True for each open mapping, False for each open sequence
+    open_mappings = []
+    written = False
+    try:
+        serializer.open()
+        nodes = iter_values(template, values, stats=stats, index=index)
+        for op, key, value in nodes:
+            if op == OP_END:
+                if open_mappings.pop():
+                    emitter.emit(MappingEndEvent())
+                else:
+                    emitter.emit(SequenceEndEvent())
+                continue
+            if len(open_mappings) == 0:
+                emitter.emit(DocumentStartEvent(
+                    explicit=serializer.use_explicit_start,
+                    version=serializer.use_version,
+                    tags=serializer.use_tags))
+            elif open_mappings[-1]:
+                emit_data(key)
+            if op == OP_DICT:
+                emitter.emit(MappingStartEvent(None, None, True,
+                                               flow_style=False))
+                open_mappings.append(True)
+            elif op == OP_LIST:
+                emitter.emit(SequenceStartEvent(None, None, True,
+                                                flow_style=False))
+                open_mappings.append(False)
+            else:
+                emit_data(value)
+            written = True
+        if written:
+            emitter.emit(DocumentEndEvent(
+                explicit=serializer.use_explicit_end))
+        serializer.close()
+    finally:
+        emitter.dispose()
+        # as YAML.dump does, so that the next dump creates a new
+        # serializer and emitter for its stream
+        delattr(dumper, '_serializer')
+        delattr(dumper, '_emitter')
+
+
+def emit_json(template, values, stream, stats=None, index=None):
+    """Render template as JSON to stream. The output is identical to
+    json.dumps(template.render(values), default=str).
+
+    :param template: compiled template
+    :type template: CompiledTemplate
+    :param values: dict representation of a YAML document defining
+    placeholder values
+    :type values: dict
+    :param stream: text stream
+    :type stream: file-like object
+    :param stats: optional statistics
+    :type stats: metadata_converter.stats.ConversionStats
+    :param index: optional flat index of values, created by
+    metadata_converter.index.build_index(values)
+    :type index: dict
+    :raises PlaceholderNotFoundError: a {{...}} placeholder in the
+    template was not found in values; output that was already written
+    to stream is incomplete
+    :raises ValueError: values is not of type dict
+    """
+
+    # [is mapping, has items] for each open container
+    open_containers = []
+    written = False
+    nodes = iter_values(template, values, stats=stats, index=index)
+    for op, key, value in nodes:
+        if op == OP_END:
+            stream.write('}' if open_containers.pop()[0] else ']')
+            continue
+        if len(open_containers) > 0:
+            parent = open_containers[-1]
+            if parent[1]:
+                stream.write(', ')
+            parent[1] = True
+            if parent[0]:
+                # same key conversion as json.dumps
+                stream.write(json.dumps({key: None})[1:-7])
+                stream.write(': ')
+        if op == OP_DICT:
+            stream.write('{')
+            open_containers.append([True, False])
+        elif op == OP_LIST:
+            stream.write('[')
+            open_containers.append([False, False])
+        else:
+            stream.write(json.dumps(value, default=str))
+        written = True
+    if not written:
+        stream.write('null')
+
+
+def render_to_stream(template, values, stream, format='yaml', stats=None,
+                     index=None):
+    """Render template straight to stream, as YAML or JSON, without
+    creating the completed template in memory
+
+    :param template: compiled template
+    :type template: CompiledTemplate
+    :param values: dict representation of a YAML document defining
+    placeholder values
+    :type values: dict
+    :param stream: text stream
+    :type stream: file-like object
+    :param format: output format, 'yaml' or 'json'
+    :type format: str
+    :param stats: optional statistics, which are updated with the
+    emit time, the number of bytes written and with node
+    and placeholder counts
+    :type stats: metadata_converter.stats.ConversionStats
+    :param index: optional flat index of values, created by
+    metadata_converter.index.build_index(values)
+    :type index: dict
+    :raises PlaceholderNotFoundError: a {{...}} placeholder in the
+    template was not found in values; output that was already written
+    to stream is incomplete
+    :raises ValueError: values is not of type dict or format is
+    not supported
+    """
+
+    if format not in EMIT_FORMATS:
+        raise ValueError('Output format must be one of {} not \'{}\'.'
+                         .format(EMIT_FORMATS, format))
+
+    if stats is not None:
+        start = time.perf_counter()
+        stream = CountingStream(stream)
+    try:
+        if format == 'yaml':
+            emit_yaml(template, values, stream, stats=stats, index=index)
+        else:
+            emit_json(template, values, stream, stats=stats, index=index)
+    finally:
+        if stats is not None:
+            # output written before an error is counted as well
+            stats.bytes_emitted += stream.bytes_written
+            stats.add_time('emit', time.perf_counter() - start)
@@ -0,0 +1,320 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from functools import partial
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.batch import ConversionResult
+from metadata_converter.batch import expand_inputs
+from metadata_converter.batch import map_chunks
+from metadata_converter.batch import yaml
+from metadata_converter.loaders import load_values
+from metadata_converter.stats import timed
+from pathlib import Path
+import sys
+
+#
+# Fan-out rendering: complete several templates (targets) using one
+# placeholder values document. The placeholders of all targets are
+# resolved once per document; the targets are then rendered from the
+# resolved values, so placeholders that several targets share, such
+# as {{id}} or {{repository.url}}, are only looked up once.
+#
+# Usage: python -m metadata_converter.fanout
+#            dax-data-set-descriptors/ -t dlf out/dlf -t oah out/oah
+#
+
+
+class FanOut(object):
+    """
+    Renders several compiled templates from one values document.
+    Instances are immutable and can be shared by threads and sent
+    to worker processes.
+    """
+
+    def __init__(self, templates):
+        """
+        :param templates: target name -> compiled template
+        :type templates: dict
+        """
+
+        self.templates = dict(templates)
+        # distinct placeholders of all targets -> pre-split path
+        self.placeholders = {}
+        for template in self.templates.values():
+            for placeholder, path, _ in template.placeholders():
+                self.placeholders.setdefault(placeholder, path)
+
+    def resolve(self, values, index=None):
+        """
+        Look up the placeholders of all targets in values.
+
+        :param values: dict representation of a YAML document defining
+        placeholder values
+        :type values: dict
+        :param index: optional flat index of values, created by
+        metadata_converter.index.build_index(values)
+        :type index: dict
+        :raises ValueError: values is not of type dict
+        :return: placeholder -> value, None if it is not defined. Pass
+        it as `index` to CompiledTemplate.render()
+        :rtype: dict
+        """
+
+        if not isinstance(values, dict):
+            raise ValueError('Parameter \'values\' must be of type '
+                             '\'dict\' not {}.'.format(type(values)))
+        if index is not None:
+            return {placeholder: index.get(placeholder)
+                    for placeholder in self.placeholders}
+        resolved = {}
+        for placeholder, path in self.placeholders.items():
+            value = values
+            for property in path:
+                # paths through scalars and lists are not found; only
+                # the targets that reference them fail to render
+                if not isinstance(value, dict):
+                    value = None
+                    break
+                value = value.get(property)
+            resolved[placeholder] = value
+        return resolved
+
+    def render(self, values, stats=None, index=None):
+        """
+        Replace the {{...}} placeholders of all targets with values.
+
+        :param values: dict representation of a YAML document defining
+        placeholder values
+        :type values: dict
+        :param stats: optional statistics, which are updated with the
+        time spent resolving placeholders and rendering the targets
+        :type stats: metadata_converter.stats.ConversionStats
+        :param index: optional flat index of values, created by
+        metadata_converter.index.build_index(values)
+        :type index: dict
+        :raises PlaceholderNotFoundError: a {{...}} placeholder of a
+        target was not found in values
+        :raises ValueError: values is not of type dict
+        :return: target name -> completed template
+        :rtype: dict
+        """
+
+        if values is None:
+            # nothing to do
+            return {name: None for name in self.templates}
+        with timed(stats, 'resolve'):
+            resolved = self.resolve(values, index=index)
+        return {name: template.render(values, stats=stats, index=resolved)
+                for name, template in self.templates.items()}
+
+
+def convert_file_targets(input_yaml, fanout, output_dirs, fast=True):
+    """
+    Complete all targets of fanout with values from input_yaml and
+    store each result in the output directory of its target, using
+    the name of input_yaml. Errors are reported per target in the
+    results instead of being raised.
+
+    :param input_yaml: YAML file containing placeholder values
+    :type input_yaml: str or pathlib.Path
+    :param fanout: targets
+    :type fanout: FanOut
+    :param output_dirs: target name -> output directory, which must exist
+    :type output_dirs: dict
+    :param fast: load input_yaml using the fast loader, see
+    metadata_converter.loaders.load_values
+    :type fast: bool
+    :return: one conversion outcome per target, in target order
+    :rtype: list
+    """
+
+    try:
+        in_yaml = load_values(input_yaml, fast=fast)
+        resolved = fanout.resolve(in_yaml)
+    except Exception as ex:
+        error = 'Error processing "{}": {}'.format(input_yaml, str(ex))
+        return [ConversionResult(str(input_yaml), None, error)
+                for name in fanout.templates]
+
+    results = []
+    for name, template in fanout.templates.items():
+        output = Path(output_dirs[name]) / Path(input_yaml).name
+        try:
+            out_yaml = template.render(in_yaml, index=resolved)
+            with open(output, 'w') as output_file:
+                yaml.dump(out_yaml, output_file)
+        except PlaceholderNotFoundError as pnfe:
+            results.append(ConversionResult(str(input_yaml), None,
+                                            '"{}" does not define property '
+                                            '"{}" (target "{}")'
+                                            .format(input_yaml,
+                                                    pnfe.placeholder,
+                                                    name)))
+            continue
+        except Exception as ex:
+            results.append(ConversionResult(str(input_yaml), None,
+                                            'Error processing "{}" '
+                                            '(target "{}"): {}'
+                                            .format(input_yaml,
+                                                    name,
+                                                    str(ex))))
+            continue
+        results.append(ConversionResult(str(input_yaml), str(output), None))
+    return results
+
+
+def convert_chunk_targets(output_dirs, fast, fanout, chunk):
+    return [convert_file_targets(input_yaml, fanout, output_dirs, fast=fast)
+            for input_yaml in chunk]
+
+
+def convert_files_targets(inputs,
+                          targets,
+                          workers=1,
+                          chunksize=16,
+                          fast=True):
+    """
+    Complete several templates with values from each input file and
+    store the results in one output directory per template. Each
+    input file is loaded once, and the placeholders that the templates
+    share are resolved once. A failed conversion does not stop
+    processing of the remaining inputs or targets.
+
+    :param inputs: file names, directory names or glob patterns
+    identifying YAML files containing placeholder values
+    :type inputs: list
+    :param targets: (target name, compiled template, output directory)
+    tuples; output directories are created if they do not exist
+    :type targets: list
+    :param workers: number of worker processes; None to use one
+    process per CPU, 1 to convert in the calling process
+    :type workers: int
+    :param chunksize: number of input files sent to a worker at a time
+    :type chunksize: int
+    :param fast: load input files using the fast loader, see
+    metadata_converter.loaders.load_values
+    :type fast: bool
+    :raises ValueError: target names are not unique, or workers or
+    chunksize is invalid
+    :return: one list of conversion outcomes (one per target, in target
+    order) per input file, in input order
+    :rtype: list
+    """
+
+    names = [name for name, _, _ in targets]
+    if len(set(names)) != len(names):
+        raise ValueError('Target names must be unique: {}.'.format(names))
+    fanout = FanOut((name, template) for name, template, _ in targets)
+    output_dirs = {name: output_dir for name, _, output_dir in targets}
+    for output_dir in output_dirs.values():
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    # None marks inputs that are yet to be converted
+    results = []
+    input_yamls = []
+    outputs = set()
+    for input_yaml in expand_inputs(inputs):
+        name = Path(input_yaml).name
+        if name in outputs:
+            # don't overwrite the output of a previous input
+            error = 'Error processing "{}": output file "{}" was ' \
+                    'already generated for another input' \
+                    .format(input_yaml, name)
+            results.append([ConversionResult(input_yaml, None, error)
+                            for _ in names])
+            continue
+        outputs.add(name)
+        results.append(None)
+        input_yamls.append(input_yaml)
+
+    converted = iter(list(map_chunks(partial(convert_chunk_targets,
+                                             output_dirs,
+                                             fast),
+                                     input_yamls,
+                                     fanout,
+                                     workers,
+                                     chunksize)))
+    return [next(converted) if result is None else result
+            for result in results]
+
+
+# Main entry point
+if __name__ == "__main__":
+
+    from argparse import ArgumentParser
+    from metadata_converter.generate import BUILTIN_TEMPLATES
+    from metadata_converter.generate import get_builtin_template
+    from metadata_converter.generate import load_compiled_template
+
+    parser = ArgumentParser(
+                description='Complete several templates using values '
+                            'from YAML files, and store the results of '
+                            'each template in its own directory.')
+    parser.add_argument('input_yaml', nargs='+',
+                        help='YAML files containing placeholder values, '
+                             'directories or glob patterns')
+    parser.add_argument('-t', '--target', nargs=2, action='append',
+                        required=True, metavar=('TEMPLATE', 'DIR'),
+                        help='Template file, or the name of a built-in '
+                             'template ({}), and the directory in which '
+                             'its results are stored. Can be specified '
+                             'multiple times.'
+                             .format(', '.join(sorted(BUILTIN_TEMPLATES))))
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='Number of worker processes. Specify 0 to '
+                             'use one process per CPU. Default: 1')
+    parser.add_argument('--chunk-size', type=int, default=16,
+                        help='Number of input files sent to a worker '
+                             'process at a time. Default: 16')
+    parser.add_argument('--fast-values', action='store_true',
+                        help='Load placeholder values using the fast '
+                             'safe YAML loader instead of the round-trip '
+                             'loader. Comments in placeholder values are '
+                             'not copied to the output.')
+    args = parser.parse_args()
+
+    targets = []
+    try:
+        for template, output_dir in args.target:
+            if template in BUILTIN_TEMPLATES:
+                compiled = get_builtin_template(template)
+            else:
+                compiled = load_compiled_template(template)
+            # the template as specified identifies the target
+            targets.append((template, compiled, output_dir))
+        results = convert_files_targets(args.input_yaml,
+                                        targets,
+                                        workers=args.workers or None,
+                                        chunksize=args.chunk_size,
+                                        fast=args.fast_values)
+    except FileNotFoundError as fnfe:
+        # A template file was not found
+        print(str(fnfe), file=sys.stderr)
+        sys.exit(1)
+    except ValueError as ve:
+        parser.error(str(ve))
+
+    converted = 0
+    failed = 0
+    for input_results in results:
+        for result in input_results:
+            if result.error is None:
+                converted = converted + 1
+            else:
+                failed = failed + 1
+                print(result.error, file=sys.stderr)
+    print('Completed {} of {} conversion(s) ({} file(s), {} target(s)).'
+          .format(converted, converted + failed, len(results), len(targets)))
+    sys.exit(1 if failed > 0 else 0)
@@ -14,19 +14,80 @@
 # limitations under the License.
 #
 
-from importlib_resources import files
-from metadata_converter.apply import replace
-from pathlib import Path
-from ruamel.yaml import YAML
+from metadata_converter.cache import TemplateCache
+from metadata_converter.emit import render_to_stream
+from metadata_converter.loaders import load_values
+from metadata_converter.loaders import ThreadLocalYAML
+from metadata_converter.stats import timed
 import io
 import sys
-import templates
 
-yaml = YAML()
-yaml.default_flow_style = False
+yaml = ThreadLocalYAML(default_flow_style=False)
 
+# Process-level cache of the compiled built-in templates
+builtin_templates = TemplateCache()
 
-def generate_dlf_yaml(in_yaml):
+# Size-bounded cache of compiled user-supplied templates
+user_templates = TemplateCache(maxsize=32)
+
+# Built-in template files, by template name
+BUILTIN_TEMPLATES = {
+    'dlf': 'dlf_out.yaml',
+    'oah': 'openaihub_out.yaml'
+}
+
+# Fan-out renderers of built-in templates, by tuple of template names
+builtin_fanouts = {}
+
+
+def load_compiled_template(template_path):
+    """
+    Load and compile a user-supplied template. Compiled templates
+    are cached until the template file changes.
+
+    :param template_path: template file location
+    :type template_path: str or pathlib.Path
+    :raises FileNotFoundError: the template file does not exist
+    :return: compiled template
+    :rtype: CompiledTemplate
+    """
+
+    return user_templates.get(template_path)
+
+
+def get_builtin_template(name):
+    """
+    Return a compiled built-in template.
+
+    :param name: template name, see BUILTIN_TEMPLATES
+    :type name: str
+    :raises ValueError: name is not the name of a built-in template
+    :return: compiled template
+    :rtype: CompiledTemplate
+    """
+
+    if name not in BUILTIN_TEMPLATES:
+        raise ValueError('Built-in template must be one of {} not \'{}\'.'
+                         .format(sorted(BUILTIN_TEMPLATES.keys()), name))
+    # the resource API and the templates package are imported on
+    # first use, to keep the import of this module fast
+    from importlib_resources import files
+    import templates
+
+    return builtin_templates.get(
+                files(templates).joinpath(BUILTIN_TEMPLATES[name]))
+
+
+def invalidate_template_cache():
+    """
+    Discard all cached built-in and user-supplied templates.
+    """
+
+    builtin_templates.invalidate()
+    user_templates.invalidate()
+
+
+def generate_dlf_yaml(in_yaml, stats=None, cache=None):
     """
     Generate DLF-compatible YAML configuration file using
     "templates/dlf_out.yaml" as template.
@@ -34,6 +95,11 @@ def generate_dlf_yaml(in_yaml):
     :param in_yaml: dict representation of a YAML document defining
     placeholder values in "templates/dlf_out.yaml"
     :type in_yaml: dict
+    :param stats: optional statistics, which are updated with the
+    time spent in each stage and with node, placeholder and byte counts
+    :type stats: metadata_converter.stats.ConversionStats
+    :param cache: optional render cache, which stores the YAML file
+    :type cache: metadata_converter.render_cache.RenderCache
     :raises PlaceholderNotFoundError: a {{...}} placeholder referenced
     in "templates/dlf_out.yaml" was not found
     :raises ValueError in_yaml is not of type dict
@@ -41,15 +107,26 @@ def generate_dlf_yaml(in_yaml):
     :rtype: str
     """
 
-    dlf_yaml_dict = generate_dlf_yaml_dict(in_yaml)
+    if cache is not None:
+        with timed(stats, 'load_template'):
+            dlf_template = get_builtin_template('dlf')
+        return cache.fetch(cache.key(dlf_template, in_yaml, 'yaml'),
+                           generate_dlf_yaml, in_yaml, stats=stats)
+
+    dlf_yaml_dict = generate_dlf_yaml_dict(in_yaml, stats=stats)
 
     buf = io.StringIO()
-    yaml.dump(dlf_yaml_dict, buf)
+    with timed(stats, 'dump'):
+        yaml.dump(dlf_yaml_dict, buf)
+
+    dlf_yaml_str = buf.getvalue()
+    if stats is not None:
+        stats.bytes_emitted += len(dlf_yaml_str.encode('utf-8'))
 
-    return buf.getvalue()
+    return dlf_yaml_str
 
 
-def generate_dlf_yaml_dict(in_yaml):
+def generate_dlf_yaml_dict(in_yaml, stats=None, cache=None):
     """
     Generate DLF-compatible YAML configuration using
     "templates/dlf_out.yaml" as template.
@@ -57,6 +134,11 @@ def generate_dlf_yaml_dict(in_yaml):
     :param in_yaml: dict representation of a YAML document defining
     placeholder values in "templates/dlf_out.yaml"
     :type in_yaml: dict
+    :param stats: optional statistics, which are updated with the
+    time spent in each stage and with node, placeholder and byte counts
+    :type stats: metadata_converter.stats.ConversionStats
+    :param cache: optional render cache
+    :type cache: metadata_converter.render_cache.RenderCache
     :raises PlaceholderNotFoundError: a {{...}} placeholder referenced
     in "templates/dlf_out.yaml" was not found
     :raises ValueError in_yaml is not of type dict
@@ -64,19 +146,50 @@ def generate_dlf_yaml_dict(in_yaml):
     :rtype: dict
     """
 
-    dlf_yaml = files(templates).joinpath('dlf_out.yaml')
+    # load the compiled template
+    with timed(stats, 'load_template'):
+        dlf_template = get_builtin_template('dlf')
 
-    # load the template YAML
-    dlf_template_yaml = yaml.load(dlf_yaml)
+    if cache is not None:
+        return cache.fetch(cache.key(dlf_template, in_yaml),
+                           dlf_template.render, in_yaml, stats=stats)
 
-    # replace placeholders in in_template_yaml with values from
-    # in_placeholder_yaml
-    dlf_yaml_dict = replace(in_yaml, dlf_template_yaml)
+    # replace placeholders in the template with values from in_yaml
+    dlf_yaml_dict = dlf_template.render(in_yaml, stats=stats)
 
     return dlf_yaml_dict
 
 
-def generate_oah_yaml(in_yaml):
+def write_dlf_yaml(in_yaml, stream, format='yaml', stats=None):
+    """
+    Write DLF-compatible configuration to stream using
+    "templates/dlf_out.yaml" as template. Unlike generate_dlf_yaml,
+    the output is written while the template is processed, without
+    creating the output in memory.
+
+    :param in_yaml: dict representation of a YAML document defining
+    placeholder values in "templates/dlf_out.yaml"
+    :type in_yaml: dict
+    :param stream: text stream
+    :type stream: file-like object
+    :param format: output format, 'yaml' or 'json'
+    :type format: str
+    :param stats: optional statistics, which are updated with the
+    time spent in each stage and with node and placeholder counts
+    :type stats: metadata_converter.stats.ConversionStats
+    :raises PlaceholderNotFoundError: a {{...}} placeholder referenced
+    in "templates/dlf_out.yaml" was not found
+    :raises ValueError in_yaml is not of type dict
+    """
+
+    with timed(stats, 'load_template'):
+        dlf_template = get_builtin_template('dlf')
+
+    render_to_stream(dlf_template, in_yaml, stream,
+                     format=format, stats=stats)
+
+
+def generate_oah_yaml(in_yaml, stats=None, cache=None):
     """
     Generate OpenAIHub-compatible YAML configuration file using
     "templates/openaihub_out.yaml" as template.
@@ -84,6 +197,11 @@ def generate_oah_yaml(in_yaml):
     :param in_yaml: dict representation of a YAML document defining
     placeholder values in "templates/openaihub_out.yaml"
     :type in_yaml: dict
+    :param stats: optional statistics, which are updated with the
+    time spent in each stage and with node, placeholder and byte counts
+    :type stats: metadata_converter.stats.ConversionStats
+    :param cache: optional render cache, which stores the YAML file
+    :type cache: metadata_converter.render_cache.RenderCache
     :raises PlaceholderNotFoundError: a {{...}} placeholder referenced
     in "templates/openaihub_out.yaml" was not found
     :raises ValueError in_yaml is not of type dict
@@ -91,15 +209,26 @@ def generate_oah_yaml(in_yaml):
     :rtype: str
     """
 
-    oah_yaml_dict = generate_oah_yaml_dict(in_yaml)
+    if cache is not None:
+        with timed(stats, 'load_template'):
+            oah_template = get_builtin_template('oah')
+        return cache.fetch(cache.key(oah_template, in_yaml, 'yaml'),
+                           generate_oah_yaml, in_yaml, stats=stats)
+
+    oah_yaml_dict = generate_oah_yaml_dict(in_yaml, stats=stats)
 
     buf = io.StringIO()
-    yaml.dump(oah_yaml_dict, buf)
+    with timed(stats, 'dump'):
+        yaml.dump(oah_yaml_dict, buf)
 
-    return buf.getvalue()
+    oah_yaml_str = buf.getvalue()
+    if stats is not None:
+        stats.bytes_emitted += len(oah_yaml_str.encode('utf-8'))
 
+    return oah_yaml_str
 
-def generate_oah_yaml_dict(in_yaml):
+
+def generate_oah_yaml_dict(in_yaml, stats=None, cache=None):
     """
     Generate OpenAIHub-compatible YAML configuration using
     "templates/openaihub_out.yaml" as template.
@@ -107,6 +236,11 @@ def generate_oah_yaml_dict(in_yaml):
     :param in_yaml: dict representation of a YAML document defining
     placeholder values in "templates/openaihub_out.yaml"
     :type in_yaml: dict
+    :param stats: optional statistics, which are updated with the
+    time spent in each stage and with node, placeholder and byte counts
+    :type stats: metadata_converter.stats.ConversionStats
+    :param cache: optional render cache
+    :type cache: metadata_converter.render_cache.RenderCache
     :raises PlaceholderNotFoundError: a {{...}} placeholder referenced
     in "templates/openaihub_out.yaml" was not found
     :raises ValueError in_yaml is not of type dict
@@ -114,17 +248,133 @@ def generate_oah_yaml_dict(in_yaml):
     :rtype: dict
     """
 
-    oah_yaml = files(templates).joinpath('openaihub_out.yaml')
+    # load the compiled template
+    with timed(stats, 'load_template'):
+        oah_template = get_builtin_template('oah')
 
-    oah_template_yaml = yaml.load(oah_yaml)
+    if cache is not None:
+        return cache.fetch(cache.key(oah_template, in_yaml),
+                           oah_template.render, in_yaml, stats=stats)
 
-    # replace placeholders in in_template_yaml with values from
-    # in_placeholder_yaml
-    oah_yaml_dict = replace(in_yaml, oah_template_yaml)
+    # replace placeholders in the template with values from in_yaml
+    oah_yaml_dict = oah_template.render(in_yaml, stats=stats)
 
     return oah_yaml_dict
 
 
+def write_oah_yaml(in_yaml, stream, format='yaml', stats=None):
+    """
+    Write OpenAIHub-compatible configuration to stream using
+    "templates/openaihub_out.yaml" as template. Unlike generate_oah_yaml,
+    the output is written while the template is processed, without
+    creating the output in memory.
+
+    :param in_yaml: dict representation of a YAML document defining
+    placeholder values in "templates/openaihub_out.yaml"
+    :type in_yaml: dict
+    :param stream: text stream
+    :type stream: file-like object
+    :param format: output format, 'yaml' or 'json'
+    :type format: str
+    :param stats: optional statistics, which are updated with the
+    time spent in each stage and with node and placeholder counts
+    :type stats: metadata_converter.stats.ConversionStats
+    :raises PlaceholderNotFoundError: a {{...}} placeholder referenced
+    in "templates/openaihub_out.yaml" was not found
+    :raises ValueError in_yaml is not of type dict
+    """
+
+    with timed(stats, 'load_template'):
+        oah_template = get_builtin_template('oah')
+
+    render_to_stream(oah_template, in_yaml, stream,
+                     format=format, stats=stats)
+
+
+def get_builtin_fanout(targets):
+    # Return a FanOut for built-in templates, which is created again
+    # if one of the compiled templates has been reloaded
+    from metadata_converter.fanout import FanOut
+
+    templates = [get_builtin_template(name) for name in targets]
+    fanout = builtin_fanouts.get(targets)
+    if fanout is None or\
+       any(fanout.templates[name] is not template
+           for name, template in zip(targets, templates)):
+        fanout = FanOut(zip(targets, templates))
+        builtin_fanouts[targets] = fanout
+    return fanout
+
+
+def generate_targets_yaml_dict(in_yaml, targets=None, stats=None):
+    """
+    Generate the configurations of several built-in templates in one
+    pass: placeholders that the templates share are resolved once.
+
+    :param in_yaml: dict representation of a YAML document defining
+    placeholder values in the templates
+    :type in_yaml: dict
+    :param targets: names of built-in templates, see BUILTIN_TEMPLATES.
+    Default: all built-in templates
+    :type targets: list
+    :param stats: optional statistics, which are updated with the
+    time spent in each stage and with node and placeholder counts
+    :type stats: metadata_converter.stats.ConversionStats
+    :raises PlaceholderNotFoundError: a {{...}} placeholder referenced
+    in a template was not found
+    :raises ValueError in_yaml is not of type dict, or a target is not
+    the name of a built-in template
+    :return: target name -> configuration
+    :rtype: dict
+    """
+
+    if targets is None:
+        targets = BUILTIN_TEMPLATES.keys()
+    with timed(stats, 'load_template'):
+        fanout = get_builtin_fanout(tuple(targets))
+
+    return fanout.render(in_yaml, stats=stats)
+
+
+def generate_targets_yaml(in_yaml, targets=None, stats=None):
+    """
+    Generate the YAML configuration files of several built-in templates
+    in one pass, see generate_targets_yaml_dict. Each file is identical
+    to the output of the target's generate_*_yaml function.
+
+    :param in_yaml: dict representation of a YAML document defining
+    placeholder values in the templates
+    :type in_yaml: dict
+    :param targets: names of built-in templates, see BUILTIN_TEMPLATES.
+    Default: all built-in templates
+    :type targets: list
+    :param stats: optional statistics, which are updated with the
+    time spent in each stage and with node, placeholder and byte counts
+    :type stats: metadata_converter.stats.ConversionStats
+    :raises PlaceholderNotFoundError: a {{...}} placeholder referenced
+    in a template was not found
+    :raises ValueError in_yaml is not of type dict, or a target is not
+    the name of a built-in template
+    :return: target name -> YAML file
+    :rtype: dict
+    """
+
+    yaml_dicts = generate_targets_yaml_dict(in_yaml,
+                                            targets=targets,
+                                            stats=stats)
+
+    yaml_strs = {}
+    for name, yaml_dict in yaml_dicts.items():
+        buf = io.StringIO()
+        with timed(stats, 'dump'):
+            yaml.dump(yaml_dict, buf)
+        yaml_strs[name] = buf.getvalue()
+        if stats is not None:
+            stats.bytes_emitted += len(yaml_strs[name].encode('utf-8'))
+
+    return yaml_strs
+
+
 #
 # This example illustrates how to invoke the exchange metadata converter
 # programmatically, using the DLF and OpenAIHub templates
@@ -140,7 +390,9 @@ if __name__ == "__main__":
                           '/path/to/placeholder/yaml'))
             sys.exit(1)
 
-        placeholder_yaml = yaml.load(Path(sys.argv[1]))
+        # the round-trip loader preserves comments, which are copied
+        # to the output together with the values
+        placeholder_yaml = load_values(sys.argv[1], fast=False)
 
         # print template yamls with replacements in place
         print('Generated DLF YAML dict: \n{}'
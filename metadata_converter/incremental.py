@@ -0,0 +1,192 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import interpolate
+from metadata_converter.apply import PlaceholderNotFoundError
+
+#
+# Incremental rendering. The first render of a compiled template records
+# where each placeholder value is stored in the output. If some values
+# change, only the output locations that depend on them are updated, so
+# the cost of an update depends on the size of the change rather than
+# on the size of the template.
+#
+
+
+def prefixes(placeholder):
+    # 'a.b.c' -> ['a', 'a.b', 'a.b.c']
+    parts = placeholder.split('.')
+    return ['.'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+class IncrementalRender(object):
+    """
+    Output of a compiled template that can be updated when values
+    change. The completed template is available as `output`.
+    """
+
+    def __init__(self, template, values, index=None):
+        """
+        Render template.
+
+        :param template: compiled template
+        :type template: CompiledTemplate
+        :param values: dict representation of a YAML document defining
+        placeholder values
+        :type values: dict
+        :param index: optional flat index of values, created by
+        metadata_converter.index.build_index(values)
+        :type index: dict
+        :raises PlaceholderNotFoundError: a {{...}} placeholder in the
+        template was not found in values
+        :raises ValueError: values is not of type dict
+        """
+
+        self.template = template
+        dependencies = []
+        self.output = template.render(values,
+                                      index=index,
+                                      dependencies=dependencies)
+        # placeholder -> locations in the output
+        self.locations = {}
+        # dotted path -> placeholders that it is a prefix of
+        self.dependents = {}
+        for dependency in dependencies:
+            placeholder = dependency[3]
+            locations = self.locations.get(placeholder)
+            if locations is None:
+                locations = self.locations[placeholder] = []
+                for prefix in prefixes(placeholder):
+                    self.dependents.setdefault(prefix, []).append(
+                                                            placeholder)
+            locations.append(dependency)
+
+    def affected(self, changed_paths):
+        """
+        Return the placeholders whose values depend on changed_paths:
+        placeholders that reference a changed path, a property within
+        it, or a property that contains it.
+
+        :param changed_paths: dotted paths of changed values
+        :type changed_paths: iterable
+        :return: placeholders
+        :rtype: set
+        """
+
+        placeholders = set()
+        for changed_path in changed_paths:
+            placeholders.update(self.dependents.get(changed_path, ()))
+            for prefix in prefixes(changed_path)[:-1]:
+                if prefix in self.locations:
+                    placeholders.add(prefix)
+        return placeholders
+
+    def update(self, values, changed_paths, index=None):
+        """
+        Update the output for the changed values. Values must define
+        all placeholders; only the placeholders that depend on
+        changed_paths are resolved. If a placeholder is not found, the
+        output is left unchanged.
+
+        :param values: dict representation of the updated YAML document
+        defining placeholder values
+        :type values: dict
+        :param changed_paths: dotted paths of the values that were changed,
+        added or removed, e.g. ['version', 'repository.url']
+        :type changed_paths: iterable
+        :param index: optional flat index of values, created by
+        metadata_converter.index.build_index(values)
+        :type index: dict
+        :raises PlaceholderNotFoundError: a {{...}} placeholder that
+        depends on changed_paths was not found in values
+        :raises ValueError: values is not of type dict
+        :return: output paths (tuples of keys and list indexes) that
+        were updated
+        :rtype: list
+        """
+
+        if not isinstance(values, dict):
+            raise ValueError('Parameter \'values\' must be of type '
+                             '\'dict\' not {}.'.format(type(values)))
+
+        # resolve all affected placeholders before the output is changed
+        patches = []
+        # strings with several placeholders are formatted once
+        formatted = set()
+        for placeholder in self.affected(changed_paths):
+            locations = self.locations[placeholder]
+            path = locations[0][4]
+            if index is None:
+                value = values
+                for property in path:
+                    if not isinstance(value, dict):
+                        value = None
+                        break
+                    value = value.get(property)
+            else:
+                value = index.get(placeholder)
+            for container, key, output_path, _, _, optional, format in \
+                    locations:
+                if format is None:
+                    if value is None and not optional:
+                        raise PlaceholderNotFoundError(placeholder)
+                    patches.append((container, key, output_path, value))
+                elif (id(container), key) not in formatted:
+                    formatted.add((id(container), key))
+                    string, missing = interpolate(format[0], format[1],
+                                                  values, index)
+                    if string is None and not optional:
+                        raise PlaceholderNotFoundError(missing[0])
+                    patches.append((container, key, output_path, string))
+
+        updated = []
+        for container, key, output_path, value in patches:
+            container[key] = value
+            updated.append(output_path)
+        return updated
+
+
+def changed_paths(old_values, new_values):
+    """
+    Return the dotted paths of the properties that differ between two
+    values documents. Properties that are dicts in both documents are
+    compared property by property; other properties are reported if
+    they are not equal, added or removed. Dicts that are shared by both
+    documents (the same object) are assumed to be unchanged.
+
+    :param old_values: dict representation of the previous document
+    :type old_values: dict
+    :param new_values: dict representation of the current document
+    :type new_values: dict
+    :return: dotted paths
+    :rtype: list
+    """
+
+    changed = []
+    stack = [('', old_values, new_values)]
+    while stack:
+        prefix, old, new = stack.pop()
+        for key in set(old.keys()) | set(new.keys()):
+            if not isinstance(key, str) or '.' in key:
+                # cannot be referenced by a placeholder
+                continue
+            old_value = old.get(key)
+            new_value = new.get(key)
+            if isinstance(old_value, dict) and isinstance(new_value, dict):
+                if old_value is not new_value:
+                    stack.append((prefix + key + '.', old_value, new_value))
+            elif key not in old or key not in new or old_value != new_value:
+                changed.append(prefix + key)
+    return sorted(changed)
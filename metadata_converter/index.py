@@ -0,0 +1,59 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+# Flat index of a placeholder values document, which maps the dotted
+# path of every property (e.g. 'repository.url') to its value. Build it
+# once per values document and pass it as `index` to replace(),
+# CompiledTemplate.render() or render_to_stream() to resolve each
+# {{...}} placeholder with a single dict lookup, instead of walking
+# the document from the top.
+#
+
+
+def build_index(values):
+    """Create the dotted path index of values
+
+    Properties are indexed if they can be referenced by a placeholder,
+    i.e. if their key is a string that does not contain '.', and all
+    enclosing properties are dicts. Values in lists are not indexed.
+
+    :param values: dict representation of a YAML document defining
+    placeholder values
+    :type values: dict
+    :raises ValueError: values is not of type dict
+    :return: dotted path -> value
+    :rtype: dict
+    """
+
+    if not isinstance(values, dict):
+        raise ValueError('Parameter \'values\' must be of type '
+                         '\'dict\' not {}.'.format(type(values)))
+
+    index = {}
+    # (path prefix, dict, ids of the dict and its ancestors); YAML
+    # aliases can make a dict contain itself
+    stack = [('', values, (id(values),))]
+    while stack:
+        prefix, mapping, ancestors = stack.pop()
+        for key, value in mapping.items():
+            if not isinstance(key, str) or '.' in key:
+                continue
+            path = prefix + key
+            index[path] = value
+            if isinstance(value, dict) and id(value) not in ancestors:
+                stack.append((path + '.', value, ancestors + (id(value),)))
+    return index
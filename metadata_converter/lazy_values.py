@@ -0,0 +1,256 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.loaders import JSON_SUFFIXES
+from metadata_converter.loaders import load_values
+from metadata_converter.loaders import template_yaml
+from metadata_converter.loaders import values_yaml
+from pathlib import Path
+import mmap
+import re
+
+#
+# Lazy loading of large placeholder values files. The file is memory
+# mapped and indexed by its top-level properties, which start at
+# column 0 in block style YAML documents. Only the top-level properties
+# that a template references are parsed; the others (e.g. a 'content'
+# list with millions of entries) are neither read into a string nor
+# loaded.
+#
+# Documents that do not have this structure, or cannot be split
+# safely, are loaded completely, with the same result as
+# metadata_converter.loaders.load_values. These include JSON files,
+# flow style documents, multi-document streams, documents with merge
+# keys ('<<') or duplicate top-level properties, and properties that
+# refer to anchors defined elsewhere. Following the YAML specification,
+# lines that continue a nested value must be indented.
+#
+
+# Lines that start at column 0 and may start a top-level property:
+# not indented, not blank, not a comment, not a block sequence item
+# ('- ...', 'key:' may be followed by a list at column 0)
+top_level_line_pattern = re.compile(rb'^(?![ \t\r\n#]|-[ \t\r\n])[^\r\n]+',
+                                    re.MULTILINE)
+
+# A top-level property defined using a plain (unquoted) key, followed
+# by the value in the same line
+key_pattern = re.compile(rb'([^\s\'"?{}\[\],&*!|>%@`#:-]'
+                         rb'(?:[^:\r\n]|:(?=[^\s]))*?)'
+                         rb'[ \t]*:(?:[ \t]+(.*))?$')
+
+# Lines that neither contain content nor start the document
+blank_pattern = re.compile(rb'\A(?:[ \t]*(?:#[^\n]*)?\r?\n)*'
+                           rb'(?:---[ \t]*(?:#[^\n]*)?\r?\n'
+                           rb'(?:[ \t]*(?:#[^\n]*)?\r?\n)*)?')
+
+
+def referenced_properties(templates):
+    """
+    Return the top-level properties of a placeholder values document
+    that compiled templates reference, e.g. 'repository' for
+    {{repository.url}}.
+
+    :param templates: compiled templates
+    :type templates: list
+    :return: property names
+    :rtype: set
+    """
+
+    properties = set()
+    for template in templates:
+        for _, path, _ in template.placeholders():
+            properties.add(path[0])
+    return properties
+
+
+class LazyValues(object):
+    """
+    A memory-mapped placeholder values file whose top-level properties
+    are loaded on demand. Instances can be used as context managers,
+    which close the file when the context is left.
+    """
+
+    def __init__(self, source, fast=True):
+        """
+        :param source: YAML or JSON file
+        :type source: str or pathlib.Path
+        :param fast: load properties using the fast loader, see
+        metadata_converter.loaders.load_values
+        :type fast: bool
+        :raises FileNotFoundError: the file was not found
+        """
+
+        self.source = Path(source)
+        self.fast = fast
+        self.document = None
+        self._mmap = None
+        # top-level property -> (start offset, end offset), in
+        # document order; None if the file cannot be indexed
+        self.spans = None
+        with self.source.open('rb') as values_file:
+            if self.source.suffix.lower() in JSON_SUFFIXES:
+                return
+            try:
+                self._mmap = mmap.mmap(values_file.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file
+                return
+        self.spans = self._index()
+
+    def _index(self):
+        # offsets of the top-level properties, or None if the document
+        # must be loaded completely
+        data = self._mmap
+        if data[:3] == b'\xef\xbb\xbf':
+            # byte order mark
+            return None
+        spans = {}
+        key = None
+        start = None
+        header = blank_pattern.match(data).end()
+        for match in top_level_line_pattern.finditer(data):
+            if key is None and match.start() < header:
+                # comment or '---' before the first property
+                continue
+            line = match.group(0)
+            key_match = key_pattern.match(line)
+            if key_match is None:
+                # '---', '...', directives, flow style or quoted keys,
+                # content before the first property or unindented
+                # continuation lines
+                return None
+            if key is None and match.start() != header:
+                # indented content before the first property
+                return None
+            if key is not None:
+                spans[key] = (start, match.start())
+            key = key_match.group(1).decode('utf-8')
+            if key in spans or key == '<<':
+                return None
+            value = key_match.group(2)
+            if value is not None and value[:1] in (b'"', b"'", b'[', b'{'):
+                # quoted or flow style values may continue in
+                # unindented lines; only accept those that end in
+                # the same line
+                try:
+                    values_yaml.load(line.decode('utf-8'))
+                except Exception:
+                    return None
+            start = match.start()
+        if key is None:
+            return None
+        spans[key] = (start, len(data))
+        return spans
+
+    @property
+    def properties(self):
+        """
+        The top-level properties, in document order, or None if the
+        file cannot be indexed.
+
+        :rtype: list
+        """
+
+        if self.spans is None:
+            return None
+        return list(self.spans.keys())
+
+    def load(self, properties=None):
+        """
+        Load top-level properties.
+
+        :param properties: names of the properties to load; properties
+        that the document does not define are ignored. Default: all
+        properties
+        :type properties: set
+        :return: dict representation of the document, containing the
+        requested properties in document order, or the complete
+        document if the file cannot be indexed
+        :rtype: dict
+        """
+
+        if self.spans is None or properties is None:
+            return self._load_all()
+        loader = values_yaml if self.fast else template_yaml
+        values = {}
+        for key, (start, end) in self.spans.items():
+            if key not in properties:
+                continue
+            try:
+                loaded = loader.load(self._mmap[start:end].decode('utf-8'))
+            except Exception:
+                # e.g. an alias of an anchor in another property
+                return self._load_all()
+            if not isinstance(loaded, dict) or list(loaded.keys()) != [key]:
+                return self._load_all()
+            values[key] = loaded[key]
+        return values
+
+    def load_for(self, templates):
+        """
+        Load the top-level properties that compiled templates reference.
+
+        :param templates: compiled templates
+        :type templates: list
+        :return: dict representation of the document, see load()
+        :rtype: dict
+        """
+
+        return self.load(referenced_properties(templates))
+
+    def _load_all(self):
+        if self.document is None:
+            self.document = load_values(self.source, fast=self.fast)
+        return self.document
+
+    def close(self):
+        """
+        Close the memory-mapped file.
+        """
+
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self.spans = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_lazy_values(source, templates, fast=True):
+    """
+    Load the top-level properties of a placeholder values file that
+    compiled templates reference. Rendering the templates using the
+    result produces the same output as rendering them using the
+    complete document.
+
+    :param source: YAML or JSON file
+    :type source: str or pathlib.Path
+    :param templates: compiled templates
+    :type templates: list
+    :param fast: use the fast loader, see
+    metadata_converter.loaders.load_values
+    :type fast: bool
+    :raises FileNotFoundError: the file was not found
+    :return: dict representation of the document, see LazyValues.load()
+    :rtype: dict
+    """
+
+    with LazyValues(source, fast=fast) as lazy_values:
+        return lazy_values.load_for(templates)
@@ -0,0 +1,531 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from collections import namedtuple
+from metadata_converter.annotations import ANNOTATION_FLAGS
+from metadata_converter.apply import get_metadata
+from metadata_converter.apply import placeholder_pattern
+from metadata_converter.batch import expand_inputs
+from metadata_converter.batch import map_chunks
+from metadata_converter.cache import fingerprint
+from metadata_converter.compiler import compile_template
+from metadata_converter.loaders import template_yaml
+from metadata_converter.render_cache import template_hash
+from metadata_converter.validate import Validator
+import hashlib
+import json
+import os
+import sys
+
+#
+# Linter for templates and placeholder values documents (descriptors).
+# Files are checked for
+#  - trailing whitespace (trailing-whitespace)
+#  - YAML syntax errors (yaml-syntax) and duplicate keys (duplicate-key)
+#  - templates: properties that cannot be compiled (template-error),
+#    unknown annotations, e.g. @bogus (unknown-annotation) and
+#    malformed placeholders, e.g. {{ name }} (malformed-placeholder)
+#  - descriptors: documents that are not mappings (not-a-mapping) and
+#    placeholders of required templates that are not defined
+#    (missing-placeholder)
+# Files are linted in parallel. Results can be stored in a cache file;
+# files that have not changed since are not linted again.
+#
+# Usage: python -m metadata_converter.lint -t templates/
+#            -d dax-data-set-descriptors/ -r dlf -r oah
+#            [--cache .lint-cache.json] [-j 0]
+#
+
+# Version of the checks and of the cache file format; cached results
+# of other versions are ignored
+LINT_VERSION = 2
+
+# File kinds
+TEMPLATE = 'template'
+DESCRIPTOR = 'descriptor'
+
+# A problem in a file; line and column are 1-based, or None if the
+# problem does not have a location
+Problem = namedtuple('Problem', ['file', 'line', 'column', 'code', 'message'])
+
+
+def format_problem(problem):
+    """
+    Format a problem as "file:line:column: code message".
+
+    :param problem: problem
+    :type problem: Problem
+    :rtype: str
+    """
+
+    return '{}:{}:{}: {} {}'.format(problem.file,
+                                    problem.line or 1,
+                                    problem.column or 1,
+                                    problem.code,
+                                    problem.message)
+
+
+def iter_properties(document):
+    # Yield (container, key or index, value, line, column) for every
+    # property and list item of a round-trip document, with 0-based
+    # positions of the value (or None if unknown)
+    stack = [document]
+    seen = set()
+    while stack:
+        container = stack.pop()
+        if id(container) in seen:
+            # YAML aliases
+            continue
+        seen.add(id(container))
+        if isinstance(container, dict):
+            items = container.items()
+        else:
+            items = enumerate(container)
+        for key, value in items:
+            position = None
+            lc = getattr(container, 'lc', None)
+            if lc is not None:
+                try:
+                    if isinstance(container, dict):
+                        position = lc.value(key)
+                    else:
+                        position = lc.item(key)
+                except (KeyError, TypeError):
+                    position = None
+            line, column = position if position is not None else (None, None)
+            yield container, key, value, line, column
+            if isinstance(value, (dict, list)):
+                stack.append(value)
+
+
+def one_based(position):
+    return None if position is None else position + 1
+
+
+class Linter(object):
+    """
+    Lints templates and descriptors. Instances are immutable and can
+    be sent to worker processes.
+    """
+
+    def __init__(self, required_templates=None):
+        """
+        :param required_templates: template name -> compiled template;
+        descriptors must define the required placeholders of these
+        templates. Default: no templates
+        :type required_templates: dict
+        """
+
+        required_templates = dict(required_templates or {})
+        self.validator = None
+        if len(required_templates) > 0:
+            self.validator = Validator(required_templates)
+        # identifies the checks, for the results cache
+        digest = hashlib.sha256(str(LINT_VERSION).encode('utf-8'))
+        for name in sorted(required_templates):
+            digest.update(b'\0' + name.encode('utf-8') + b'\0')
+            digest.update(template_hash(
+                            required_templates[name]).encode('utf-8'))
+        self.settings = digest.hexdigest()
+
+    def lint_file(self, file_name, kind):
+        """
+        Lint a file.
+
+        :param file_name: file name
+        :type file_name: str
+        :param kind: TEMPLATE or DESCRIPTOR
+        :type kind: str
+        :return: problems, ordered by location
+        :rtype: list
+        """
+
+        try:
+            with open(file_name, 'r', encoding='utf-8') as lint_file:
+                text = lint_file.read()
+        except (OSError, UnicodeDecodeError) as ex:
+            return [Problem(file_name, None, None, 'read-error', str(ex))]
+        return self.lint_text(file_name, text, kind)
+
+    def lint_text(self, file_name, text, kind):
+        """
+        Lint the content of a file.
+
+        :param file_name: file name, which is used in problems
+        :type file_name: str
+        :param text: file content
+        :type text: str
+        :param kind: TEMPLATE or DESCRIPTOR
+        :type kind: str
+        :return: problems, ordered by location
+        :rtype: list
+        """
+
+        problems = []
+        for number, line in enumerate(text.splitlines(), 1):
+            stripped = line.rstrip()
+            if len(stripped) < len(line):
+                problems.append(Problem(file_name, number,
+                                        len(stripped) + 1,
+                                        'trailing-whitespace',
+                                        'trailing whitespace'))
+
+        documents = None
+        try:
+            duplicates = self.duplicate_keys(file_name, text)
+            if len(duplicates) > 0:
+                problems.extend(duplicates)
+            else:
+                documents = list(template_yaml.load_all(text))
+        except Exception as ex:
+            mark = getattr(ex, 'problem_mark', None)
+            message = ' '.join(part for part in
+                               [getattr(ex, 'context', None),
+                                getattr(ex, 'problem', None)]
+                               if part) or str(ex)
+            problems.append(Problem(file_name,
+                                    one_based(getattr(mark, 'line', None)),
+                                    one_based(getattr(mark, 'column',
+                                                      None)),
+                                    'yaml-syntax',
+                                    message))
+
+        if documents is not None:
+            for document in documents:
+                if kind == TEMPLATE:
+                    problems.extend(self.check_template(file_name, document))
+                else:
+                    problems.extend(self.check_descriptor(file_name,
+                                                          document))
+        return sorted(problems,
+                      key=lambda problem: (problem.line or 0,
+                                           problem.column or 0))
+
+    def duplicate_keys(self, file_name, text):
+        # Report all duplicate mapping keys; loading only reports the
+        # first one
+        problems = []
+        stack = list(template_yaml.instance.compose_all(text))
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node is None or id(node) in seen:
+                continue
+            seen.add(id(node))
+            if node.id == 'mapping':
+                keys = {}
+                for key_node, value_node in node.value:
+                    if key_node.id == 'scalar':
+                        key = (key_node.tag, key_node.value)
+                        first = keys.get(key)
+                        if first is None:
+                            keys[key] = key_node
+                        else:
+                            problems.append(Problem(
+                                file_name,
+                                key_node.start_mark.line + 1,
+                                key_node.start_mark.column + 1,
+                                'duplicate-key',
+                                'duplicate key "{}" (first defined in '
+                                'line {})'.format(key_node.value,
+                                                  first.start_mark.line
+                                                  + 1)))
+                    stack.append(key_node)
+                    stack.append(value_node)
+            elif node.id == 'sequence':
+                stack.extend(node.value)
+        return problems
+
+    def check_template(self, file_name, document):
+        problems = []
+        if document is None:
+            return problems
+        try:
+            compile_template(document)
+        except (NotImplementedError, ValueError) as ex:
+            problems.append(Problem(file_name, None, None,
+                                    'template-error', str(ex)))
+        if not isinstance(document, (dict, list)):
+            return problems
+        for container, key, value, line, column in \
+                iter_properties(document):
+            if isinstance(container, dict):
+                metadata = get_metadata(container, key)
+                if metadata is not None:
+                    for annotation in sorted(metadata.annotations):
+                        if annotation not in ANNOTATION_FLAGS:
+                            problems.append(Problem(
+                                file_name,
+                                one_based(line),
+                                None,
+                                'unknown-annotation',
+                                'unknown annotation "@{}" of property '
+                                '"{}"'.format(annotation, key)))
+            if not isinstance(value, str) or\
+               ('{{' not in value and '}}' not in value):
+                continue
+            placeholders = placeholder_pattern.findall(value)
+            if len(placeholders) < max(value.count('{{'),
+                                       value.count('}}')):
+                problems.append(Problem(file_name,
+                                        one_based(line),
+                                        one_based(column),
+                                        'malformed-placeholder',
+                                        'malformed placeholder in "{}"; '
+                                        'placeholders must look like '
+                                        '{{{{name}}}} or {{{{name.property}}}}'
+                                        .format(value)))
+        return problems
+
+    def check_descriptor(self, file_name, document):
+        problems = []
+        if document is None:
+            return problems
+        if not isinstance(document, dict):
+            return [Problem(file_name, None, None, 'not-a-mapping',
+                            'the document is a {}, not a mapping'
+                            .format(type(document).__name__))]
+        if self.validator is None:
+            return problems
+        line = None
+        lc = getattr(document, 'lc', None)
+        if lc is not None:
+            line = one_based(lc.line)
+        missing, _ = self.validator.check(document)
+        for name, placeholders in missing.items():
+            for placeholder in placeholders:
+                problems.append(Problem(file_name, line, None,
+                                        'missing-placeholder',
+                                        '"{}" is not defined; it is '
+                                        'required by template "{}"'
+                                        .format(placeholder, name)))
+        return problems
+
+
+class LintCache(object):
+    """
+    Persisted lint results, keyed by file name and kind. A result is
+    reused if the file (and the linter settings) have not changed.
+    """
+
+    def __init__(self, cache_file=None):
+        """
+        :param cache_file: JSON file; it is read if it exists. If None,
+        results are only kept in memory
+        :type cache_file: str or pathlib.Path
+        """
+
+        self.cache_file = cache_file
+        # 'kind:file name' -> {'fingerprint', 'settings', 'problems'}
+        self.entries = {}
+        if cache_file is None:
+            return
+        try:
+            with open(cache_file, 'r') as input_file:
+                document = json.load(input_file)
+        except (OSError, ValueError):
+            return
+        if isinstance(document, dict) and\
+           document.get('version') == LINT_VERSION:
+            self.entries = document.get('entries', {})
+
+    @staticmethod
+    def current_fingerprint(file_name):
+        try:
+            current = fingerprint(file_name)
+        except OSError:
+            return None
+        return list(current) if isinstance(current, tuple) else current
+
+    def get(self, file_name, kind, settings):
+        """
+        Return the cached problems of a file, or None if the file
+        must be linted.
+        """
+
+        entry = self.entries.get('{}:{}'.format(kind, file_name))
+        if entry is None or entry['settings'] != settings:
+            return None
+        current = self.current_fingerprint(file_name)
+        if current is None or entry['fingerprint'] != current:
+            return None
+        return [Problem(*problem) for problem in entry['problems']]
+
+    def put(self, file_name, kind, settings, file_fingerprint, problems):
+        """
+        Store the problems of a file that had file_fingerprint when it
+        was linted.
+        """
+
+        if file_fingerprint is None:
+            return
+        self.entries['{}:{}'.format(kind, file_name)] = {
+            'fingerprint': file_fingerprint,
+            'settings': settings,
+            'problems': [list(problem) for problem in problems]
+        }
+
+    def save(self):
+        """
+        Save the cache file, without the entries of files that no
+        longer exist.
+        """
+
+        if self.cache_file is None:
+            return
+        entries = {key: entry for key, entry in self.entries.items()
+                   if os.path.exists(key.split(':', 1)[1])}
+        document = {'version': LINT_VERSION, 'entries': entries}
+        # write to a temporary file first, so that readers never
+        # see an incomplete cache
+        tmp_file = '{}.tmp{}'.format(self.cache_file, os.getpid())
+        with open(tmp_file, 'w') as output_file:
+            json.dump(document, output_file)
+        os.replace(tmp_file, self.cache_file)
+
+
+def lint_chunk(linter, chunk):
+    # the fingerprint is taken before the file is read, so that
+    # changes made while it is linted invalidate the result
+    results = []
+    for file_name, kind in chunk:
+        current = LintCache.current_fingerprint(file_name)
+        results.append((current, linter.lint_file(file_name, kind)))
+    return results
+
+
+def lint_files(templates=(), descriptors=(), linter=None, workers=1,
+               chunksize=16, cache=None):
+    """
+    Lint template and descriptor files, in parallel if workers is not 1.
+
+    :param templates: template file names, directory names or glob
+    patterns
+    :type templates: list
+    :param descriptors: descriptor file names, directory names or glob
+    patterns
+    :type descriptors: list
+    :param linter: linter; default: a Linter without required templates
+    :type linter: Linter
+    :param workers: number of worker processes; None to use one
+    process per CPU, 1 to lint in the calling process
+    :type workers: int
+    :param chunksize: number of files sent to a worker at a time
+    :type chunksize: int
+    :param cache: results of previous runs, which is updated; the
+    caller saves it
+    :type cache: LintCache
+    :raises ValueError: workers or chunksize is invalid
+    :return: (number of files that were linted, number of files whose
+    results were cached, problems in file order)
+    :rtype: tuple
+    """
+
+    if linter is None:
+        linter = Linter()
+    files = [(file_name, TEMPLATE) for file_name in expand_inputs(templates)]
+    files.extend((file_name, DESCRIPTOR)
+                 for file_name in expand_inputs(descriptors))
+
+    results = {}
+    pending = []
+    for file_name, kind in files:
+        cached = None
+        if cache is not None:
+            cached = cache.get(file_name, kind, linter.settings)
+        if cached is None:
+            pending.append((file_name, kind))
+        else:
+            results[(file_name, kind)] = cached
+
+    linted = map_chunks(lint_chunk, pending, linter, workers, chunksize)
+    for (file_name, kind), (current, problems) in zip(pending, linted):
+        results[(file_name, kind)] = problems
+        if cache is not None:
+            cache.put(file_name, kind, linter.settings, current, problems)
+
+    problems = []
+    for file_key in files:
+        problems.extend(results[file_key])
+    return len(pending), len(files) - len(pending), problems
+
+
+# Main entry point
+if __name__ == "__main__":
+
+    from argparse import ArgumentParser
+    from metadata_converter.generate import BUILTIN_TEMPLATES
+    from metadata_converter.generate import get_builtin_template
+    from metadata_converter.generate import load_compiled_template
+
+    parser = ArgumentParser(
+                description='Lint templates and placeholder values '
+                            'files (descriptors).')
+    parser.add_argument('-t', '--templates', nargs='+', default=[],
+                        help='Template files, directories or glob '
+                             'patterns')
+    parser.add_argument('-d', '--descriptors', nargs='+', default=[],
+                        help='Descriptor files, directories or glob '
+                             'patterns')
+    parser.add_argument('-r', '--require', action='append', default=[],
+                        help='Template file, or the name of a built-in '
+                             'template ({}), whose required placeholders '
+                             'descriptors must define. Can be specified '
+                             'multiple times.'
+                             .format(', '.join(sorted(BUILTIN_TEMPLATES))))
+    parser.add_argument('-j', '--workers', type=int, default=0,
+                        help='Number of worker processes. Specify 0 to '
+                             'use one process per CPU. Default: 0')
+    parser.add_argument('--chunk-size', type=int, default=16,
+                        help='Number of files sent to a worker process '
+                             'at a time. Default: 16')
+    parser.add_argument('--cache', default=None,
+                        help='Results cache file. Files that have not '
+                             'changed since they were last linted are '
+                             'not linted again.')
+    args = parser.parse_args()
+
+    if len(args.templates) == 0 and len(args.descriptors) == 0:
+        parser.error('at least one of -t/--templates and '
+                     '-d/--descriptors is required')
+
+    required_templates = {}
+    try:
+        for template in args.require:
+            if template in BUILTIN_TEMPLATES:
+                required_templates[template] = get_builtin_template(template)
+            else:
+                required_templates[template] = load_compiled_template(template)
+        cache = LintCache(args.cache)
+        linted, cached, problems = lint_files(args.templates,
+                                              args.descriptors,
+                                              Linter(required_templates),
+                                              workers=args.workers or None,
+                                              chunksize=args.chunk_size,
+                                              cache=cache)
+        cache.save()
+    except FileNotFoundError as fnfe:
+        # A required template file was not found
+        print(str(fnfe), file=sys.stderr)
+        sys.exit(1)
+    except ValueError as ve:
+        parser.error(str(ve))
+
+    for problem in problems:
+        print(format_problem(problem))
+    print('Linted {} file(s), {} unchanged file(s) skipped, {} problem(s).'
+          .format(linted, cached, len(problems)),
+          file=sys.stderr)
+    sys.exit(1 if len(problems) > 0 else 0)
@@ -0,0 +1,149 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from pathlib import Path
+import json
+import threading
+
+
+class ThreadLocalYAML(object):
+    """
+    Provides one ruamel.yaml YAML instance per thread. YAML instances
+    keep parser and emitter state while loading and dumping, and must
+    not be used by multiple threads at the same time. The settings are
+    fixed at construction time; each thread creates its own instance
+    with these settings when it first uses the ThreadLocalYAML.
+    ruamel.yaml is imported when the first instance is created.
+    """
+
+    def __init__(self, typ='rt', indent=None, **settings):
+        """
+        :param typ: YAML instance type, e.g. 'rt' or 'safe'
+        :type typ: str
+        :param indent: keyword arguments of YAML.indent()
+        :type indent: dict
+        :param settings: YAML instance attributes, such as
+        default_flow_style or explicit_start
+        """
+
+        self.typ = typ
+        self.indent = tuple(sorted((indent or {}).items()))
+        self.settings = tuple(sorted(settings.items()))
+        self._local = threading.local()
+
+    @property
+    def instance(self):
+        """
+        The YAML instance of the current thread.
+
+        :rtype: ruamel.yaml.YAML
+        """
+
+        instance = getattr(self._local, 'instance', None)
+        if instance is None:
+            from ruamel.yaml import YAML
+
+            instance = YAML(typ=self.typ)
+            if len(self.indent) > 0:
+                instance.indent(**dict(self.indent))
+            for name, value in self.settings:
+                setattr(instance, name, value)
+            self._local.instance = instance
+        return instance
+
+    def load(self, stream):
+        return self.instance.load(stream)
+
+    def load_all(self, stream):
+        return self.instance.load_all(stream)
+
+    def dump(self, data, stream):
+        self.instance.dump(data, stream)
+
+    def dump_all(self, documents, stream):
+        self.instance.dump_all(documents, stream)
+
+
+# Templates are loaded using the round-trip loader, which preserves
+# the comments that carry annotations, such as @optional.
+template_yaml = ThreadLocalYAML()
+
+# Placeholder values documents are loaded using the safe loader,
+# which is C-accelerated if ruamel.yaml.clib is installed and does
+# not attach comment information to the loaded documents.
+values_yaml = ThreadLocalYAML(typ='safe')
+
+# Files with these extensions are loaded using the json module
+JSON_SUFFIXES = ['.json']
+
+
+def load_template(source):
+    """
+    Load a template, preserving comments.
+
+    :param source: template file or YAML text stream
+    :type source: str, pathlib.Path or file-like object
+    :raises FileNotFoundError: the template file was not found
+    :return: dict representation of the template
+    :rtype: ruamel.yaml.comments.CommentedMap
+    """
+
+    if isinstance(source, str):
+        source = Path(source)
+    return template_yaml.load(source)
+
+
+def load_values(source, fast=True):
+    """
+    Load a document defining placeholder values. JSON files (*.json)
+    are loaded using the json module. YAML documents are loaded
+    using the (C-accelerated) safe loader unless fast is False, in
+    which case the round-trip loader is used.
+
+    :param source: YAML or JSON file, or YAML text stream
+    :type source: str, pathlib.Path or file-like object
+    :param fast: use the fast loader
+    :type fast: bool
+    :raises FileNotFoundError: the file was not found
+    :return: dict representation of the document
+    :rtype: dict
+    """
+
+    if isinstance(source, str):
+        source = Path(source)
+    if isinstance(source, Path) and source.suffix.lower() in JSON_SUFFIXES:
+        with source.open('r') as json_file:
+            return json.load(json_file)
+    if fast:
+        return values_yaml.load(source)
+    return template_yaml.load(source)
+
+
+def load_all_values(stream, fast=True):
+    """
+    Load the documents defining placeholder values in a multi-document
+    YAML stream, one document at a time.
+
+    :param stream: YAML text stream
+    :type stream: file-like object
+    :param fast: use the fast loader
+    :type fast: bool
+    :return: dict representations of the documents
+    :rtype: iterator
+    """
+
+    if fast:
+        return values_yaml.load_all(stream)
+    return template_yaml.load_all(stream)
@@ -0,0 +1,384 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+import threading
+import weakref
+
+#
+# Content-addressed, on-disk cache of conversion results. Entries are
+# keyed on a hash of the template and a hash of the placeholder values
+# document, so a conversion whose template and values have not changed
+# is answered from the cache without rendering. Pass a RenderCache as
+# `cache` to replace() or to the generate_* functions.
+#
+# Entries are stored with pickle: only use cache directories that
+# are not writable by untrusted users.
+#
+
+# Default size limit of a cache directory (256 MiB)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# File name suffix of cache entries
+ENTRY_SUFFIX = '.pickle'
+
+# Version of the conversion results, which is part of every cache key;
+# increment it if the same template and values produce a different
+# result, e.g. 2: placeholders within strings are interpolated
+RESULT_VERSION = 2
+
+# Template hashes of compiled templates, which are immutable
+template_digests = weakref.WeakKeyDictionary()
+
+
+def comment_text(comment):
+    # Concatenate the text of ruamel comment tokens, which are
+    # stored in (nested) lists that may contain None
+    if comment is None:
+        return ''
+    if isinstance(comment, list):
+        return ''.join(comment_text(item) for item in comment)
+    return getattr(comment, 'value', '')
+
+
+class Token(object):
+    # Fixed part of the encoding of a container, which is queued
+    # (with the container items) by update_digest; if container_id is
+    # not None, the token closes that container
+    __slots__ = ('data', 'container_id')
+
+    def __init__(self, data, container_id=None):
+        self.data = data
+        self.container_id = container_id
+
+
+def update_digest(digest, value):
+    # Feed a canonical, type-tagged encoding of value to digest. Strings
+    # are length-prefixed, so that different documents cannot produce
+    # the same encoding. Mapping order is preserved because it
+    # determines the order of properties in the output.
+    # values still to be encoded (explicit stack, see compile_template())
+    stack = [value]
+    # ids of the open containers; YAML aliases can make a container
+    # contain itself
+    ancestors = set()
+    while stack:
+        value = stack.pop()
+        if value is None:
+            digest.update(b'N')
+        elif value is True:
+            digest.update(b'T')
+        elif value is False:
+            digest.update(b'F')
+        elif type(value) is str:
+            data = value.encode('utf-8')
+            digest.update(b's%d:' % len(data))
+            digest.update(data)
+        elif type(value) is int:
+            digest.update(b'i%d;' % value)
+        elif type(value) is float:
+            digest.update(b'f' + repr(value).encode('ascii') + b';')
+        elif type(value) is Token:
+            digest.update(value.data)
+            ancestors.discard(value.container_id)
+        elif isinstance(value, (dict, list, tuple)):
+            if id(value) in ancestors:
+                digest.update(b'R')
+                continue
+            ancestors.add(id(value))
+            # pending values are popped in reverse order
+            if isinstance(value, dict):
+                stack.append(Token(b'}', id(value)))
+                for key, item in reversed(list(value.items())):
+                    stack.append(item)
+                    stack.append(key)
+                stack.append(Token(b'{'))
+            else:
+                stack.append(Token(b']', id(value)))
+                stack.extend(reversed(value))
+                stack.append(Token(b'['))
+            if type(value) not in (dict, list, tuple):
+                # round-trip types, e.g. CommentedMap: their comments and
+                # formatting are emitted when the output is dumped
+                fa = getattr(value, 'fa', None)
+                if fa is not None:
+                    stack.append(fa.flow_style())
+                ca = getattr(value, 'ca', None)
+                if ca is not None:
+                    stack.append([comment_text(ca.comment)] +
+                                 [(key, comment_text(item))
+                                  for key, item in ca.items.items()])
+                stack.append(type(value).__name__)
+        else:
+            # dates, timestamps and subclasses of str, int and float, such
+            # as ruamel scalar types, which preserve the scalar style
+            stack.append(repr(value))
+            stack.append('{}.{}'.format(type(value).__module__,
+                                        type(value).__qualname__))
+
+
+def values_hash(values):
+    """
+    Return a stable hash of a YAML document. Documents that are loaded
+    from the same YAML text have the same hash, in all processes.
+
+    :param values: dict representation of a YAML document
+    :type values: dict
+    :return: hex digest
+    :rtype: str
+    """
+
+    digest = hashlib.sha256()
+    update_digest(digest, values)
+    return digest.hexdigest()
+
+
+def template_hash(template):
+    """
+    Return a stable hash of a template. The hash of a compiled template
+    is computed once and then cached.
+
+    :param template: compiled template, or dict representation of a
+    template document, including its comments (annotations)
+    :type template: CompiledTemplate or dict
+    :return: hex digest
+    :rtype: str
+    """
+
+    instructions = getattr(template, 'instructions', None)
+    if instructions is None and isinstance(template, dict):
+        return values_hash(template)
+    digest = template_digests.get(template)
+    if digest is None:
+        digest = template_digests[template] = values_hash(
+                                            {'instructions': instructions})
+    return digest
+
+
+class RenderCache(object):
+    """
+    Thread-safe on-disk cache of conversion results, with a size limit.
+    Once the cache exceeds max_bytes or max_entries, the least recently
+    used entries are removed. Several processes can share a directory;
+    each one enforces the limits for the entries it knows about, which
+    are the entries that existed when the cache was opened and the
+    entries that it has stored.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES,
+                 max_entries=None):
+        """
+        :param directory: cache directory, which is created if it
+        does not exist
+        :type directory: str or pathlib.Path
+        :param max_bytes: maximum total size of the entries
+        :type max_bytes: int
+        :param max_entries: maximum number of entries. Default: no limit
+        :type max_entries: int
+        :raises ValueError: a limit is less than 1
+        """
+
+        if max_bytes is None or max_bytes < 1:
+            raise ValueError('Parameter \'max_bytes\' must be a positive '
+                             'integer not {}.'.format(max_bytes))
+        if max_entries is not None and max_entries < 1:
+            raise ValueError('Parameter \'max_entries\' must be a positive '
+                             'integer or None not {}.'.format(max_entries))
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> entry size, least recently used first
+        self._entries = OrderedDict()
+        self._size = 0
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(ENTRY_SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns,
+                                    entry.name[:-len(ENTRY_SUFFIX)],
+                                    stat.st_size))
+        # the modification time of an entry is its last use
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._size += size
+        with self._lock:
+            self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """
+        Total size of the entries in bytes.
+        """
+        return self._size
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def key(self, template, values, kind='render'):
+        """
+        Return the cache key of a conversion.
+
+        :param template: compiled template, or dict representation of a
+        template document
+        :type template: CompiledTemplate or dict
+        :param values: dict representation of a YAML document defining
+        placeholder values
+        :type values: dict
+        :param kind: type of result, e.g. 'render' for the output of a
+        template and 'yaml' for its YAML text
+        :type kind: str
+        :return: hex digest
+        :rtype: str
+        """
+
+        digest = hashlib.sha256()
+        for part in (str(RESULT_VERSION),
+                     kind,
+                     template_hash(template),
+                     values_hash(values)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key, default=None):
+        """
+        Return the result stored under key.
+
+        :param key: cache key, see key()
+        :type key: str
+        :param default: value returned if key is not in the cache
+        :return: the result, or default
+        """
+
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as entry_file:
+                data = entry_file.read()
+            result = pickle.loads(data)
+        except FileNotFoundError:
+            # not stored yet, or evicted by another process
+            with self._lock:
+                self.misses += 1
+                self._forget(key)
+            return default
+        except Exception:
+            # incomplete or incompatible entry
+            with self._lock:
+                self.misses += 1
+                self._remove(key)
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if key not in self._entries:
+                # stored by another process
+                self._entries[key] = len(data)
+                self._size += len(data)
+            self._entries.move_to_end(key)
+            self._evict()
+        return result
+
+    def put(self, key, result):
+        """
+        Store a result under key. Results that are larger than
+        max_bytes are not stored.
+
+        :param key: cache key, see key()
+        :type key: str
+        :param result: picklable result
+        """
+
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        path = self.entry_path(key)
+        # write to a temporary file first, so that readers never
+        # see an incomplete entry
+        tmp_file = '{}.tmp{}.{}'.format(path,
+                                        os.getpid(),
+                                        threading.get_ident())
+        with open(tmp_file, 'wb') as entry_file:
+            entry_file.write(data)
+        os.replace(tmp_file, path)
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = len(data)
+            self._size += len(data)
+            self._evict()
+
+    def fetch(self, key, function, *args, **kwargs):
+        """
+        Return the result stored under key, or call function(*args,
+        **kwargs) and store its result under key.
+
+        :param key: cache key, see key()
+        :type key: str
+        :param function: computes the result
+        :type function: callable
+        :return: the result
+        """
+
+        missing = self
+        result = self.get(key, missing)
+        if result is missing:
+            result = function(*args, **kwargs)
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        """
+        Remove all entries that this cache knows about.
+        """
+
+        with self._lock:
+            for key in list(self._entries.keys()):
+                self._remove(key)
+
+    def _forget(self, key):
+        # remove key from the LRU list; the lock must be held
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._size -= size
+
+    def _remove(self, key):
+        # remove an entry; the lock must be held
+        self._forget(key)
+        try:
+            os.remove(self.entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        # remove least recently used entries until the cache is within
+        # its limits; the lock must be held
+        while len(self._entries) > 0 and \
+            (self._size > self.max_bytes or
+             (self.max_entries is not None and
+              len(self._entries) > self.max_entries)):
+            self._remove(next(iter(self._entries)))
@@ -0,0 +1,514 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from argparse import ArgumentParser
+from collections import deque
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.compiler import compile_template
+from metadata_converter.emit import render_to_stream
+from metadata_converter.generate import BUILTIN_TEMPLATES
+from metadata_converter.generate import get_builtin_template
+from metadata_converter.generate import load_compiled_template
+from metadata_converter.loaders import load_template
+from metadata_converter.loaders import values_yaml
+from ruamel.yaml.error import YAMLError
+from socketserver import ThreadingMixIn
+from socketserver import UnixStreamServer
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+#
+# Conversion server. Templates are compiled once, when the server
+# starts or when they are registered, and kept in memory; requests
+# only pay for parsing the posted descriptor and rendering.
+#
+# Endpoints:
+#  GET  /health                  server status and template names
+#  GET  /metrics                 request latency statistics
+#  GET  /templates               template names
+#  POST /templates/<name>        register (or replace) a template; the
+#                                request body is the template YAML
+#  POST /convert/<name>          complete template <name> using the
+#                                posted descriptor (YAML or JSON)
+#  POST /batch/<name>            complete template <name> for each
+#                                posted descriptor (multi-document YAML,
+#                                JSON array or JSON Lines)
+#
+# The convert and batch endpoints accept the query parameter
+# format=yaml (default) or format=json.
+#
+# Usage: python -m metadata_converter.serve [--port 8080]
+#            [--socket /path/to/socket] [-t name=/path/to/template]
+#
+
+# Content types of JSON request bodies
+JSON_CONTENT_TYPES = ['application/json']
+JSONL_CONTENT_TYPES = ['application/x-ndjson', 'application/jsonl']
+
+# Content type of each output format
+OUTPUT_CONTENT_TYPES = {
+    'yaml': 'application/yaml',
+    'json': 'application/json'
+}
+
+
+class RequestError(Exception):
+    # Raised if a request cannot be processed; results in an
+    # error response with the given HTTP status
+    def __init__(self, status, message, placeholder=None):
+        self.status = status
+        self.message = message
+        self.placeholder = placeholder
+        super().__init__(message)
+
+
+class LatencyMetrics(object):
+    """
+    Thread-safe request latency statistics per endpoint. Percentiles
+    are computed from the most recent `window` requests.
+    """
+
+    def __init__(self, window=1024):
+        self.window = window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, seconds, error=False):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = {'count': 0,
+                         'errors': 0,
+                         'total': 0.0,
+                         'max': 0.0,
+                         'recent': deque(maxlen=self.window)}
+                self._endpoints[endpoint] = entry
+            entry['count'] += 1
+            if error:
+                entry['errors'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['recent'].append(seconds)
+
+    def as_dict(self):
+        # latencies are reported in microseconds
+        endpoints = {}
+        with self._lock:
+            for endpoint, entry in self._endpoints.items():
+                recent = sorted(entry['recent'])
+                endpoints[endpoint] = {
+                    'count': entry['count'],
+                    'errors': entry['errors'],
+                    'mean_us': entry['total'] / entry['count'] * 1e6,
+                    'max_us': entry['max'] * 1e6,
+                    'p50_us': percentile(recent, 0.5) * 1e6,
+                    'p90_us': percentile(recent, 0.9) * 1e6,
+                    'p99_us': percentile(recent, 0.99) * 1e6
+                }
+        return {'uptime_seconds': time.time() - self.started,
+                'endpoints': endpoints}
+
+
+def percentile(sorted_values, fraction):
+    # nearest-rank percentile of a sorted, non-empty list
+    index = min(len(sorted_values) - 1,
+                max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class ConversionService(object):
+    """
+    Keeps compiled templates in memory and converts descriptors.
+    The built-in templates are available as 'dlf' and 'oah'.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.templates = {}
+        for name in BUILTIN_TEMPLATES:
+            self.templates[name] = get_builtin_template(name)
+        self.metrics = LatencyMetrics()
+
+    def register(self, name, template):
+        """
+        Register a template under name, replacing the template
+        that is registered under name, if any.
+
+        :param name: template name
+        :type name: str
+        :param template: compiled template, or template file location
+        :type template: CompiledTemplate or str or pathlib.Path
+        :raises FileNotFoundError: the template file does not exist
+        """
+
+        if isinstance(template, (str, os.PathLike)):
+            template = load_compiled_template(template)
+        with self._lock:
+            self.templates[name] = template
+
+    def template_names(self):
+        with self._lock:
+            return sorted(self.templates.keys())
+
+    def get_template(self, name):
+        with self._lock:
+            template = self.templates.get(name)
+        if template is None:
+            raise RequestError(404, 'Template \'{}\' is not registered.'
+                               .format(name))
+        return template
+
+    def convert(self, name, document, format='yaml'):
+        """
+        Complete template name using the placeholder values in document.
+
+        :raises RequestError: the template is not registered or
+        document does not define a placeholder
+        :return: the completed template
+        :rtype: str
+        """
+
+        template = self.get_template(name)
+        buf = io.StringIO()
+        try:
+            render_to_stream(template, document, buf, format=format)
+        except PlaceholderNotFoundError as pnfe:
+            raise RequestError(422, str(pnfe), pnfe.placeholder)
+        except ValueError as ve:
+            raise RequestError(400, str(ve))
+        except Exception as ex:
+            # document cannot be converted, e.g. it defines a scalar
+            # where the template expects a mapping
+            raise RequestError(422, str(ex))
+        return buf.getvalue()
+
+    def convert_batch(self, name, documents, format='yaml'):
+        """
+        Complete template name for each document. Documents that cannot
+        be converted do not affect the others.
+
+        :raises RequestError: the template is not registered
+        :return: one {'output': ...} or {'error': ...} dict per document;
+        JSON output is returned as an object, YAML output as a string
+        :rtype: list
+        """
+
+        template = self.get_template(name)
+        results = []
+        for document in documents:
+            try:
+                buf = io.StringIO()
+                render_to_stream(template, document, buf, format=format)
+                output = buf.getvalue()
+                if format == 'json':
+                    output = json.loads(output)
+                results.append({'output': output})
+            except PlaceholderNotFoundError as pnfe:
+                results.append({'error': str(pnfe),
+                                'placeholder': pnfe.placeholder})
+            except Exception as ex:
+                results.append({'error': str(ex)})
+        return results
+
+
+def parse_documents(body, content_type, batch):
+    # Parse a request body into one document, or a list of documents
+    # if batch is True
+    try:
+        text = body.decode('utf-8')
+        if content_type in JSON_CONTENT_TYPES:
+            documents = json.loads(text)
+            if batch and not isinstance(documents, list):
+                raise RequestError(400, 'Expected a JSON array of '
+                                        'descriptors.')
+            return documents
+        if content_type in JSONL_CONTENT_TYPES:
+            documents = [json.loads(line) for line in text.splitlines()
+                         if len(line.strip()) > 0]
+            return documents if batch else documents[0]
+        if batch:
+            return list(values_yaml.load_all(text))
+        return values_yaml.load(text)
+    except (UnicodeDecodeError, ValueError, IndexError, YAMLError) as ex:
+        raise RequestError(400, 'Invalid request body: {}'.format(ex))
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests
+    protocol_version = 'HTTP/1.1'
+    # send each response in one segment, without waiting for the
+    # acknowledgement of the previous one (the response is flushed
+    # after each request)
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    server_version = 'ExchangeMetadataConverter'
+
+    # set by make_server()
+    service = None
+    max_body_size = None
+    verbose = False
+
+    def address_string(self):
+        # Unix socket clients do not have an address
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'unix'
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status, body, content_type):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type',
+                         '{}; charset=utf-8'.format(content_type))
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, status, document):
+        self.send_body(status,
+                       json.dumps(document, default=str),
+                       'application/json')
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            # the body cannot be read, so the connection cannot be
+            # reused
+            self.close_connection = True
+            raise RequestError(400, 'Invalid Content-Length header: {}'
+                               .format(self.headers.get('Content-Length')))
+        if length > self.max_body_size:
+            # the connection cannot be reused; the body was not read
+            self.close_connection = True
+            raise RequestError(413, 'Request body exceeds {} bytes.'
+                               .format(self.max_body_size))
+        return self.rfile.read(length)
+
+    def handle_request(self, method):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if len(part) > 0]
+        endpoint = '{} /{}'.format(method, parts[0] if parts else '')
+        error = True
+        try:
+            # read the body first, so that the connection can be reused
+            # even if the request is rejected
+            request_body = self.read_body() if method == 'POST' else b''
+            status, body, content_type = self.route(method, parts, url,
+                                                    request_body)
+            error = status >= 400
+        except RequestError as rqe:
+            if rqe.status == 404:
+                endpoint = '{} (not found)'.format(method)
+            response = {'error': rqe.message}
+            if rqe.placeholder is not None:
+                response['placeholder'] = rqe.placeholder
+            status = rqe.status
+            body = json.dumps(response)
+            content_type = 'application/json'
+        except Exception as ex:
+            status = 500
+            body = json.dumps({'error': str(ex)})
+            content_type = 'application/json'
+        self.send_body(status, body, content_type)
+        self.service.metrics.record(endpoint,
+                                    time.perf_counter() - start,
+                                    error=error)
+
+    def route(self, method, parts, url, body):
+        # returns (HTTP status, response body, content type)
+        service = self.service
+        if method == 'GET' and parts == ['health']:
+            return (200,
+                    json.dumps({'status': 'ok',
+                                'templates': service.template_names()}),
+                    'application/json')
+        if method == 'GET' and parts == ['metrics']:
+            return (200,
+                    json.dumps(service.metrics.as_dict()),
+                    'application/json')
+        if method == 'GET' and parts == ['templates']:
+            return (200,
+                    json.dumps(service.template_names()),
+                    'application/json')
+        if method != 'POST' or len(parts) != 2 or\
+           parts[0] not in ['templates', 'convert', 'batch']:
+            raise RequestError(404, 'Not found: {} {}'
+                               .format(method, url.path))
+
+        if parts[0] == 'templates':
+            try:
+                template = compile_template(
+                    load_template(io.StringIO(body.decode('utf-8'))))
+            except (UnicodeDecodeError, ValueError,
+                    NotImplementedError, YAMLError) as ex:
+                raise RequestError(400, 'Invalid template: {}'.format(ex))
+            service.register(parts[1], template)
+            return (200,
+                    json.dumps({'registered': parts[1]}),
+                    'application/json')
+
+        format = parse_qs(url.query).get('format', ['yaml'])[0]
+        if format not in OUTPUT_CONTENT_TYPES:
+            raise RequestError(400, 'Parameter \'format\' must be one of '
+                                    '{} not \'{}\'.'
+                               .format(sorted(OUTPUT_CONTENT_TYPES.keys()),
+                                       format))
+        content_type = self.headers.get('Content-Type', '')
+        content_type = content_type.split(';')[0].strip().lower()
+        batch = parts[0] == 'batch'
+        documents = parse_documents(body, content_type, batch)
+        if batch:
+            results = service.convert_batch(parts[1], documents, format)
+            return (200,
+                    json.dumps({'results': results}, default=str),
+                    'application/json')
+        return (200,
+                service.convert(parts[1], documents, format),
+                OUTPUT_CONTENT_TYPES[format])
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service=None, host='127.0.0.1', port=8080,
+                socket_path=None, max_body_size=16 * 1024 * 1024,
+                verbose=False):
+    """
+    Create a conversion server, which handles each request in a thread.
+    Call serve_forever() to start it.
+
+    :param service: the conversion service. Default: a service that
+    provides the built-in templates
+    :type service: ConversionService
+    :param host: host name or IP address to listen on
+    :type host: str
+    :param port: TCP port to listen on; 0 selects a free port
+    :type port: int
+    :param socket_path: listen on this Unix domain socket instead of
+    on host and port
+    :type socket_path: str
+    :param max_body_size: maximum request body size, in bytes
+    :type max_body_size: int
+    :param verbose: log requests to STDERR
+    :type verbose: bool
+    :return: the server
+    :rtype: socketserver.BaseServer
+    """
+
+    if service is None:
+        service = ConversionService()
+    handler = type('Handler',
+                   (ConversionRequestHandler,),
+                   {'service': service,
+                    'max_body_size': max_body_size,
+                    'verbose': verbose,
+                    # TCP_NODELAY cannot be set on Unix domain sockets
+                    'disable_nagle_algorithm': socket_path is None})
+    if socket_path is not None:
+        server = ThreadingUnixHTTPServer(socket_path, handler)
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+    server.service = service
+    return server
+
+
+# Main entry point
+if __name__ == "__main__":
+
+    parser = ArgumentParser(
+                description='Run a conversion server that keeps '
+                            'compiled templates in memory.')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Host name or IP address to listen on. '
+                             'Default: 127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=8080,
+                        help='TCP port to listen on. Default: 8080')
+    parser.add_argument('--socket', default=None,
+                        help='Listen on this Unix domain socket instead '
+                             'of a TCP port')
+    parser.add_argument('-t', '--template', action='append', default=[],
+                        metavar='NAME=PATH',
+                        help='Register the template file PATH as NAME. '
+                             'May be specified multiple times.')
+    parser.add_argument('--max-body-size', type=int,
+                        default=16 * 1024 * 1024,
+                        help='Maximum request body size in bytes. '
+                             'Default: 16 MiB')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Log requests to STDERR')
+    args = parser.parse_args()
+
+    service = ConversionService()
+    for template in args.template:
+        name, separator, path = template.partition('=')
+        if len(separator) == 0 or len(name) == 0 or len(path) == 0:
+            parser.error('argument -t/--template: expected NAME=PATH '
+                         'not \'{}\''.format(template))
+        try:
+            service.register(name, path)
+        except FileNotFoundError as fnfe:
+            print(str(fnfe), file=sys.stderr)
+            sys.exit(1)
+
+    server = make_server(service,
+                         host=args.host,
+                         port=args.port,
+                         socket_path=args.socket,
+                         max_body_size=args.max_body_size,
+                         verbose=args.verbose)
+    if args.socket is not None:
+        print('Serving templates {} on {}'
+              .format(service.template_names(), args.socket),
+              file=sys.stderr)
+    else:
+        print('Serving templates {} on http://{}:{}'
+              .format(service.template_names(),
+                      *server.server_address[:2]),
+              file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket is not None and os.path.exists(args.socket):
+            os.remove(args.socket)
@@ -0,0 +1,109 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import time
+
+
+class ConversionStats(object):
+    """
+    Collects per-stage wall time and counters of conversions. Pass an
+    instance as `stats` to replace(), CompiledTemplate.render(),
+    render_to_stream() or the generate_* functions; values accumulate
+    across calls. Stages are:
+     - load_template: template file loading and compilation
+     - metadata: template comment (annotation) processing in replace()
+     - resolve: placeholder resolution in replace() and of the shared
+       placeholders of fan-out rendering (metadata_converter/fanout.py)
+     - render: rendering of a compiled template
+     - dump: YAML output
+     - emit: rendering straight to a stream (metadata_converter/emit.py)
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # stage name -> seconds
+        self.timings = {}
+        # number of template properties and list items processed
+        self.nodes_visited = 0
+        # number of {{...}} placeholders replaced with a value
+        self.placeholders_resolved = 0
+        # number of @optional placeholders replaced with None
+        self.optional_dropped = 0
+        # number of bytes of YAML output produced
+        self.bytes_emitted = 0
+
+    def add_time(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def as_dict(self):
+        return {
+            'timings': dict(self.timings),
+            'nodes_visited': self.nodes_visited,
+            'placeholders_resolved': self.placeholders_resolved,
+            'optional_dropped': self.optional_dropped,
+            'bytes_emitted': self.bytes_emitted
+        }
+
+    def __repr__(self):
+        return 'ConversionStats({})'.format(self.as_dict())
+
+
+class StageTimer(object):
+    # Context manager that adds its wall time to a stage
+    __slots__ = ('stats', 'stage', 'start')
+
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.add_time(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class NullTimer(object):
+    # Context manager that does nothing, used if stats are disabled
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+null_timer = NullTimer()
+
+
+def timed(stats, stage):
+    """
+    Return a context manager that adds its wall time to stage in
+    stats, or does nothing if stats is None.
+
+    :param stats: statistics to update, or None
+    :type stats: ConversionStats
+    :param stage: stage name
+    :type stage: str
+    :return: context manager
+    """
+    if stats is None:
+        return null_timer
+    return StageTimer(stats, stage)
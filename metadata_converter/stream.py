@@ -0,0 +1,155 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.compiler import CompiledTemplate
+from metadata_converter.compiler import compile_template
+from metadata_converter.loaders import load_all_values
+from metadata_converter.loaders import load_template
+from metadata_converter.loaders import ThreadLocalYAML
+import json
+
+# Supported stream formats:
+#  - yaml: YAML documents separated by '---'
+#  - jsonl: JSON Lines, one JSON document per line
+STREAM_FORMATS = ['yaml', 'jsonl']
+
+dumper = ThreadLocalYAML(indent=dict(mapping=2, sequence=4, offset=2),
+                         explicit_start=True)
+
+
+def check_format(format):
+    if format not in STREAM_FORMATS:
+        raise ValueError('Stream format must be one of {} not \'{}\'.'
+                         .format(STREAM_FORMATS, format))
+
+
+def iter_documents(stream, format='yaml', fast=True):
+    """
+    Read documents from stream one at a time, without reading
+    the whole stream into memory.
+
+    :param stream: text stream
+    :type stream: file-like object
+    :param format: stream format, 'yaml' or 'jsonl'
+    :type format: str
+    :param fast: load YAML documents using the fast loader, see
+    metadata_converter.loaders.load_values
+    :type fast: bool
+    :raises ValueError: format is not supported
+    :return: dict representations of the documents
+    :rtype: iterator
+    """
+
+    check_format(format)
+    if format == 'yaml':
+        yield from load_all_values(stream, fast=fast)
+    else:
+        for line in stream:
+            if len(line.strip()) > 0:
+                yield json.loads(line)
+
+
+def write_document(document, stream, format='yaml'):
+    """
+    Append document to stream.
+
+    :param document: document to write
+    :type document: dict
+    :param stream: text stream
+    :type stream: file-like object
+    :param format: stream format, 'yaml' or 'jsonl'
+    :type format: str
+    :raises ValueError: format is not supported
+    """
+
+    check_format(format)
+    if format == 'yaml':
+        dumper.dump(document, stream)
+    else:
+        # values that have no JSON equivalent, such as dates,
+        # are written as strings
+        stream.write(json.dumps(document, default=str))
+        stream.write('\n')
+
+
+def render_documents(template, documents):
+    """
+    Replace the placeholders in template with values from each
+    document, one document at a time.
+
+    :param template: template file or compiled template
+    :type template: str, pathlib.Path or CompiledTemplate
+    :param documents: dict representations of YAML documents defining
+    placeholder values
+    :type documents: iterable
+    :raises PlaceholderNotFoundError: a {{...}} placeholder in template
+    was not found in a document
+    :return: the completed templates
+    :rtype: iterator
+    """
+
+    if not isinstance(template, CompiledTemplate):
+        template = compile_template(load_template(template))
+
+    for document in documents:
+        yield template.render(document)
+
+
+def render_stream(template,
+                  in_stream,
+                  out_stream,
+                  input_format='yaml',
+                  output_format=None,
+                  fast=True):
+    """
+    Replace the placeholders in template with values from each
+    document in in_stream and write one completed template per
+    document to out_stream, as they are produced. Memory usage does not
+    depend on the number of documents in the stream.
+
+    :param template: template file or compiled template
+    :type template: str, pathlib.Path or CompiledTemplate
+    :param in_stream: stream of documents defining placeholder values
+    :type in_stream: file-like object
+    :param out_stream: stream to write completed templates to
+    :type out_stream: file-like object
+    :param input_format: format of in_stream, 'yaml' or 'jsonl'
+    :type input_format: str
+    :param output_format: format of out_stream, 'yaml' or 'jsonl';
+    defaults to input_format
+    :type output_format: str
+    :param fast: load YAML documents using the fast loader, see
+    metadata_converter.loaders.load_values
+    :type fast: bool
+    :raises PlaceholderNotFoundError: a {{...}} placeholder in template
+    was not found in a document
+    :raises ValueError: a format is not supported
+    :return: number of documents written
+    :rtype: int
+    """
+
+    if output_format is None:
+        output_format = input_format
+    check_format(input_format)
+    check_format(output_format)
+
+    count = 0
+    for document in render_documents(template,
+                                     iter_documents(in_stream,
+                                                    input_format,
+                                                    fast=fast)):
+        write_document(document, out_stream, output_format)
+        count = count + 1
+    return count
@@ -0,0 +1,333 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from collections import namedtuple
+from functools import partial
+from metadata_converter.batch import expand_inputs
+from metadata_converter.batch import map_chunks
+from metadata_converter.loaders import load_values
+import json
+import sys
+
+#
+# Bulk validation of placeholder values documents (descriptors) against
+# the placeholders of one or more templates, without rendering. The
+# placeholder paths of all templates are merged into a prefix tree,
+# which is walked once per document, so that properties shared by
+# several paths (e.g. 'repository' in 'repository.url' and
+# 'repository.mime_type') are looked up once. Every missing path is
+# reported, not only the first one that rendering would raise.
+#
+# Usage: python -m metadata_converter.validate
+#            dax-data-set-descriptors/ -t dlf -t oah -o report.json
+#
+
+# Outcome of validating one input. missing and missing_optional map
+# template names to the placeholders that the input does not define;
+# error is None if the input could be loaded.
+ValidationResult = namedtuple('ValidationResult',
+                              ['input', 'missing', 'missing_optional',
+                               'error'])
+
+
+class Requirements(object):
+    """
+    The placeholders of a compiled template. A placeholder is required
+    unless all of its occurrences are annotated with @optional.
+    """
+
+    def __init__(self, template):
+        """
+        :param template: compiled template
+        :type template: CompiledTemplate
+        """
+
+        required = {}
+        optional = {}
+        for placeholder, path, is_optional in template.placeholders():
+            if is_optional:
+                optional[placeholder] = path
+            else:
+                required[placeholder] = path
+        for placeholder in required:
+            optional.pop(placeholder, None)
+        # placeholder -> pre-split path
+        self.paths = dict(required)
+        self.paths.update(optional)
+        self.required = frozenset(required)
+        self.optional = frozenset(optional)
+
+
+class Validator(object):
+    """
+    Checks placeholder values documents against the requirements of
+    one or more templates. Instances are immutable and can be shared
+    by threads and sent to worker processes.
+    """
+
+    def __init__(self, templates):
+        """
+        :param templates: template name -> compiled template
+        :type templates: dict
+        """
+
+        self.requirements = {name: Requirements(template)
+                             for name, template in dict(templates).items()}
+        # prefix tree of the placeholder paths of all templates:
+        # property -> [children, placeholder whose path ends here]
+        self.tree = {}
+        for requirements in self.requirements.values():
+            for placeholder, path in requirements.paths.items():
+                node = None
+                children = self.tree
+                for property in path:
+                    node = children.get(property)
+                    if node is None:
+                        node = children[property] = [{}, None]
+                    children = node[0]
+                node[1] = placeholder
+
+    def defined(self, values):
+        """
+        Return the placeholders of all templates that values defines,
+        i.e. that resolve to a value other than None.
+
+        :param values: dict representation of a YAML document defining
+        placeholder values
+        :type values: dict
+        :return: placeholders
+        :rtype: set
+        """
+
+        found = set()
+        stack = [(self.tree, values)]
+        while stack:
+            children, mapping = stack.pop()
+            for property, (grandchildren, placeholder) in children.items():
+                value = mapping.get(property)
+                if value is None:
+                    continue
+                if placeholder is not None:
+                    found.add(placeholder)
+                if len(grandchildren) > 0 and isinstance(value, dict):
+                    stack.append((grandchildren, value))
+        return found
+
+    def check(self, values):
+        """
+        Return the placeholders of each template that values does
+        not define.
+
+        :param values: dict representation of a YAML document defining
+        placeholder values
+        :type values: dict
+        :raises ValueError: values is not of type dict
+        :return: (missing, missing_optional); each maps template names
+        to the sorted list of placeholders that are not defined
+        :rtype: tuple
+        """
+
+        if not isinstance(values, dict):
+            raise ValueError('Parameter \'values\' must be of type '
+                             '\'dict\' not {}.'.format(type(values)))
+        found = self.defined(values)
+        missing = {}
+        missing_optional = {}
+        for name, requirements in self.requirements.items():
+            missing[name] = sorted(requirements.required - found)
+            missing_optional[name] = sorted(requirements.optional - found)
+        return missing, missing_optional
+
+
+def validate_file(input_yaml, validator, fast=True):
+    """
+    Validate a YAML file containing placeholder values. Errors are
+    reported in the result instead of being raised.
+
+    :param input_yaml: YAML file
+    :type input_yaml: str or pathlib.Path
+    :param validator: template requirements
+    :type validator: Validator
+    :param fast: load input_yaml using the fast loader, see
+    metadata_converter.loaders.load_values
+    :type fast: bool
+    :return: validation outcome
+    :rtype: ValidationResult
+    """
+
+    try:
+        missing, missing_optional = validator.check(
+                                        load_values(input_yaml, fast=fast))
+    except Exception as ex:
+        return ValidationResult(str(input_yaml), None, None,
+                                'Error processing "{}": {}'
+                                .format(input_yaml, str(ex)))
+    return ValidationResult(str(input_yaml), missing, missing_optional, None)
+
+
+def validate_chunk(fast, validator, chunk):
+    return [validate_file(input_yaml, validator, fast=fast)
+            for input_yaml in chunk]
+
+
+def validate_files(inputs, templates, workers=1, chunksize=64, fast=True):
+    """
+    Validate YAML files containing placeholder values against the
+    requirements of templates. Set workers to validate the inputs in
+    parallel in multiple processes.
+
+    :param inputs: file names, directory names or glob patterns
+    identifying YAML files containing placeholder values
+    :type inputs: list
+    :param templates: template name -> compiled template
+    :type templates: dict
+    :param workers: number of worker processes; None to use one
+    process per CPU, 1 to validate in the calling process
+    :type workers: int
+    :param chunksize: number of input files sent to a worker at a time
+    :type chunksize: int
+    :param fast: load input files using the fast loader, see
+    metadata_converter.loaders.load_values
+    :type fast: bool
+    :raises ValueError: workers or chunksize is invalid
+    :return: (validator, one validation outcome per input file, in
+    input order)
+    :rtype: tuple
+    """
+
+    validator = Validator(templates)
+    results = list(map_chunks(partial(validate_chunk, fast),
+                              expand_inputs(inputs),
+                              validator,
+                              workers,
+                              chunksize))
+    return validator, results
+
+
+def validation_report(validator, results):
+    """
+    Create a JSON-serializable report of validation results.
+
+    :param validator: template requirements
+    :type validator: Validator
+    :param results: validation outcomes
+    :type results: list
+    :return: report with the requirements of each template, a summary
+    and one entry per input
+    :rtype: dict
+    """
+
+    files = []
+    valid = 0
+    failed = 0
+    for result in results:
+        entry = {
+            'input': result.input,
+            'valid': False,
+            'missing': result.missing,
+            'missing_optional': result.missing_optional,
+            'error': result.error
+        }
+        if result.error is not None:
+            failed = failed + 1
+        elif all(len(missing) == 0 for missing in result.missing.values()):
+            entry['valid'] = True
+            valid = valid + 1
+        files.append(entry)
+    return {
+        'templates': {
+            name: {
+                'required': sorted(requirements.required),
+                'optional': sorted(requirements.optional)
+            }
+            for name, requirements in validator.requirements.items()
+        },
+        'summary': {
+            'inputs': len(results),
+            'valid': valid,
+            'invalid': len(results) - valid - failed,
+            'errors': failed
+        },
+        'files': files
+    }
+
+
+# Main entry point
+if __name__ == "__main__":
+
+    from argparse import ArgumentParser
+    from metadata_converter.generate import BUILTIN_TEMPLATES
+    from metadata_converter.generate import get_builtin_template
+    from metadata_converter.generate import load_compiled_template
+
+    parser = ArgumentParser(
+                description='Check that YAML files define the '
+                            'placeholders of templates, and report every '
+                            'missing placeholder in a JSON report.')
+    parser.add_argument('input_yaml', nargs='+',
+                        help='YAML files containing placeholder values, '
+                             'directories or glob patterns')
+    parser.add_argument('-t', '--template', action='append', required=True,
+                        help='Template file, or the name of a built-in '
+                             'template ({}). Can be specified multiple '
+                             'times.'
+                             .format(', '.join(sorted(BUILTIN_TEMPLATES))))
+    parser.add_argument('-o', '--output', default=None,
+                        help='Report file name. If not specified the '
+                             'report is sent to STDOUT.')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='Number of worker processes. Specify 0 to '
+                             'use one process per CPU. Default: 1')
+    parser.add_argument('--chunk-size', type=int, default=64,
+                        help='Number of input files sent to a worker '
+                             'process at a time. Default: 64')
+    parser.add_argument('--fast-values', action='store_true',
+                        help='Load placeholder values using the fast '
+                             'safe YAML loader instead of the round-trip '
+                             'loader.')
+    args = parser.parse_args()
+
+    templates = {}
+    try:
+        for template in args.template:
+            if template in BUILTIN_TEMPLATES:
+                templates[template] = get_builtin_template(template)
+            else:
+                templates[template] = load_compiled_template(template)
+        validator, results = validate_files(args.input_yaml,
+                                            templates,
+                                            workers=args.workers or None,
+                                            chunksize=args.chunk_size,
+                                            fast=args.fast_values)
+    except FileNotFoundError as fnfe:
+        # A template file was not found
+        print(str(fnfe), file=sys.stderr)
+        sys.exit(1)
+    except ValueError as ve:
+        parser.error(str(ve))
+
+    report = validation_report(validator, results)
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    summary = report['summary']
+    print('Validated {} file(s): {} valid, {} invalid, {} error(s).'
+          .format(summary['inputs'], summary['valid'],
+                  summary['invalid'], summary['errors']),
+          file=sys.stderr)
+    sys.exit(0 if summary['valid'] == summary['inputs'] else 1)
@@ -33,8 +33,16 @@ setup(
   keywords=['YAML templating engine'],
   install_requires=[
     'importlib-resources',
-    'ruamel.yaml'
+    # metadata_converter/emit.py uses ruamel.yaml internals that were
+    # checked against 0.17.21 - 0.19.x
+    'ruamel.yaml>=0.17.21,<0.20'
   ],
+  extras_require={
+    # C-accelerated YAML loader for placeholder values
+    'fast': ['ruamel.yaml.clib'],
+    # Arrow and Parquet tables in metadata_converter.columnar
+    'arrow': ['pyarrow']
+  },
   include_package_data=True,
   classifiers=[
     'Development Status :: 3 - Alpha',
@@ -0,0 +1,161 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from metadata_converter import aio
+from metadata_converter.aio import AsyncConverter
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.generate import generate_dlf_yaml
+from metadata_converter.generate import generate_oah_yaml
+from metadata_converter.generate import generate_oah_yaml_dict
+from metadata_converter.generate import load_compiled_template
+from pathlib import Path
+from ruamel.yaml import YAML
+import asyncio
+import glob
+import threading
+import time
+import unittest
+
+yaml = YAML()
+
+#
+# Tests the asyncio API (metadata_converter/aio.py)
+#
+
+
+class ConcurrencyProbe(object):
+    # Records the maximum number of concurrent calls of sleep()
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.active = self.active + 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(seconds)
+        with self.lock:
+            self.active = self.active - 1
+
+
+class TestAio(unittest.TestCase):
+
+    def setUp(self):
+
+        self.in_yamls = [yaml.load(Path(descriptor))
+                         for descriptor in
+                         sorted(glob.glob('dax-data-set-descriptors/*.yaml'))]
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+
+        self.loop.close()
+
+    def run_async(self, coroutine):
+
+        return self.loop.run_until_complete(coroutine)
+
+    def test_generate(self):
+
+        async def convert_all():
+            return await asyncio.gather(
+                *[aio.generate_dlf_yaml(in_yaml)
+                  for in_yaml in self.in_yamls],
+                *[aio.generate_oah_yaml(in_yaml)
+                  for in_yaml in self.in_yamls])
+
+        results = self.run_async(convert_all())
+        expected = [generate_dlf_yaml(in_yaml) for in_yaml in self.in_yamls] +\
+            [generate_oah_yaml(in_yaml) for in_yaml in self.in_yamls]
+        self.assertEqual(results, expected)
+
+        self.assertEqual(
+            self.run_async(aio.generate_oah_yaml_dict(self.in_yamls[0])),
+            generate_oah_yaml_dict(self.in_yamls[0]))
+
+    def test_render(self):
+
+        template_file = 'templates/dlf_out.yaml'
+        expected = load_compiled_template(template_file).render(
+                                                        self.in_yamls[0])
+        self.assertEqual(
+            self.run_async(aio.render(template_file, self.in_yamls[0])),
+            expected)
+
+        converter = AsyncConverter()
+        template = self.run_async(
+                        converter.load_compiled_template(template_file))
+        self.assertEqual(
+            self.run_async(converter.render(template, self.in_yamls[0])),
+            expected)
+
+        with self.assertRaises(PlaceholderNotFoundError):
+            self.run_async(converter.render(template, {}))
+        with self.assertRaises(FileNotFoundError):
+            self.run_async(converter.render('no/such/template.yaml', {}))
+
+    def test_process_pool(self):
+
+        template = load_compiled_template('templates/openaihub_out.yaml')
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            converter = AsyncConverter(executor=executor)
+
+            async def convert_all():
+                return await asyncio.gather(
+                    *[converter.render(template, in_yaml)
+                      for in_yaml in self.in_yamls])
+
+            results = self.run_async(convert_all())
+        self.assertEqual(results, [template.render(in_yaml)
+                                   for in_yaml in self.in_yamls])
+
+    def test_max_concurrency(self):
+
+        probe = ConcurrencyProbe()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            converter = AsyncConverter(executor=executor, max_concurrency=2)
+
+            async def run_all():
+                await asyncio.gather(*[converter.run(probe.sleep, 0.05)
+                                       for i in range(8)])
+
+            self.run_async(run_all())
+        self.assertEqual(probe.max_active, 2)
+
+        with self.assertRaises(ValueError):
+            AsyncConverter(max_concurrency=0)
+
+    def test_event_loop_not_blocked(self):
+
+        # other coroutines run while a conversion is in progress
+        converter = AsyncConverter()
+
+        async def run_all():
+            conversion = asyncio.ensure_future(converter.run(time.sleep,
+                                                             0.5))
+            for i in range(5):
+                await asyncio.sleep(0.01)
+            self.assertFalse(conversion.done())
+            await conversion
+
+        self.run_async(run_all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,6 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+from metadata_converter.annotations import FLAG_OPTIONAL
+from metadata_converter.annotations import NO_COMMENT
+from metadata_converter.annotations import parse_comment
+from metadata_converter.apply import get_metadata
 from metadata_converter.apply import replace
 from metadata_converter.apply import PlaceholderNotFoundError
 from pathlib import Path
@@ -24,6 +28,7 @@ yaml.default_flow_style = False
 
 #
 # Tests template annotations: @optional
+# (metadata_converter/annotations.py)
 #
 
 
@@ -110,5 +115,50 @@ class TestAnnotations(unittest.TestCase):
                 self.assertTrue(False, e)
 
 
+class TestMetadata(unittest.TestCase):
+
+    def test_parse_comment(self):
+
+        metadata = parse_comment('# @optional another @other comment\n')
+        self.assertEqual(metadata.comment,
+                         '# @optional another @other comment\n')
+        self.assertEqual(metadata.comment_text, 'another  comment')
+        self.assertEqual(metadata.annotations,
+                         frozenset(['optional', 'other']))
+        self.assertEqual(metadata.flags, FLAG_OPTIONAL)
+        self.assertTrue(metadata.optional)
+        # item access, like the dicts of previous versions
+        self.assertIn('optional', metadata['annotations'])
+        self.assertEqual(metadata['comment_text'], 'another  comment')
+        with self.assertRaises(KeyError):
+            metadata['unknown']
+
+        metadata = parse_comment('#  \n')
+        self.assertIsNone(metadata.comment_text)
+        self.assertEqual(metadata.flags, 0)
+        self.assertFalse(metadata.optional)
+        self.assertIs(parse_comment(None), NO_COMMENT)
+
+    def test_interned(self):
+
+        self.assertIs(parse_comment('# @optional\n'),
+                      parse_comment('# @optional\n'))
+        # properties of different templates share records
+        first = yaml.load('a: x  # @optional\nb: y\n')
+        second = yaml.load('c:\n  d: z  # @optional\n')
+        self.assertIs(get_metadata(first, 'a'),
+                      get_metadata(second['c'], 'd'))
+        self.assertIs(get_metadata(first, 'b'), NO_COMMENT)
+        self.assertIsNone(get_metadata({'a': 'x'}, 'a'))
+
+    def test_immutable(self):
+
+        metadata = parse_comment('# @optional\n')
+        with self.assertRaises(AttributeError):
+            metadata.flags = 0
+        with self.assertRaises(AttributeError):
+            metadata.extra = 1
+
+
 if __name__ == '__main__':
     unittest.main()
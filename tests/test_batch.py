@@ -0,0 +1,151 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.apply import replace
+from metadata_converter.batch import convert_files
+from metadata_converter.batch import convert_many
+from metadata_converter.batch import expand_inputs
+from pathlib import Path
+from ruamel.yaml import YAML
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+yaml = YAML()
+
+#
+# Tests batch conversion (metadata_converter/batch.py)
+#
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+
+        self.output_dir = tempfile.mkdtemp()
+        self.template_file = 'templates/dlf_out.yaml'
+        self.descriptors = sorted(glob.glob('dax-data-set-descriptors/*.yaml'))
+
+    def tearDown(self):
+
+        shutil.rmtree(self.output_dir)
+
+    def test_expand_inputs(self):
+
+        self.assertEqual(expand_inputs(['dax-data-set-descriptors']),
+                         self.descriptors)
+        self.assertEqual(expand_inputs(['dax-data-set-descriptors/*.yaml']),
+                         self.descriptors)
+        # duplicates are removed
+        self.assertEqual(expand_inputs([self.descriptors[0],
+                                        'dax-data-set-descriptors']),
+                         self.descriptors)
+        # non-existing files are passed through
+        self.assertEqual(expand_inputs(['missing.yaml']), ['missing.yaml'])
+        self.assertEqual(expand_inputs(['missing/*.yaml']), [])
+
+    def test_convert_files(self):
+
+        results = convert_files(['dax-data-set-descriptors'],
+                                self.template_file,
+                                self.output_dir)
+        self.assertEqual(len(results), len(self.descriptors))
+        template_yamls = yaml.load(Path(self.template_file))
+        for descriptor, result in zip(self.descriptors, results):
+            self.assertIsNone(result.error)
+            self.assertEqual(result.input, descriptor)
+            self.assertEqual(yaml.load(Path(result.output)),
+                             replace(yaml.load(Path(descriptor)),
+                                     template_yamls))
+
+    def test_per_file_errors(self):
+
+        output_dir = os.path.join(self.output_dir, 'new')
+        results = convert_files(['tests/inputs/scalars.yaml',
+                                 'missing.yaml',
+                                 self.descriptors[0]],
+                                self.template_file,
+                                output_dir)
+        self.assertEqual(len(results), 3)
+        # the first input does not define {{id}}
+        self.assertIsNotNone(results[0].error)
+        self.assertIn('"id"', results[0].error)
+        self.assertIsNotNone(results[1].error)
+        # processing continues after errors
+        self.assertIsNone(results[2].error)
+        self.assertEqual(os.listdir(output_dir),
+                         [os.path.basename(self.descriptors[0])])
+
+    def test_output_name_collision(self):
+
+        results = convert_files(['tests/inputs/scalars.yaml',
+                                 'tests/templates/scalars.yaml'],
+                                'tests/templates/scalars.yaml',
+                                self.output_dir)
+        self.assertIsNone(results[0].error)
+        self.assertIsNotNone(results[1].error)
+
+    def test_convert_files_in_parallel(self):
+
+        results = convert_files(['tests/inputs/scalars.yaml',
+                                 'dax-data-set-descriptors'],
+                                self.template_file,
+                                self.output_dir,
+                                workers=2,
+                                chunksize=3)
+        self.assertEqual([result.input for result in results],
+                         ['tests/inputs/scalars.yaml'] + self.descriptors)
+        self.assertIsNotNone(results[0].error)
+        for result in results[1:]:
+            self.assertIsNone(result.error)
+        self.assertEqual(len(os.listdir(self.output_dir)),
+                         len(self.descriptors))
+
+    def test_convert_many(self):
+
+        template_yamls = yaml.load(Path(self.template_file))
+        in_yamls = [yaml.load(Path(descriptor))
+                    for descriptor in self.descriptors] * 5
+        expected = [replace(in_yaml, template_yamls) for in_yaml in in_yamls]
+        for workers in [1, 2]:
+            for chunksize in [1, 4, 100]:
+                self.assertEqual(list(convert_many(iter(in_yamls),
+                                                   self.template_file,
+                                                   workers=workers,
+                                                   chunksize=chunksize)),
+                                 expected)
+
+    def test_convert_many_errors(self):
+
+        in_yamls = [yaml.load(Path(self.descriptors[0])), {}]
+        results = convert_many(in_yamls, self.template_file, workers=2)
+        self.assertIsNotNone(next(results))
+        with self.assertRaises(PlaceholderNotFoundError) as cm:
+            next(results)
+        self.assertEqual(cm.exception.placeholder, 'id')
+
+        for workers, chunksize in [(0, 1), (1, 0)]:
+            with self.assertRaises(ValueError):
+                list(convert_many(in_yamls,
+                                  self.template_file,
+                                  workers=workers,
+                                  chunksize=chunksize))
+
+
+if __name__ == '__main__':
+    unittest.main()
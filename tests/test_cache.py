@@ -0,0 +1,133 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import replace
+from metadata_converter.cache import TemplateCache
+from metadata_converter.generate import builtin_templates
+from metadata_converter.generate import generate_dlf_yaml_dict
+from metadata_converter.generate import generate_oah_yaml_dict
+from metadata_converter.generate import invalidate_template_cache
+from pathlib import Path
+from ruamel.yaml import YAML
+import os
+import shutil
+import tempfile
+import unittest
+
+yaml = YAML()
+
+#
+# Tests the template cache (metadata_converter/cache.py)
+#
+
+
+class TestTemplateCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.template_file = os.path.join(self.tmp_dir, 'template.yaml')
+        shutil.copy('tests/templates/scalars.yaml', self.template_file)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_cache_hit(self):
+
+        cache = TemplateCache()
+        compiled = cache.get(self.template_file)
+        self.assertIs(cache.get(self.template_file), compiled)
+        self.assertIs(cache.get(Path(self.template_file)), compiled)
+        self.assertEqual(len(cache), 1)
+
+    def test_modified_template(self):
+
+        cache = TemplateCache()
+        compiled = cache.get(self.template_file)
+        with open(self.template_file, 'a') as template:
+            template.write('added: value\n')
+        recompiled = cache.get(self.template_file)
+        self.assertIsNot(recompiled, compiled)
+        in_yamls = yaml.load(Path('tests/inputs/scalars.yaml'))
+        self.assertEqual(recompiled.render(in_yamls)['added'], 'value')
+
+    def test_invalidate(self):
+
+        cache = TemplateCache()
+        compiled = cache.get(self.template_file)
+        cache.invalidate(self.template_file)
+        self.assertEqual(len(cache), 0)
+        self.assertIsNot(cache.get(self.template_file), compiled)
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate_normalized_path(self):
+
+        # paths are normalized like get() does
+        cache = TemplateCache()
+        cache.get(os.path.join(self.tmp_dir, '.', 'template.yaml'))
+        cache.invalidate(self.template_file)
+        self.assertEqual(len(cache), 0)
+        cache.get(self.template_file)
+        cache.invalidate(os.path.join(self.tmp_dir, '.', 'template.yaml'))
+        self.assertEqual(len(cache), 0)
+        cache.get(self.template_file)
+        cache.invalidate(Path(self.tmp_dir + '//template.yaml'))
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+
+        cache = TemplateCache(maxsize=2)
+        paths = []
+        for name in ['a', 'b', 'c']:
+            path = os.path.join(self.tmp_dir, '{}.yaml'.format(name))
+            shutil.copy(self.template_file, path)
+            paths.append(path)
+
+        compiled_a = cache.get(paths[0])
+        cache.get(paths[1])
+        # a is now the most recently used template
+        cache.get(paths[0])
+        cache.get(paths[2])
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get(paths[0]), compiled_a)
+
+        with self.assertRaises(ValueError):
+            TemplateCache(maxsize=0)
+
+    def test_missing_template(self):
+
+        with self.assertRaises(FileNotFoundError):
+            TemplateCache().get(os.path.join(self.tmp_dir, 'missing.yaml'))
+
+    def test_builtin_templates(self):
+
+        in_yamls = yaml.load(Path('dax-data-set-descriptors/gmb.yaml'))
+        invalidate_template_cache()
+        self.assertEqual(len(builtin_templates), 0)
+        for i in range(2):
+            self.assertEqual(
+                generate_dlf_yaml_dict(in_yamls),
+                replace(in_yamls, yaml.load(Path('templates/dlf_out.yaml'))))
+            self.assertEqual(
+                generate_oah_yaml_dict(in_yamls),
+                replace(in_yamls,
+                        yaml.load(Path('templates/openaihub_out.yaml'))))
+            self.assertEqual(len(builtin_templates), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.columnar import ColumnMapping
+from metadata_converter.columnar import iter_batches
+from metadata_converter.columnar import render_rows
+from metadata_converter.columnar import render_table
+from metadata_converter.columnar import table_format
+from metadata_converter.compiler import compile_template
+from ruamel.yaml import YAML
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+yaml = YAML()
+
+#
+# Tests batch rendering from tables (metadata_converter/columnar.py)
+#
+
+TEMPLATE = """
+id: "{{id}}"
+url: "{{repository.url}}"
+repository: "{{repository}}"
+title: "{{name}} ({{id}})"
+license: "{{license}}"  # @optional
+"""
+
+CSV = ('id,name,repository.url,repository.mime_type,license\n'
+       'gmb,Groningen,http://example.com/gmb.tar.gz,application/gzip,\n'
+       'fer,Emotions,http://example.com/fer.tar.gz,,CDLA\n'
+       'x,"Comma, quoted",http://example.com/x,,\n')
+
+VALUES = [
+    {'id': 'gmb', 'name': 'Groningen',
+     'repository': {'url': 'http://example.com/gmb.tar.gz',
+                    'mime_type': 'application/gzip'}},
+    {'id': 'fer', 'name': 'Emotions', 'license': 'CDLA',
+     'repository': {'url': 'http://example.com/fer.tar.gz'}},
+    {'id': 'x', 'name': 'Comma, quoted',
+     'repository': {'url': 'http://example.com/x'}}
+]
+
+
+class TestColumnar(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.template = compile_template(yaml.load(TEMPLATE))
+        self.expected = [self.template.render(values) for values in VALUES]
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def test_table_format(self):
+
+        self.assertEqual(table_format('catalog.CSV'), 'csv')
+        self.assertEqual(table_format('catalog.feather'), 'arrow')
+        self.assertEqual(table_format('catalog.txt', 'csv'), 'csv')
+        self.assertEqual(table_format(io.StringIO()), 'csv')
+        for source, format in [('catalog.txt', None), ('catalog.csv', 'xls')]:
+            with self.assertRaises(ValueError):
+                table_format(source, format)
+
+    def test_render_rows(self):
+
+        # row order and values are independent of the batch size
+        for batch_size in [1, 2, 1024]:
+            self.assertEqual(list(render_rows(self.template,
+                                              io.StringIO(CSV),
+                                              batch_size=batch_size)),
+                             self.expected)
+        with self.assertRaises(ValueError):
+            list(render_rows(self.template, io.StringIO(CSV), batch_size=0))
+        self.assertEqual(list(render_rows(self.template, io.StringIO(''))),
+                         [])
+
+    def test_render_table(self):
+
+        file_name = os.path.join(self.directory, 'catalog.csv')
+        with open(file_name, 'w', newline='') as output_file:
+            output_file.write(CSV)
+        stream = io.StringIO()
+        self.assertEqual(render_table(self.template, file_name, stream), 3)
+        self.assertEqual([json.loads(line)
+                          for line in stream.getvalue().splitlines()],
+                         self.expected)
+        stream = io.StringIO()
+        render_table(self.template, file_name, stream, output_format='yaml')
+        self.assertEqual(list(yaml.load_all(stream.getvalue())),
+                         self.expected)
+
+    def test_column_mapping(self):
+
+        template = compile_template(yaml.load('a: "{{a.b.c}}"\n'
+                                              'b: "{{x}}"\n'
+                                              'c: "{{y}}"  # @optional\n'))
+        mapping = ColumnMapping(template, ['x.1', 'a.b', 'x.2.z', 'unused'])
+        self.assertEqual(mapping.sources['a.b.c'], ('field', 'a.b', ('c',)))
+        self.assertEqual(mapping.sources['x'][0], 'nested')
+        self.assertEqual(mapping.sources['y'], ('missing',))
+        # only referenced columns are read, in table order
+        self.assertEqual(mapping.columns, ['x.1', 'a.b', 'x.2.z'])
+        with self.assertRaises(ValueError):
+            ColumnMapping(template, ['x', 'x'])
+
+    def test_missing_values(self):
+
+        # the value of a required placeholder is empty in row 2
+        rows = list(iter_batches(io.StringIO('id,name\na,b\n,c\n')))
+        self.assertEqual(rows[0].column('id'), ['a', None])
+        template = compile_template(yaml.load('id: "{{id}}"\n'))
+        documents = render_rows(template, io.StringIO('id,name\na,b\n,c\n'))
+        self.assertEqual(next(documents), {'id': 'a'})
+        with self.assertRaises(PlaceholderNotFoundError) as context:
+            next(documents)
+        self.assertEqual(context.exception.placeholder, 'id')
+
+    @unittest.skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_arrow(self):
+
+        import pyarrow.feather
+        import pyarrow.parquet
+
+        # struct column instead of dotted column names
+        table = pyarrow.Table.from_pylist([
+            {'id': values['id'],
+             'name': values['name'],
+             'license': values.get('license'),
+             'repository': {'url': values['repository']['url'],
+                            'mime_type':
+                                values['repository'].get('mime_type')}}
+            for values in VALUES])
+        expected = [self.template.render(values)
+                    for values in table.to_pylist()]
+        self.assertEqual(list(render_rows(self.template, table,
+                                          batch_size=2)),
+                         expected)
+        file_name = os.path.join(self.directory, 'catalog.parquet')
+        pyarrow.parquet.write_table(table, file_name)
+        self.assertEqual(list(render_rows(self.template, file_name)),
+                         expected)
+        file_name = os.path.join(self.directory, 'catalog.feather')
+        pyarrow.feather.write_feather(table, file_name)
+        self.assertEqual(list(render_rows(self.template, file_name)),
+                         expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
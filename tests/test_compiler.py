@@ -0,0 +1,92 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import replace
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.compiler import compile_template
+from pathlib import Path
+from ruamel.yaml import YAML
+import glob
+import unittest
+
+yaml = YAML()
+
+#
+# Tests compiled templates (metadata_converter/compiler.py), which
+# must produce the same output as replace()
+#
+
+
+class TestCompiler(unittest.TestCase):
+
+    def test_test_templates(self):
+
+        for name in ['scalars', 'dicts', 'lists']:
+            in_yamls = yaml.load(Path('tests/inputs/{}.yaml'.format(name)))
+            template_yamls = \
+                yaml.load(Path('tests/templates/{}.yaml'.format(name)))
+            compiled = compile_template(template_yamls)
+            self.assertEqual(compiled.render(in_yamls),
+                             replace(in_yamls, template_yamls))
+
+    def test_annotations(self):
+
+        in_yamls = yaml.load(Path('tests/inputs/annotations.yaml'))
+        template_yamls = \
+            list(yaml.load_all(Path('tests/templates/annotations.yaml')))
+
+        compiled = compile_template(template_yamls[0])
+        self.assertEqual(compiled.render(in_yamls),
+                         replace(in_yamls, template_yamls[0]))
+
+        for template_yaml in template_yamls[1:]:
+            compiled = compile_template(template_yaml)
+            with self.assertRaises(PlaceholderNotFoundError) as cm:
+                compiled.render(in_yamls)
+            with self.assertRaises(PlaceholderNotFoundError) as rcm:
+                replace(in_yamls, template_yaml)
+            self.assertEqual(cm.exception.placeholder,
+                             rcm.exception.placeholder)
+
+    def test_dax_dataset_descriptors(self):
+
+        # A compiled template is reusable across many descriptors
+        for template_file in glob.iglob('templates/*.yaml'):
+            template_yamls = yaml.load(Path(template_file))
+            compiled = compile_template(template_yamls)
+            for descriptor in glob.iglob('dax-data-set-descriptors/*.yaml'):
+                in_yamls = yaml.load(Path(descriptor))
+                self.assertEqual(compiled.render(in_yamls),
+                                 replace(in_yamls, template_yamls),
+                                 '{} / {}'.format(template_file, descriptor))
+
+    def test_signature(self):
+
+        self.assertIsNone(compile_template(None).render({}))
+        self.assertIsNone(compile_template({}).render(None))
+        self.assertEqual(compile_template({}).render({}), {})
+
+        for invalid_type in [[], '']:
+            with self.assertRaises(ValueError):
+                compile_template(invalid_type)
+            with self.assertRaises(ValueError):
+                compile_template({}).render(invalid_type)
+
+        with self.assertRaises(NotImplementedError):
+            compile_template({'key': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
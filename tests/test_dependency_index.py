@@ -0,0 +1,131 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.compiler import compile_template
+from metadata_converter.dependency_index import DependencyIndex
+from metadata_converter.dependency_index import format_path
+from metadata_converter.dependency_index import template_references
+from metadata_converter.loaders import load_template
+from pathlib import Path
+import io
+import os
+import tempfile
+import unittest
+
+#
+# Tests the dependency index (metadata_converter/dependency_index.py)
+#
+
+TEMPLATE = """
+name: '{{name}}'
+spec:
+  url: '{{repository.url}}'
+  repository: '{{repository}}'
+  mirror: '{{repository.mirror}}'  # @optional
+  tags:
+    - constant
+    - '{{tags.first}}'
+    - - '{{tags.nested}}'
+    - key: '{{repository.url}}'
+"""
+
+
+def compile_text(text):
+    return compile_template(load_template(io.StringIO(text)))
+
+
+class TestDependencyIndex(unittest.TestCase):
+
+    def test_template_references(self):
+
+        references = template_references(compile_text(TEMPLATE))
+        self.assertEqual(references,
+                         [('name', ('name',), False),
+                          ('repository.url', ('spec', 'url'), False),
+                          ('repository', ('spec', 'repository'), False),
+                          ('repository.mirror', ('spec', 'mirror'), True),
+                          ('tags.first', ('spec', 'tags', 1), False),
+                          ('tags.nested', ('spec', 'tags', 2, 0), False),
+                          ('repository.url', ('spec', 'tags', 3, 'key'),
+                           False)])
+        self.assertEqual(format_path(references[-1][1]), 'spec.tags[3].key')
+        self.assertEqual(template_references(compile_template(None)), [])
+
+    def test_query(self):
+
+        index = DependencyIndex()
+        index.add_template('b', compile_text(TEMPLATE))
+        index.add_template('a', compile_text('url: \'{{repository.url}}\''))
+
+        self.assertEqual([(r.template, r.output_path)
+                          for r in index.query('repository.url')],
+                         [('a', ('url',)),
+                          ('b', ('spec', 'url')),
+                          ('b', ('spec', 'repository')),
+                          ('b', ('spec', 'tags', 3, 'key'))])
+        self.assertTrue(index.query('repository.mirror', exact=True)[0]
+                        .optional)
+        self.assertEqual(len(index.query('repository.url', exact=True)), 3)
+        # properties within the path
+        self.assertEqual(sorted(r.placeholder for r in index.query('tags')),
+                         ['tags.first', 'tags.nested'])
+        self.assertEqual(index.query('version'), [])
+        self.assertEqual(index.placeholders(),
+                         ['name', 'repository', 'repository.mirror',
+                          'repository.url', 'tags.first', 'tags.nested'])
+
+        index.remove_template('b')
+        self.assertEqual(len(index.query('repository')), 1)
+
+    def test_update_and_persist(self):
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = os.path.join(tmp_dir, 'first.yaml')
+            second = os.path.join(tmp_dir, 'second.yaml')
+            Path(first).write_text('a: \'{{x.y}}\'\n')
+            Path(second).write_text('b: \'{{x.z}}\'\n')
+            index_file = os.path.join(tmp_dir, 'index.json')
+
+            index = DependencyIndex()
+            results = index.update([tmp_dir])
+            self.assertEqual([r.template for r in results], [first, second])
+            index.save(index_file)
+
+            index = DependencyIndex.load(index_file)
+            self.assertEqual([r.template for r in index.query('x')],
+                             [first, second])
+            # unchanged templates are not loaded again
+            self.assertEqual(index.update([tmp_dir]), [])
+
+            Path(second).write_text('b: \'{{x.y}}\'\nc: [\n')
+            results = index.update([tmp_dir])
+            self.assertEqual(len(results), 1)
+            self.assertIsNotNone(results[0].error)
+            self.assertEqual(len(index), 1)
+
+            Path(second).write_text('b: \'{{x.y}}\'\nc: \'{{w}}\'\n')
+            index.update([first, second])
+            self.assertEqual([r.template for r in index.query('x.y')],
+                             [first, second])
+            index.update([second])
+            self.assertEqual(index.placeholders(), ['w', 'x.y'])
+
+            Path(index_file).write_text('{"version": 0}')
+            with self.assertRaises(ValueError):
+                DependencyIndex.load(index_file)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.compiler import compile_template
+from metadata_converter.emit import EMIT_FORMATS
+from metadata_converter.emit import render_to_stream
+from metadata_converter.generate import generate_dlf_yaml
+from metadata_converter.generate import generate_dlf_yaml_dict
+from metadata_converter.generate import generate_oah_yaml
+from metadata_converter.generate import write_dlf_yaml
+from metadata_converter.generate import write_oah_yaml
+from metadata_converter.stats import ConversionStats
+from pathlib import Path
+from ruamel.yaml import YAML
+import glob
+import io
+import json
+import unittest
+
+yaml = YAML()
+dumper = YAML()
+dumper.default_flow_style = False
+
+#
+# Tests rendering to a stream (metadata_converter/emit.py)
+#
+
+
+class TestEmit(unittest.TestCase):
+
+    def setUp(self):
+
+        self.descriptors = sorted(glob.glob('dax-data-set-descriptors/*.yaml'))
+
+    def emit(self, template, values, format='yaml'):
+
+        buf = io.StringIO()
+        render_to_stream(template, values, buf, format=format)
+        return buf.getvalue()
+
+    def test_test_templates(self):
+
+        # output matches yaml.dump and json.dumps of the rendered dict
+        for name in ['annotations', 'dicts', 'lists', 'scalars']:
+            in_yamls = yaml.load(Path('tests/inputs/{}.yaml'.format(name)))
+            for template_yamls in \
+                    yaml.load_all(Path('tests/templates/{}.yaml'
+                                       .format(name))):
+                template = compile_template(template_yamls)
+                try:
+                    out_yamls = template.render(in_yamls)
+                except PlaceholderNotFoundError:
+                    with self.assertRaises(PlaceholderNotFoundError):
+                        self.emit(template, in_yamls)
+                    continue
+
+                buf = io.StringIO()
+                dumper.dump(out_yamls, buf)
+                self.assertEqual(self.emit(template, in_yamls),
+                                 buf.getvalue())
+                self.assertEqual(self.emit(template, in_yamls, 'json'),
+                                 json.dumps(out_yamls, default=str))
+
+    def test_generate(self):
+
+        for descriptor in self.descriptors:
+            in_yamls = yaml.load(Path(descriptor))
+            for generate, write in [(generate_dlf_yaml, write_dlf_yaml),
+                                    (generate_oah_yaml, write_oah_yaml)]:
+                buf = io.StringIO()
+                write(in_yamls, buf)
+                self.assertEqual(buf.getvalue(), generate(in_yamls))
+
+    def test_json(self):
+
+        for descriptor in self.descriptors:
+            in_yamls = yaml.load(Path(descriptor))
+            buf = io.StringIO()
+            write_dlf_yaml(in_yamls, buf, format='json')
+            self.assertEqual(json.loads(buf.getvalue()),
+                             json.loads(json.dumps(generate_dlf_yaml_dict(
+                                 in_yamls), default=str)))
+
+    def test_empty(self):
+
+        template = compile_template(None)
+        self.assertEqual(self.emit(template, {}), '')
+        self.assertEqual(self.emit(template, {}, 'json'), 'null')
+
+        template = compile_template({'a': '{{a}}'})
+        self.assertEqual(self.emit(template, None), '')
+
+    def test_errors(self):
+
+        template = compile_template({'a': '{{a.b}}'})
+        with self.assertRaises(PlaceholderNotFoundError) as cm:
+            self.emit(template, {'a': {}})
+        self.assertEqual(cm.exception.placeholder, 'a.b')
+        with self.assertRaises(ValueError):
+            self.emit(template, ['a'])
+        with self.assertRaises(ValueError):
+            self.emit(template, {'a': {'b': 1}}, 'xml')
+
+    def test_stats(self):
+
+        in_yamls = yaml.load(Path('dax-data-set-descriptors/gmb.yaml'))
+        stats = ConversionStats()
+        stream = io.StringIO()
+        write_oah_yaml(in_yamls, stream, stats=stats)
+        self.assertEqual(stats.placeholders_resolved, 16)
+        self.assertEqual(sorted(stats.timings.keys()),
+                         ['emit', 'load_template'])
+        self.assertEqual(stats.bytes_emitted,
+                         len(stream.getvalue().encode('utf-8')))
+        self.assertEqual(stats.bytes_emitted,
+                         len(generate_oah_yaml(in_yamls).encode('utf-8')))
+
+        # bytes are counted for both formats, per document
+        for format in EMIT_FORMATS:
+            stats = ConversionStats()
+            stream = io.StringIO()
+            write_dlf_yaml(in_yamls, stream, format=format, stats=stats)
+            write_dlf_yaml(in_yamls, stream, format=format, stats=stats)
+            self.assertGreater(stats.bytes_emitted, 0)
+            self.assertEqual(stats.bytes_emitted,
+                             len(stream.getvalue().encode('utf-8')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.compiler import compile_template
+from metadata_converter.compiler import OP_LOOKUP
+from metadata_converter.fanout import convert_files_targets
+from metadata_converter.fanout import FanOut
+from metadata_converter.generate import generate_dlf_yaml
+from metadata_converter.generate import generate_dlf_yaml_dict
+from metadata_converter.generate import generate_oah_yaml
+from metadata_converter.generate import generate_oah_yaml_dict
+from metadata_converter.generate import generate_targets_yaml
+from metadata_converter.generate import generate_targets_yaml_dict
+from metadata_converter.generate import get_builtin_template
+from metadata_converter.index import build_index
+from metadata_converter.loaders import load_values
+from metadata_converter.stats import ConversionStats
+from pathlib import Path
+from ruamel.yaml import YAML
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+yaml = YAML()
+
+#
+# Tests fan-out rendering (metadata_converter/fanout.py)
+#
+
+
+class TestFanOut(unittest.TestCase):
+
+    def setUp(self):
+
+        self.in_yamls = load_values('dax-data-set-descriptors/gmb.yaml')
+        self.fanout = FanOut({'dlf': get_builtin_template('dlf'),
+                              'oah': get_builtin_template('oah')})
+
+    def test_render(self):
+
+        outputs = self.fanout.render(self.in_yamls)
+        self.assertEqual(list(outputs.keys()), ['dlf', 'oah'])
+        self.assertEqual(outputs['dlf'],
+                         generate_dlf_yaml_dict(self.in_yamls))
+        self.assertEqual(outputs['oah'],
+                         generate_oah_yaml_dict(self.in_yamls))
+        self.assertEqual(self.fanout.render(self.in_yamls,
+                                            index=build_index(self.in_yamls)),
+                         outputs)
+
+    def test_shared_placeholders(self):
+
+        placeholders = [set(instruction[2]
+                            for instruction in template.instructions
+                            if instruction[0] == OP_LOOKUP)
+                        for template in self.fanout.templates.values()]
+        self.assertEqual(set(self.fanout.placeholders.keys()),
+                         placeholders[0] | placeholders[1])
+        # the templates share placeholders, which are resolved once
+        self.assertIn('id', placeholders[0] & placeholders[1])
+        resolved = self.fanout.resolve(self.in_yamls)
+        self.assertEqual(resolved['id'], self.in_yamls['id'])
+
+    def test_stats(self):
+
+        stats = ConversionStats()
+        self.fanout.render(self.in_yamls, stats=stats)
+        self.assertIn('resolve', stats.timings)
+        self.assertIn('render', stats.timings)
+        self.assertEqual(stats.placeholders_resolved +
+                         stats.optional_dropped,
+                         sum(template.lookup_count
+                             for template in self.fanout.templates.values()))
+
+    def test_placeholder_not_found(self):
+
+        templates = {
+            'first': compile_template(yaml.load('a: "{{id}}"\n')),
+            'second': compile_template(yaml.load('b: "{{missing}}"\n'
+                                                 'c: "{{optional}}"  '
+                                                 '# @optional\n'))
+        }
+        fanout = FanOut(templates)
+        with self.assertRaises(PlaceholderNotFoundError) as context:
+            fanout.render({'id': 1})
+        self.assertEqual(context.exception.placeholder, 'missing')
+        self.assertEqual(fanout.render({'id': 1, 'missing': 2}),
+                         {'first': {'a': 1},
+                          'second': {'b': 2, 'c': None}})
+
+    def test_invalid_values(self):
+
+        self.assertEqual(self.fanout.render(None), {'dlf': None, 'oah': None})
+        with self.assertRaises(ValueError):
+            self.fanout.render([])
+
+    def test_generate_targets(self):
+
+        self.assertEqual(generate_targets_yaml(self.in_yamls),
+                         {'dlf': generate_dlf_yaml(self.in_yamls),
+                          'oah': generate_oah_yaml(self.in_yamls)})
+        self.assertEqual(generate_targets_yaml_dict(self.in_yamls,
+                                                    targets=['oah']),
+                         {'oah': generate_oah_yaml_dict(self.in_yamls)})
+        with self.assertRaises(ValueError):
+            generate_targets_yaml(self.in_yamls, targets=['unknown'])
+
+
+class TestFanOutFiles(unittest.TestCase):
+
+    def setUp(self):
+
+        self.output_dir = tempfile.mkdtemp()
+        self.descriptors = sorted(glob.glob('dax-data-set-descriptors/*.yaml'))
+        self.targets = [
+            ('dlf',
+             get_builtin_template('dlf'),
+             os.path.join(self.output_dir, 'dlf')),
+            ('scalars',
+             compile_template(yaml.load(Path('tests/templates/scalars.yaml'))),
+             os.path.join(self.output_dir, 'scalars'))
+        ]
+
+    def tearDown(self):
+
+        shutil.rmtree(self.output_dir)
+
+    def test_convert_files_targets(self):
+
+        results = convert_files_targets(['tests/inputs/scalars.yaml',
+                                         'dax-data-set-descriptors'],
+                                        self.targets)
+        self.assertEqual(len(results), len(self.descriptors) + 1)
+        # scalars.yaml only defines the placeholders of the scalars
+        # template, the descriptors only those of the dlf template
+        dlf, scalars = results[0]
+        self.assertIn('"id"', dlf.error)
+        self.assertIsNone(scalars.error)
+        for descriptor, (dlf, scalars) in zip(self.descriptors, results[1:]):
+            self.assertIsNone(dlf.error)
+            self.assertIsNotNone(scalars.error)
+            self.assertEqual(yaml.load(Path(dlf.output)),
+                             generate_dlf_yaml_dict(
+                                 load_values(descriptor)))
+        self.assertEqual(len(os.listdir(self.targets[0][2])),
+                         len(self.descriptors))
+        self.assertEqual(os.listdir(self.targets[1][2]), ['scalars.yaml'])
+
+    def test_convert_files_targets_in_parallel(self):
+
+        results = convert_files_targets(['dax-data-set-descriptors'],
+                                        self.targets[:1],
+                                        workers=2,
+                                        chunksize=3)
+        self.assertEqual([result[0].input for result in results],
+                         self.descriptors)
+        for result in results:
+            self.assertIsNone(result[0].error)
+
+    def test_errors(self):
+
+        results = convert_files_targets(['missing.yaml',
+                                         'tests/inputs/scalars.yaml',
+                                         'tests/templates/scalars.yaml'],
+                                        self.targets)
+        # the input could not be loaded
+        self.assertEqual(len(results[0]), 2)
+        self.assertIsNotNone(results[0][0].error)
+        self.assertIsNotNone(results[0][1].error)
+        # output name collision
+        self.assertIsNotNone(results[2][1].error)
+        with self.assertRaises(ValueError):
+            convert_files_targets(['tests/inputs/scalars.yaml'],
+                                  self.targets + self.targets[:1])
+
+    def test_path_through_scalar(self):
+
+        # only the target that references repository.url fails
+        input_yaml = os.path.join(self.output_dir, 'values.yaml')
+        with open(input_yaml, 'w') as values_file:
+            values_file.write('id: a\n'
+                              'repository: oops\n')
+        targets = [
+            ('url',
+             compile_template(yaml.load('url: "{{repository.url}}"\n')),
+             os.path.join(self.output_dir, 'url')),
+            ('id',
+             compile_template(yaml.load('id: "{{id}}"\n')),
+             os.path.join(self.output_dir, 'id'))
+        ]
+        url, id = convert_files_targets([input_yaml], targets)[0]
+        self.assertIn('"repository.url"', url.error)
+        self.assertIsNone(id.error)
+        self.assertEqual(yaml.load(Path(id.output)), {'id': 'a'})
+
+
+if __name__ == '__main__':
+    unittest.main()
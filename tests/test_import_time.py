@@ -0,0 +1,97 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import subprocess
+import sys
+import unittest
+
+#
+# Import time regression tests. Each module is imported in a fresh
+# interpreter using `python -X importtime`.
+#
+
+# Modules that must not be loaded until YAML is actually processed
+DEFERRED_MODULES = ['ruamel', 'importlib_resources', 'templates']
+
+# Maximum cumulative import time per module, in microseconds
+IMPORT_TIME_BUDGETS = {
+    'metadata_converter.apply': 50000,
+    'metadata_converter.compiler': 60000,
+    'metadata_converter.index': 50000,
+    'metadata_converter.generate': 100000,
+}
+
+# Number of measurements per module; the fastest one is used
+REPEAT = 3
+
+
+def import_times(module):
+    # Return module name -> cumulative import time (us) of all
+    # modules loaded by `import module`
+    process = subprocess.run([sys.executable, '-X', 'importtime',
+                              '-c', 'import {}'.format(module)],
+                             stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE,
+                             universal_newlines=True,
+                             check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            times[fields[2].strip()] = int(fields[1])
+        except ValueError:
+            # header line
+            continue
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_deferred_imports(self):
+
+        for module in IMPORT_TIME_BUDGETS.keys():
+            loaded = import_times(module).keys()
+            for name in loaded:
+                self.assertNotIn(name.split('.')[0], DEFERRED_MODULES,
+                                 'importing {} loads {}'
+                                 .format(module, name))
+
+    def test_import_time(self):
+
+        for module, budget in IMPORT_TIME_BUDGETS.items():
+            cumulative = min(import_times(module)[module]
+                             for i in range(REPEAT))
+            self.assertLessEqual(cumulative, budget,
+                                 'importing {} took {} us'
+                                 .format(module, cumulative))
+
+    def test_replace_without_yaml(self):
+
+        # replace() works on plain dicts without loading ruamel.yaml
+        code = '\n'.join([
+            'from metadata_converter.apply import replace',
+            'import sys',
+            'out = replace({"a": {"b": 1}}, {"x": "{{a.b}}", "y": ["c"]})',
+            'assert out == {"x": 1, "y": ["c"]}, out',
+            'assert not any(m.startswith("ruamel") for m in sys.modules)'
+        ])
+        subprocess.run([sys.executable, '-c', code], check=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
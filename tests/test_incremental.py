@@ -0,0 +1,143 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.compiler import compile_template
+from metadata_converter.incremental import changed_paths
+from metadata_converter.incremental import IncrementalRender
+from metadata_converter.index import build_index
+from metadata_converter.loaders import load_template
+from metadata_converter.loaders import load_values
+import copy
+import io
+import unittest
+
+#
+# Tests incremental rendering (metadata_converter/incremental.py)
+#
+
+TEMPLATE = """
+name: '{{name}}'
+version: '{{version}}'
+repository:
+  url: '{{repository.url}}'
+  all: '{{repository}}'
+  mirror: '{{repository.mirror}}'  # @optional
+tags:
+  - '{{name}}'
+  - constant
+  - nested: '{{version}}'
+"""
+
+
+class TestIncremental(unittest.TestCase):
+
+    def setUp(self):
+
+        self.template = compile_template(load_template(io.StringIO(TEMPLATE)))
+        self.values = {'name': 'gmb',
+                       'version': '1.0',
+                       'repository': {'url': 'https://a'}}
+
+    def test_dependencies(self):
+
+        dependencies = []
+        self.template.render(self.values, dependencies=dependencies)
+        self.assertEqual([(d[2], d[3]) for d in dependencies],
+                         [(('name',), 'name'),
+                          (('version',), 'version'),
+                          (('repository', 'url'), 'repository.url'),
+                          (('repository', 'all'), 'repository'),
+                          (('repository', 'mirror'), 'repository.mirror'),
+                          (('tags', 0), 'name'),
+                          (('tags', 2, 'nested'), 'version')])
+
+    def test_update(self):
+
+        render = IncrementalRender(self.template, self.values)
+        self.assertEqual(render.output, self.template.render(self.values))
+
+        values = copy.deepcopy(self.values)
+        values['version'] = '2.0'
+        updated = render.update(values, ['version'])
+        self.assertEqual(sorted(updated),
+                         [('tags', 2, 'nested'), ('version',)])
+        self.assertEqual(render.output, self.template.render(values))
+
+        # a change within a property updates placeholders that reference
+        # the property, and placeholders within it
+        values['repository'] = {'url': 'https://b', 'mirror': 'https://c'}
+        updated = render.update(values, ['repository.url',
+                                         'repository.mirror'])
+        self.assertEqual(sorted(updated),
+                         [('repository', 'all'),
+                          ('repository', 'mirror'),
+                          ('repository', 'url')])
+        self.assertEqual(render.output, self.template.render(values))
+
+        values['repository'] = {'url': 'https://d'}
+        render.update(values, ['repository'], index=build_index(values))
+        self.assertEqual(render.output, self.template.render(values))
+        self.assertIsNone(render.output['repository']['mirror'])
+
+        # unrelated changes update nothing
+        values['other'] = {'name': 1}
+        self.assertEqual(render.update(values, ['other', 'other.name']), [])
+
+    def test_missing_placeholder(self):
+
+        render = IncrementalRender(self.template, self.values)
+        expected = copy.deepcopy(render.output)
+        values = copy.deepcopy(self.values)
+        values['version'] = '2.0'
+        del values['name']
+        with self.assertRaises(PlaceholderNotFoundError):
+            render.update(values, ['name', 'version'])
+        # the output is unchanged
+        self.assertEqual(render.output, expected)
+
+        with self.assertRaises(ValueError):
+            render.update(['a'], ['name'])
+
+    def test_changed_paths(self):
+
+        old_values = {'a': {'b': 1, 'c': {'d': 2}},
+                      'e': [1, 2],
+                      'f': 'x',
+                      'x.y': 1}
+        new_values = {'a': {'b': 1, 'c': {'d': 3}, 'g': None},
+                      'e': [1, 3],
+                      'x.y': 2}
+        self.assertEqual(changed_paths(old_values, new_values),
+                         ['a.c.d', 'a.g', 'e', 'f'])
+        self.assertEqual(changed_paths(old_values, old_values), [])
+
+    def test_descriptor(self):
+
+        template = compile_template(load_template('templates/dlf_out.yaml'))
+        old_values = load_values('dax-data-set-descriptors/gmb.yaml')
+        render = IncrementalRender(template, old_values)
+
+        new_values = copy.deepcopy(old_values)
+        new_values['version'] = '9.9.9'
+        new_values['repository']['url'] = 'https://example.com/data.tar.gz'
+        updated = render.update(new_values,
+                                changed_paths(old_values, new_values))
+        self.assertGreater(len(updated), 0)
+        self.assertEqual(render.output, template.render(new_values))
+
+
+if __name__ == '__main__':
+    unittest.main()
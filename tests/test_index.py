@@ -0,0 +1,136 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.apply import replace
+from metadata_converter.compiler import compile_template
+from metadata_converter.emit import render_to_stream
+from metadata_converter.index import build_index
+from metadata_converter.stats import ConversionStats
+from pathlib import Path
+from ruamel.yaml import YAML
+import glob
+import io
+import unittest
+
+yaml = YAML()
+
+#
+# Tests the dotted path value index (metadata_converter/index.py)
+#
+
+
+class TestIndex(unittest.TestCase):
+
+    def test_build_index(self):
+
+        values = {'a': {'b': {'c': 1}, 'list': [{'d': 2}]},
+                  'x.y': 3,
+                  4: 'four',
+                  'e': None}
+        index = build_index(values)
+        self.assertEqual(sorted(index.keys()),
+                         ['a', 'a.b', 'a.b.c', 'a.list', 'e'])
+        self.assertIs(index['a'], values['a'])
+        self.assertEqual(index['a.b.c'], 1)
+
+        with self.assertRaises(ValueError):
+            build_index(['a'])
+
+    def test_recursive_values(self):
+
+        values = {'a': {'b': 1}}
+        values['a']['self'] = values['a']
+        index = build_index(values)
+        self.assertEqual(sorted(index.keys()), ['a', 'a.b', 'a.self'])
+
+    def test_templates(self):
+
+        # rendering with an index yields the same output as without
+        template_yamls = [yaml.load(Path('templates/dlf_out.yaml')),
+                          yaml.load(Path('templates/openaihub_out.yaml'))]
+        for descriptor in sorted(glob.glob('dax-data-set-descriptors/'
+                                           '*.yaml')):
+            in_yamls = yaml.load(Path(descriptor))
+            index = build_index(in_yamls)
+            for template_yaml in template_yamls:
+                expected = replace(in_yamls, template_yaml)
+                self.assertEqual(replace(in_yamls, template_yaml,
+                                         index=index), expected)
+                template = compile_template(template_yaml)
+                self.assertEqual(template.render(in_yamls, index=index),
+                                 expected)
+
+                buf = io.StringIO()
+                render_to_stream(template, in_yamls, buf)
+                indexed_buf = io.StringIO()
+                render_to_stream(template, in_yamls, indexed_buf,
+                                 index=index)
+                self.assertEqual(indexed_buf.getvalue(), buf.getvalue())
+
+    def test_annotations(self):
+
+        in_yamls = yaml.load(Path('tests/inputs/annotations.yaml'))
+        template_yamls = \
+            list(yaml.load_all(Path('tests/templates/annotations.yaml')))
+        index = build_index(in_yamls)
+
+        # optional placeholders are dropped, others raise an error
+        expected = ConversionStats()
+        out_yamls = replace(in_yamls, template_yamls[0], stats=expected)
+        stats = ConversionStats()
+        self.assertEqual(compile_template(template_yamls[0])
+                         .render(in_yamls, stats=stats, index=index),
+                         out_yamls)
+        self.assertEqual(stats.optional_dropped, expected.optional_dropped)
+        for template_yaml in template_yamls[1:]:
+            with self.assertRaises(PlaceholderNotFoundError):
+                replace(in_yamls, template_yaml, index=index)
+            with self.assertRaises(PlaceholderNotFoundError):
+                compile_template(template_yaml).render(in_yamls,
+                                                       index=index)
+
+    def test_paths_through_scalars(self):
+
+        # the same error is raised with and without an index
+        values = {'repository': 'oops', 'tags': ['a'], 'id': 'x'}
+        index = build_index(values)
+        for placeholder in ['repository.url', 'tags.0', 'id.x.y']:
+            for text in ['a: "{{%s}}"\n' % placeholder,
+                         'a: "url: {{%s}}"\n' % placeholder]:
+                template_yaml = yaml.load(text)
+                compiled = compile_template(template_yaml)
+                for function in [
+                        lambda i: replace(values, template_yaml, index=i),
+                        lambda i: compiled.render(values, index=i),
+                        lambda i: render_to_stream(compiled, values,
+                                                   io.StringIO(), index=i)]:
+                    for i in [None, index]:
+                        with self.assertRaises(PlaceholderNotFoundError) \
+                                as context:
+                            function(i)
+                        self.assertEqual(context.exception.placeholder,
+                                         placeholder)
+                # optional placeholders are dropped either way
+                template_yaml = yaml.load(text.rstrip() + '  # @optional\n')
+                compiled = compile_template(template_yaml)
+                self.assertEqual(replace(values, template_yaml),
+                                 replace(values, template_yaml, index=index))
+                self.assertEqual(compiled.render(values),
+                                 compiled.render(values, index=index))
+
+
+if __name__ == '__main__':
+    unittest.main()
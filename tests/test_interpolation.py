@@ -0,0 +1,148 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import compile_format
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.apply import replace
+from metadata_converter.compiler import compile_template
+from metadata_converter.compiler import OP_FORMAT
+from metadata_converter.dependency_index import template_references
+from metadata_converter.emit import render_to_stream
+from metadata_converter.incremental import IncrementalRender
+from metadata_converter.index import build_index
+from metadata_converter.stats import ConversionStats
+from metadata_converter.validate import Requirements
+from pathlib import Path
+from ruamel.yaml import YAML
+import copy
+import io
+import json
+import unittest
+
+yaml = YAML()
+
+#
+# Tests placeholders within strings (metadata_converter/apply.py,
+# metadata_converter/compiler.py)
+#
+
+EXPECTED = {
+    'whole': ['nlp', 'text'],
+    'url': 'https://cdn/gmb/1.0.2.tar.gz',
+    'prefixed': 'v1.0.2',
+    'repeated': 'gmb-gmb',
+    'nested': 'archive.tar.gz (1024 bytes)',
+    'typed': 'public=true tags=["nlp", "text"]',
+    'braces': '{literal} gmb {}',
+    'optional': None,
+    'list': ['gmb', 'id: gmb']
+}
+
+
+class TestInterpolation(unittest.TestCase):
+
+    def setUp(self):
+
+        self.in_yamls = yaml.load(Path('tests/inputs/interpolation.yaml'))
+        self.template_yamls = \
+            yaml.load(Path('tests/templates/interpolation.yaml'))
+        self.compiled = compile_template(self.template_yamls)
+
+    def test_compile_format(self):
+
+        self.assertEqual(compile_format('https://cdn/{{id}}/{{a.b}}.gz'),
+                         ('https://cdn/{}/{}.gz',
+                          (('id', ('id',)), ('a.b', ('a', 'b')))))
+        self.assertEqual(compile_format('{x} {{id}}'),
+                         ('{{x}} {}', (('id', ('id',)),)))
+        # only strings with text other than the placeholder are
+        # formatted
+        self.assertEqual([instruction[1]
+                          for instruction in self.compiled.instructions
+                          if instruction[0] == OP_FORMAT],
+                         ['url', 'prefixed', 'repeated', 'nested', 'typed',
+                          'braces', 'optional', None])
+
+    def test_replace(self):
+
+        self.assertEqual(replace(self.in_yamls, self.template_yamls),
+                         EXPECTED)
+        self.assertEqual(replace(self.in_yamls, self.template_yamls,
+                                 index=build_index(self.in_yamls)),
+                         EXPECTED)
+
+    def test_render(self):
+
+        self.assertEqual(self.compiled.render(self.in_yamls), EXPECTED)
+        self.assertEqual(self.compiled.render(
+                            self.in_yamls,
+                            index=build_index(self.in_yamls)),
+                         EXPECTED)
+
+    def test_emit(self):
+
+        stream = io.StringIO()
+        render_to_stream(self.compiled, self.in_yamls, stream, format='json')
+        self.assertEqual(json.loads(stream.getvalue()), EXPECTED)
+
+    def test_missing_placeholders(self):
+
+        del self.in_yamls['version']
+        for function in [lambda: replace(self.in_yamls, self.template_yamls),
+                         lambda: self.compiled.render(self.in_yamls)]:
+            with self.assertRaises(PlaceholderNotFoundError) as context:
+                function()
+            self.assertEqual(context.exception.placeholder, 'version')
+
+    def test_stats(self):
+
+        # every placeholder within a string is counted
+        expected = ConversionStats()
+        replace(self.in_yamls, self.template_yamls, stats=expected)
+        self.assertEqual(expected.placeholders_resolved, 14)
+        self.assertEqual(expected.optional_dropped, 1)
+        stats = ConversionStats()
+        self.compiled.render(self.in_yamls, stats=stats)
+        self.assertEqual(stats.placeholders_resolved,
+                         expected.placeholders_resolved)
+        self.assertEqual(stats.optional_dropped, expected.optional_dropped)
+
+    def test_placeholders(self):
+
+        requirements = Requirements(self.compiled)
+        self.assertEqual(requirements.required,
+                         {'id', 'version', 'tags', 'public',
+                          'repository.name', 'repository.size'})
+        self.assertEqual(requirements.optional, {'missing'})
+        references = template_references(self.compiled)
+        self.assertIn(('version', ('url',), False), references)
+        self.assertIn(('id', ('list', 1), False), references)
+
+    def test_incremental(self):
+
+        render = IncrementalRender(self.compiled, self.in_yamls)
+        self.assertEqual(render.output, EXPECTED)
+        values = copy.deepcopy(self.in_yamls)
+        values['version'] = '2.0.0'
+        values['id'] = 'new'
+        updated = render.update(values, ['version', 'id'])
+        self.assertEqual(render.output, self.compiled.render(values))
+        self.assertEqual(render.output['url'], 'https://cdn/new/2.0.0.tar.gz')
+        # strings with several changed placeholders are updated once
+        self.assertEqual(updated.count(('url',)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.batch import convert_files
+from metadata_converter.compiler import compile_template
+from metadata_converter.generate import get_builtin_template
+from metadata_converter.lazy_values import LazyValues
+from metadata_converter.lazy_values import load_lazy_values
+from metadata_converter.lazy_values import referenced_properties
+from metadata_converter.loaders import load_values
+from ruamel.yaml import YAML
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+yaml = YAML()
+
+#
+# Tests lazy loading of placeholder values (metadata_converter/lazy_values.py)
+#
+
+
+class TestLazyValues(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.templates = [get_builtin_template('dlf'),
+                          get_builtin_template('oah')]
+        # references the keys 'id' and '1'
+        self.template = compile_template(yaml.load('a: "{{id}}"\n'
+                                                   'b: "{{1}}"\n'))
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def write(self, text, name='values.yaml'):
+
+        file_name = os.path.join(self.directory, name)
+        with open(file_name, 'w', newline='') as output_file:
+            output_file.write(text)
+        return file_name
+
+    def test_referenced_properties(self):
+
+        template = compile_template(yaml.load('a: "{{id}}"\n'
+                                              'b:\n'
+                                              '  - "{{repository.url}}"\n'
+                                              'c: "{{x.y.z}}"  # @optional\n'))
+        self.assertEqual(referenced_properties([template]),
+                         {'id', 'repository', 'x'})
+        self.assertEqual(referenced_properties(
+                            [compile_template(yaml.load('a: b\n'))]),
+                         set())
+
+    def test_load(self):
+
+        file_name = self.write('# comment\n'
+                               '---\n'
+                               'id: 1  # comment\n'
+                               'content:\n'
+                               '- pattern: a\n'
+                               '  records: 1\n'
+                               '# comment\n'
+                               'repository:\n'
+                               '  url: "http://example.com"\n'
+                               'name: "n"\r\n'
+                               'tags: [a, b]\n')
+        with LazyValues(file_name) as lazy_values:
+            self.assertEqual(lazy_values.properties,
+                             ['id', 'content', 'repository', 'name', 'tags'])
+            self.assertEqual(lazy_values.load({'repository', 'id', 'tags',
+                                               'missing'}),
+                             {'id': 1,
+                              'repository': {'url': 'http://example.com'},
+                              'tags': ['a', 'b']})
+            self.assertEqual(lazy_values.load(), load_values(file_name))
+        # the file is closed
+        self.assertIsNone(lazy_values.properties)
+
+    def test_only_referenced_properties_are_loaded(self):
+
+        # the content list is invalid YAML, but not loaded
+        file_name = self.write('id: x\n'
+                               'content:\n'
+                               '  - [\n'
+                               'version: 1\n')
+        template = compile_template(yaml.load('a: "{{id}}"\n'
+                                              'b: "{{version}}"\n'))
+        self.assertEqual(template.render(load_lazy_values(file_name,
+                                                          [template])),
+                         {'a': 'x', 'b': 1})
+
+    def test_fallback(self):
+
+        documents = [
+            # flow style, indented top-level properties
+            '{id: 1, version: 2}\n',
+            '  id: 1\n  version: 2\n',
+            # multi-line quoted and flow style values
+            'name: "a\nid: 2"\nversion: 2\n',
+            'name: [a,\nid]\nversion: 2\n',
+            # aliases and merge keys
+            'base: &base 1\nid: *base\nversion: 2\n',
+            '<<: {id: 1}\nversion: 2\n',
+            # keys that are not strings
+            '1: a\nid: 1\nversion: 2\n',
+        ]
+        for text in documents:
+            file_name = self.write(text)
+            values = load_values(file_name)
+            lazy = load_lazy_values(file_name, [self.template])
+            self.assertEqual(lazy.get('id'), values.get('id'), text)
+        # errors are raised as if the document were loaded completely
+        for text in ['id: 1\nid: 2\n', 'id: 1\n---\nid: 2\n']:
+            with self.assertRaises(Exception):
+                load_values(self.write(text))
+            with self.assertRaises(Exception):
+                load_lazy_values(self.write(text), self.templates)
+        self.assertIsNone(load_lazy_values(self.write(''), self.templates))
+        self.assertEqual(load_lazy_values(self.write('{"id": 1}',
+                                                     'values.json'),
+                                          self.templates),
+                         {'id': 1})
+        with self.assertRaises(FileNotFoundError):
+            load_lazy_values(os.path.join(self.directory, 'missing.yaml'),
+                             self.templates)
+
+    def test_descriptors(self):
+
+        descriptors = sorted(glob.glob('dax-data-set-descriptors/*.yaml'))
+        for descriptor in descriptors + ['tests/inputs/scalars.yaml']:
+            values = load_values(descriptor)
+            with LazyValues(descriptor) as lazy_values:
+                self.assertIsNotNone(lazy_values.properties)
+                for template in self.templates:
+                    lazy = lazy_values.load_for([template])
+                    self.assertNotIn('content', lazy)
+                    try:
+                        expected = template.render(values)
+                    except PlaceholderNotFoundError:
+                        with self.assertRaises(PlaceholderNotFoundError):
+                            template.render(lazy)
+                        continue
+                    self.assertEqual(template.render(lazy), expected)
+
+    def test_convert_files(self):
+
+        output_dirs = [os.path.join(self.directory, 'lazy'),
+                       os.path.join(self.directory, 'complete')]
+        for output_dir, lazy in zip(output_dirs, [True, False]):
+            results = convert_files(['dax-data-set-descriptors'],
+                                    self.templates[0],
+                                    output_dir,
+                                    lazy=lazy)
+            for result in results:
+                self.assertIsNone(result.error)
+        for name in os.listdir(output_dirs[1]):
+            outputs = []
+            for output_dir in output_dirs:
+                with open(os.path.join(output_dir, name), 'r') as output:
+                    outputs.append(output.read())
+            self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,240 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.generate import get_builtin_template
+from metadata_converter.lint import DESCRIPTOR
+from metadata_converter.lint import format_problem
+from metadata_converter.lint import lint_files
+from metadata_converter.lint import LintCache
+from metadata_converter.lint import Linter
+from metadata_converter.lint import TEMPLATE
+from ruamel.yaml import YAML
+import os
+import shutil
+import tempfile
+import unittest
+
+yaml = YAML()
+
+#
+# Tests the linter (metadata_converter/lint.py)
+#
+
+
+def codes(problems):
+    return [(problem.line, problem.code) for problem in problems]
+
+
+class TestLinter(unittest.TestCase):
+
+    def setUp(self):
+
+        self.linter = Linter({'dlf': get_builtin_template('dlf')})
+
+    def test_clean_files(self):
+
+        self.assertEqual(self.linter.lint_text('t.yaml',
+                                               'a: "{{a}}"  # @optional\n'
+                                               'b:\n'
+                                               '  - "{{b.c}}"\n',
+                                               TEMPLATE),
+                         [])
+
+    def test_trailing_whitespace(self):
+
+        problems = self.linter.lint_text('t.yaml',
+                                         'a: x \nb: y\nc: z  \n',
+                                         TEMPLATE)
+        self.assertEqual(codes(problems),
+                         [(1, 'trailing-whitespace'),
+                          (3, 'trailing-whitespace')])
+        self.assertEqual(problems[0].column, 5)
+        self.assertEqual(format_problem(problems[0]),
+                         't.yaml:1:5: trailing-whitespace trailing whitespace')
+
+    def test_yaml_syntax(self):
+
+        problems = self.linter.lint_text('t.yaml',
+                                         'a: 1\nb: [2\nc: 3\n',
+                                         TEMPLATE)
+        self.assertEqual([problem.code for problem in problems],
+                         ['yaml-syntax'])
+        self.assertIsNotNone(problems[0].line)
+
+    def test_duplicate_keys(self):
+
+        # all duplicates are reported, including nested ones
+        problems = self.linter.lint_text('t.yaml',
+                                         'a: 1\n'
+                                         'b:\n'
+                                         '  c: 2\n'
+                                         '  c: 3\n'
+                                         'a: 4\n',
+                                         DESCRIPTOR)
+        self.assertEqual(codes(problems),
+                         [(4, 'duplicate-key'), (5, 'duplicate-key')])
+        self.assertIn('line 1', problems[1].message)
+
+    def test_unknown_annotations(self):
+
+        problems = self.linter.lint_text('t.yaml',
+                                         'a: "{{a}}"  # @optional\n'
+                                         'b: "{{b}}"  # @bogus @optional\n'
+                                         'c:\n'
+                                         '  d: "{{d}}"  # @other\n',
+                                         TEMPLATE)
+        self.assertEqual(codes(problems),
+                         [(2, 'unknown-annotation'),
+                          (4, 'unknown-annotation')])
+        self.assertIn('@bogus', problems[0].message)
+
+    def test_placeholders(self):
+
+        problems = self.linter.lint_text('t.yaml',
+                                         'a: "{{ a }}"\n'
+                                         'b: "{{b"\n'
+                                         'c: "{{c}} and {{d}}"\n'
+                                         'e: "{{e}}"\n',
+                                         TEMPLATE)
+        self.assertEqual(codes(problems),
+                         [(1, 'malformed-placeholder'),
+                          (2, 'malformed-placeholder')])
+
+    def test_descriptors(self):
+
+        problems = self.linter.lint_text('d.yaml',
+                                         'id: x\nversion: 1\n',
+                                         DESCRIPTOR)
+        self.assertEqual(sorted(problem.message.split('"')[1]
+                                for problem in problems),
+                         ['repository.mime_type', 'repository.url'])
+        self.assertEqual(set(problem.code for problem in problems),
+                         {'missing-placeholder'})
+        self.assertEqual(codes(self.linter.lint_text('d.yaml',
+                                                     '- a\n- b\n',
+                                                     DESCRIPTOR)),
+                         [(None, 'not-a-mapping')])
+        # without required templates, only the structure is checked
+        self.assertEqual(Linter().lint_text('d.yaml', 'id: x\n', DESCRIPTOR),
+                         [])
+
+    def test_settings(self):
+
+        self.assertNotEqual(Linter().settings, self.linter.settings)
+        self.assertEqual(Linter({'dlf': get_builtin_template('dlf')})
+                         .settings,
+                         self.linter.settings)
+
+
+class TestLintFiles(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.directory, 'cache.json')
+        self.clean = self.write('clean.yaml', 'a: "{{a}}"\n')
+        self.dirty = self.write('dirty.yaml', 'a: "{{a}}"  # @bogus\n')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+
+        file_name = os.path.join(self.directory, name)
+        with open(file_name, 'w') as output_file:
+            output_file.write(text)
+        return file_name
+
+    def test_lint_files(self):
+
+        for workers in [1, 2]:
+            linted, cached, problems = lint_files([self.directory],
+                                                  workers=workers,
+                                                  chunksize=1)
+            self.assertEqual((linted, cached), (2, 0))
+            self.assertEqual([(problem.file, problem.code)
+                              for problem in problems],
+                             [(self.dirty, 'unknown-annotation')])
+        _, _, problems = lint_files([os.path.join(self.directory,
+                                                  'missing.yaml')])
+        self.assertEqual([problem.code for problem in problems],
+                         ['read-error'])
+
+    def test_cache(self):
+
+        cache = LintCache(self.cache_file)
+        self.assertEqual(lint_files([self.directory], cache=cache)[:2],
+                         (2, 0))
+        cache.save()
+        # unchanged files are skipped, and their problems reported
+        cache = LintCache(self.cache_file)
+        linted, cached, problems = lint_files([self.directory], cache=cache)
+        self.assertEqual((linted, cached), (0, 2))
+        self.assertEqual([problem.code for problem in problems],
+                         ['unknown-annotation'])
+        # changed files are linted again
+        self.write('clean.yaml', 'a: "{{a}}" \n')
+        os.utime(self.clean, ns=(0, 0))
+        linted, cached, problems = lint_files([self.directory], cache=cache)
+        self.assertEqual((linted, cached), (1, 1))
+        self.assertEqual([problem.code for problem in problems],
+                         ['trailing-whitespace', 'unknown-annotation'])
+        # as are files that are linted with different settings, or
+        # as a different kind
+        self.assertEqual(lint_files([self.directory],
+                                    linter=Linter({'dlf':
+                                                   get_builtin_template(
+                                                       'dlf')}),
+                                    cache=cache)[:2],
+                         (2, 0))
+        self.assertEqual(lint_files(descriptors=[self.directory],
+                                    cache=cache)[:2],
+                         (2, 0))
+        # entries of deleted files are not saved
+        os.remove(self.dirty)
+        cache.save()
+        self.assertEqual(sorted(LintCache(self.cache_file).entries),
+                         ['descriptor:' + self.clean,
+                          'template:' + self.clean])
+
+    def test_corrupt_cache(self):
+
+        self.write('cache.json', '{')
+        cache = LintCache(self.cache_file)
+        self.assertEqual(cache.entries, {})
+
+
+class TestLintBuiltIn(unittest.TestCase):
+
+    def test_templates(self):
+
+        _, _, problems = lint_files(templates=['templates'], workers=2)
+        self.assertEqual([format_problem(problem) for problem in problems],
+                         [])
+
+    def test_descriptors(self):
+
+        linter = Linter({'dlf': get_builtin_template('dlf'),
+                         'oah': get_builtin_template('oah')})
+        _, _, problems = lint_files(descriptors=['dax-data-set-descriptors'],
+                                    linter=linter,
+                                    workers=2)
+        self.assertEqual([format_problem(problem) for problem in problems],
+                         [])
+
+
+if __name__ == '__main__':
+    unittest.main()
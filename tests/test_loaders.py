@@ -0,0 +1,109 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import replace
+from metadata_converter.generate import generate_dlf_yaml
+from metadata_converter.generate import generate_oah_yaml
+from metadata_converter.loaders import load_template
+from metadata_converter.loaders import load_values
+from pathlib import Path
+from ruamel.yaml import YAML
+from ruamel.yaml.comments import CommentedMap
+import glob
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+yaml = YAML()
+
+#
+# Tests template and placeholder values loaders
+# (metadata_converter/loaders.py)
+#
+
+
+class TestLoaders(unittest.TestCase):
+
+    def setUp(self):
+
+        self.descriptors = sorted(glob.glob('dax-data-set-descriptors/*.yaml'))
+        self.template_yamls = [load_template(template_file)
+                               for template_file
+                               in sorted(glob.glob('templates/*.yaml'))]
+
+    def test_load_template(self):
+
+        # comments are preserved
+        template_yamls = load_template('tests/templates/scalars.yaml')
+        self.assertIsInstance(template_yamls, CommentedMap)
+        self.assertTrue(len(template_yamls.ca.items) > 0)
+        with open('tests/templates/scalars.yaml', 'r') as template_file:
+            self.assertEqual(load_template(template_file), template_yamls)
+
+    def test_load_values(self):
+
+        for descriptor in self.descriptors:
+            fast = load_values(descriptor)
+            self.assertNotIsInstance(fast, CommentedMap)
+            round_trip = load_values(Path(descriptor), fast=False)
+            self.assertIsInstance(round_trip, CommentedMap)
+            self.assertEqual(fast, round_trip)
+            # the loader doesn't affect the output
+            for template_yamls in self.template_yamls:
+                self.assertEqual(replace(fast, template_yamls),
+                                 replace(round_trip, template_yamls))
+
+    def test_values_comments(self):
+
+        # comments in placeholder values that a placeholder copies to
+        # the output are only preserved by the round-trip loader
+        for descriptor in self.descriptors:
+            fast = generate_oah_yaml(load_values(descriptor))
+            round_trip = generate_oah_yaml(load_values(descriptor,
+                                                       fast=False))
+            self.assertIn('# REQUIRED; data set license information',
+                          round_trip)
+            self.assertNotIn('# REQUIRED; data set license information',
+                             fast)
+            self.assertEqual(yaml.load(fast), yaml.load(round_trip))
+            # DLF output doesn't copy values with comments
+            self.assertEqual(generate_dlf_yaml(load_values(descriptor)),
+                             generate_dlf_yaml(load_values(descriptor,
+                                                           fast=False)))
+
+    def test_load_json_values(self):
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            json_file = os.path.join(tmp_dir, 'values.json')
+            with open(json_file, 'w') as f:
+                json.dump({'id': 'an-id', 'version': '1.0'}, f)
+            self.assertEqual(load_values(json_file),
+                             {'id': 'an-id', 'version': '1.0'})
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_missing_file(self):
+
+        with self.assertRaises(FileNotFoundError):
+            load_values('missing.yaml')
+        with self.assertRaises(FileNotFoundError):
+            load_values('missing.json')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.apply import replace
+from metadata_converter.compiler import compile_template
+from metadata_converter.render_cache import values_hash
+from metadata_converter.stats import ConversionStats
+from ruamel.yaml import YAML
+import sys
+import unittest
+
+yaml = YAML()
+
+#
+# Tests templates that are nested deeper than the Python recursion
+# limit (metadata_converter/apply.py, metadata_converter/compiler.py)
+#
+
+VALUES = {'name': 'value', 'nested': {'id': 1}}
+
+
+def deep_template(depth):
+    # {'a': '{{name}}', 'list': ['{{nested.id}}', {'a': ..., 'list': ...}]}
+    root = {}
+    container = root
+    for level in range(depth):
+        container['a'] = '{{name}}'
+        child = {}
+        container['list'] = ['{{nested.id}}', child]
+        container = child
+    container['b'] = 'const'
+    return root
+
+
+def check_deep_output(test, output, depth):
+    # compare without recursion; assertEqual compares dicts recursively
+    container = output
+    for level in range(depth):
+        test.assertEqual(sorted(container.keys()), ['a', 'list'])
+        test.assertEqual(container['a'], 'value')
+        test.assertEqual(len(container['list']), 2)
+        test.assertEqual(container['list'][0], 1)
+        container = container['list'][1]
+    test.assertEqual(container, {'b': 'const'})
+
+
+class TestNesting(unittest.TestCase):
+
+    def setUp(self):
+
+        self.depth = 4 * sys.getrecursionlimit()
+
+    def test_deep_replace(self):
+
+        stats = ConversionStats()
+        output = replace(VALUES, deep_template(self.depth), stats=stats)
+        check_deep_output(self, output, self.depth)
+        # per level: 2 dict properties and 2 list items
+        self.assertEqual(stats.nodes_visited, 4 * self.depth + 1)
+        self.assertEqual(stats.placeholders_resolved, 2 * self.depth)
+
+    def test_deep_compiled(self):
+
+        compiled = compile_template(deep_template(self.depth))
+        check_deep_output(self, compiled.render(VALUES), self.depth)
+        self.assertEqual(compiled.node_count, 4 * self.depth + 1)
+
+    def test_deep_hash(self):
+
+        template = deep_template(self.depth)
+        self.assertEqual(values_hash(template), values_hash(template))
+
+    def test_deep_placeholder_not_found(self):
+
+        template = deep_template(self.depth)
+        with self.assertRaises(PlaceholderNotFoundError) as context:
+            replace({'name': 'value'}, template)
+        self.assertEqual(context.exception.placeholder, 'nested.id')
+        with self.assertRaises(PlaceholderNotFoundError):
+            compile_template(template).render({'name': 'value'})
+
+    def test_wide(self):
+
+        width = 10000
+        template = {'key_{}'.format(i): '{{name}}' if i % 2 else str(i)
+                    for i in range(width)}
+        template['list'] = ['{{name}}'] * width
+        output = replace(VALUES, template)
+        self.assertEqual(output, compile_template(template).render(VALUES))
+        self.assertEqual(len(output), width + 1)
+        self.assertEqual(output['key_1'], 'value')
+        self.assertEqual(output['list'], ['value'] * width)
+
+    def test_order(self):
+
+        # nested properties are processed in document order, so the
+        # first missing placeholder is reported
+        template = yaml.load('a:\n'
+                             '  b:\n'
+                             '  - c: "{{first}}"\n'
+                             'd: "{{second}}"\n')
+        for function in [lambda: replace({}, template),
+                         lambda: compile_template(template).render({})]:
+            with self.assertRaises(PlaceholderNotFoundError) as context:
+                function()
+            self.assertEqual(context.exception.placeholder, 'first')
+
+    def test_recursive_template(self):
+
+        template = yaml.load('a: &anchor\n'
+                             '  b: "{{name}}"\n'
+                             '  c: [x]\n')
+        template['a']['self'] = template['a']
+        with self.assertRaises(ValueError):
+            replace(VALUES, template)
+        with self.assertRaises(ValueError):
+            compile_template(template)
+        listed = ['{{name}}']
+        listed.append(listed)
+        with self.assertRaises(ValueError):
+            replace(VALUES, {'list': listed})
+
+    def test_shared_containers(self):
+
+        # aliases that do not create a cycle are processed normally
+        template = yaml.load('a: &anchor\n'
+                             '  b: "{{name}}"\n'
+                             'c: *anchor\n')
+        expected = {'a': {'b': 'value'}, 'c': {'b': 'value'}}
+        self.assertEqual(replace(VALUES, template), expected)
+        self.assertEqual(compile_template(template).render(VALUES), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.apply import replace
+from metadata_converter.compiler import compile_template
+from metadata_converter.generate import generate_dlf_yaml
+from metadata_converter.generate import generate_dlf_yaml_dict
+from metadata_converter.generate import generate_oah_yaml
+from metadata_converter.loaders import load_values
+from metadata_converter.render_cache import RenderCache
+from metadata_converter.render_cache import template_hash
+from metadata_converter.render_cache import values_hash
+from pathlib import Path
+from ruamel.yaml import YAML
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+yaml = YAML()
+
+#
+# Tests the render cache (metadata_converter/render_cache.py)
+#
+
+
+class TestHashes(unittest.TestCase):
+
+    def test_stable_values_hash(self):
+
+        text = Path('dax-data-set-descriptors/gmb.yaml').read_text()
+        # the same document, loaded twice
+        self.assertEqual(values_hash(load_values(io.StringIO(text))),
+                         values_hash(load_values(io.StringIO(text))))
+        self.assertEqual(values_hash({'a': 1, 'b': [1, 'x', None]}),
+                         values_hash({'a': 1, 'b': [1, 'x', None]}))
+
+    def test_values_hash_types(self):
+
+        # equal in Python, but rendered differently
+        documents = [{'a': 1}, {'a': 1.0}, {'a': True}, {'a': '1'},
+                     {'a': [1]}, {'a': None}, {'a': ''}, {'a': {}},
+                     {1: 1}, {'a': 1, 'b': 2}, {'b': 2, 'a': 1},
+                     {'a': 'b', 'c': ''}, {'a': '', 'bc': ''}]
+        hashes = set(values_hash(document) for document in documents)
+        self.assertEqual(len(hashes), len(documents))
+
+    def test_comments(self):
+
+        # comments of round-trip documents are emitted by dumps,
+        # and template comments contain annotations
+        first = yaml.load('a: 1  # first\n')
+        second = yaml.load('a: 1  # second\n')
+        self.assertNotEqual(values_hash(first), values_hash(second))
+        self.assertEqual(values_hash(first),
+                         values_hash(yaml.load('a: 1  # first\n')))
+        self.assertNotEqual(values_hash(first), values_hash({'a': 1}))
+
+    def test_recursive_values(self):
+
+        values = {'a': 1}
+        values['self'] = values
+        self.assertEqual(values_hash(values), values_hash(values))
+
+    def test_template_hash(self):
+
+        template_dict = yaml.load(Path('tests/templates/scalars.yaml'))
+        compiled = compile_template(template_dict)
+        self.assertEqual(template_hash(compiled),
+                         template_hash(compile_template(template_dict)))
+        self.assertEqual(template_hash(template_dict),
+                         values_hash(template_dict))
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.in_yamls = load_values('tests/inputs/scalars.yaml')
+        self.template_yamls = yaml.load(
+                                Path('tests/templates/scalars.yaml'))
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_replace(self):
+
+        cache = RenderCache(self.cache_dir)
+        expected = replace(self.in_yamls, self.template_yamls)
+        self.assertEqual(replace(self.in_yamls,
+                                 self.template_yamls,
+                                 cache=cache),
+                         expected)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 1, 1))
+        result = replace(self.in_yamls, self.template_yamls, cache=cache)
+        self.assertEqual(result, expected)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # cached results are copies
+        result['added'] = 1
+        self.assertEqual(replace(self.in_yamls,
+                                 self.template_yamls,
+                                 cache=cache),
+                         expected)
+
+    def test_changed_values(self):
+
+        cache = RenderCache(self.cache_dir)
+        replace(self.in_yamls, self.template_yamls, cache=cache)
+        changed = dict(self.in_yamls)
+        changed['name'] = 'changed'
+        self.assertEqual(replace(changed, self.template_yamls, cache=cache),
+                         replace(changed, self.template_yamls))
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 2, 2))
+
+    def test_errors_are_not_cached(self):
+
+        cache = RenderCache(self.cache_dir)
+        with self.assertRaises(PlaceholderNotFoundError):
+            replace({}, self.template_yamls, cache=cache)
+        self.assertEqual(len(cache), 0)
+
+    def test_generate(self):
+
+        cache = RenderCache(self.cache_dir)
+        in_yamls = load_values('dax-data-set-descriptors/gmb.yaml')
+        for _ in range(2):
+            self.assertEqual(generate_dlf_yaml(in_yamls, cache=cache),
+                             generate_dlf_yaml(in_yamls))
+            self.assertEqual(generate_dlf_yaml_dict(in_yamls, cache=cache),
+                             generate_dlf_yaml_dict(in_yamls))
+            self.assertEqual(generate_oah_yaml(in_yamls, cache=cache),
+                             generate_oah_yaml(in_yamls))
+        # YAML files and dicts are stored separately
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (3, 3, 3))
+
+    def test_persistence(self):
+
+        cache = RenderCache(self.cache_dir)
+        expected = replace(self.in_yamls, self.template_yamls, cache=cache)
+        cache = RenderCache(self.cache_dir)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(replace(self.in_yamls,
+                                 self.template_yamls,
+                                 cache=cache),
+                         expected)
+        self.assertEqual(cache.hits, 1)
+
+    def test_lru_eviction(self):
+
+        cache = RenderCache(self.cache_dir, max_entries=2)
+        for key in ['a', 'b']:
+            cache.put(key, key)
+        # 'a' becomes the most recently used entry
+        self.assertEqual(cache.get('a'), 'a')
+        cache.put('c', 'c')
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'a')
+        self.assertEqual(cache.get('c'), 'c')
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_size_limit(self):
+
+        cache = RenderCache(self.cache_dir, max_bytes=1000)
+        for key in range(10):
+            cache.put(str(key), 'x' * 200)
+        self.assertLessEqual(cache.size, 1000)
+        self.assertEqual(cache.get('9'), 'x' * 200)
+        self.assertIsNone(cache.get('0'))
+        # too large to be stored
+        cache.put('large', 'x' * 2000)
+        self.assertIsNone(cache.get('large'))
+        self.assertEqual(cache.get('9'), 'x' * 200)
+
+    def test_limits_on_open(self):
+
+        cache = RenderCache(self.cache_dir)
+        for key in range(5):
+            cache.put(str(key), key)
+        cache = RenderCache(self.cache_dir, max_entries=3)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 3)
+
+    def test_corrupt_entry(self):
+
+        cache = RenderCache(self.cache_dir)
+        cache.put('a', 'a')
+        with open(cache.entry_path('a'), 'wb') as entry_file:
+            entry_file.write(b'not a pickle')
+        self.assertEqual(cache.get('a', 'default'), 'default')
+        self.assertEqual(len(cache), 0)
+        self.assertFalse(os.path.exists(cache.entry_path('a')))
+
+    def test_clear(self):
+
+        cache = RenderCache(self.cache_dir)
+        cache.put('a', 'a')
+        cache.clear()
+        self.assertEqual((len(cache), cache.size), (0, 0))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_invalid_limits(self):
+
+        with self.assertRaises(ValueError):
+            RenderCache(self.cache_dir, max_bytes=0)
+        with self.assertRaises(ValueError):
+            RenderCache(self.cache_dir, max_entries=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
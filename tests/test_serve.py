@@ -0,0 +1,244 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.generate import generate_dlf_yaml
+from metadata_converter.generate import generate_oah_yaml
+from metadata_converter.generate import generate_oah_yaml_dict
+from metadata_converter.loaders import load_values
+from metadata_converter.loaders import values_yaml
+from metadata_converter.serve import ConversionService
+from metadata_converter.serve import make_server
+from pathlib import Path
+from ruamel.yaml import YAML
+import glob
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+yaml = YAML()
+
+#
+# Tests the conversion server (metadata_converter/serve.py)
+#
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, socket_path):
+        super().__init__('localhost')
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+class TestServe(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.service = ConversionService()
+        cls.service.register('annotations', 'tests/templates/dicts.yaml')
+        cls.server = make_server(cls.service, port=0, max_body_size=65536)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+
+    def setUp(self):
+
+        self.descriptors = sorted(glob.glob('dax-data-set-descriptors/*.yaml'))
+        # one connection is reused for all requests of a test
+        self.connection = http.client.HTTPConnection(
+                                *self.server.server_address[:2])
+
+    def tearDown(self):
+
+        self.connection.close()
+
+    def request(self, method, path, body=None, content_type=None):
+
+        headers = {}
+        if content_type is not None:
+            headers['Content-Type'] = content_type
+        if body is not None:
+            body = body.encode('utf-8')
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        return response.status, response.read().decode('utf-8')
+
+    def test_convert(self):
+
+        for descriptor in self.descriptors:
+            text = Path(descriptor).read_text()
+            # the server loads descriptors using the safe loader, which
+            # does not preserve comments
+            in_yamls = load_values(descriptor)
+            status, body = self.request('POST', '/convert/dlf', text)
+            self.assertEqual(status, 200)
+            self.assertEqual(body, generate_dlf_yaml(in_yamls))
+            status, body = self.request('POST', '/convert/oah', text)
+            self.assertEqual(status, 200)
+            self.assertEqual(body, generate_oah_yaml(in_yamls))
+
+            # JSON in and out
+            status, body = self.request('POST', '/convert/oah?format=json',
+                                        json.dumps(in_yamls, default=str),
+                                        'application/json')
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body),
+                             json.loads(json.dumps(
+                                 generate_oah_yaml_dict(in_yamls),
+                                 default=str)))
+
+    def test_batch(self):
+
+        texts = [Path(descriptor).read_text()
+                 for descriptor in self.descriptors]
+        stream = '---\n'.join(texts) + '---\n{}\n'
+        status, body = self.request('POST', '/batch/dlf', stream)
+        self.assertEqual(status, 200)
+        results = json.loads(body)['results']
+        self.assertEqual(len(results), len(texts) + 1)
+        for text, result in zip(texts, results):
+            self.assertEqual(result['output'],
+                             generate_dlf_yaml(values_yaml.load(text)))
+        # a failed document does not affect the others
+        self.assertEqual(results[-1]['placeholder'], 'id')
+
+        # a document with a scalar where a mapping is expected
+        invalid = texts[0].replace('repository:', 'repository: oops\nx:', 1)
+        status, body = self.request('POST', '/batch/dlf',
+                                    invalid + '---\n' + texts[1])
+        self.assertEqual(status, 200)
+        results = json.loads(body)['results']
+        self.assertIn('error', results[0])
+        self.assertEqual(results[1]['output'],
+                         generate_dlf_yaml(values_yaml.load(texts[1])))
+        status, body = self.request('POST', '/convert/dlf', invalid)
+        self.assertEqual(status, 422)
+
+        jsonl = ''.join(json.dumps(yaml.load(text), default=str) + '\n'
+                        for text in texts)
+        status, body = self.request('POST', '/batch/dlf?format=json',
+                                    jsonl, 'application/x-ndjson')
+        self.assertEqual(status, 200)
+        self.assertEqual(len(json.loads(body)['results']), len(texts))
+
+    def test_templates(self):
+
+        status, body = self.request('GET', '/health')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['status'], 'ok')
+
+        template = 'name: \'{{name}}\'\nmissing: \'{{x.y}}\'  # @optional\n'
+        status, body = self.request('POST', '/templates/custom', template)
+        self.assertEqual(status, 200)
+        self.assertIn('custom', self.service.template_names())
+        status, body = self.request('POST', '/convert/custom',
+                                    '{"name": "value"}', 'application/json')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, 'name: value\nmissing:\n')
+
+        status, body = self.request('GET', '/templates')
+        self.assertEqual(json.loads(body),
+                         ['annotations', 'custom', 'dlf', 'oah'])
+
+    def test_errors(self):
+
+        status, body = self.request('POST', '/convert/none', 'a: b')
+        self.assertEqual(status, 404)
+        status, body = self.request('GET', '/convert/dlf')
+        self.assertEqual(status, 404)
+        status, body = self.request('POST', '/convert/dlf', 'a: b')
+        self.assertEqual(status, 422)
+        self.assertEqual(json.loads(body)['placeholder'], 'id')
+        status, body = self.request('POST', '/convert/dlf', '[1, 2]')
+        self.assertEqual(status, 400)
+        status, body = self.request('POST', '/convert/dlf', 'a: [')
+        self.assertEqual(status, 400)
+        status, body = self.request('POST', '/convert/dlf?format=xml', 'a: b')
+        self.assertEqual(status, 400)
+        status, body = self.request('POST', '/templates/bad', 'a: 1')
+        self.assertEqual(status, 400)
+        # the connection is still usable after errors
+        status, body = self.request('GET', '/health')
+        self.assertEqual(status, 200)
+
+        status, body = self.request('POST', '/convert/dlf', 'a' * 70000)
+        self.assertEqual(status, 413)
+
+    def test_invalid_content_length(self):
+
+        for length in ['abc', '-1']:
+            connection = http.client.HTTPConnection(
+                                *self.server.server_address[:2], timeout=10)
+            try:
+                connection.putrequest('POST', '/convert/dlf')
+                connection.putheader('Content-Length', length)
+                connection.endheaders(b'a: b')
+                response = connection.getresponse()
+                self.assertEqual(response.status, 400, length)
+                self.assertIn('Content-Length',
+                              json.loads(response.read())['error'])
+            finally:
+                connection.close()
+
+    def test_metrics(self):
+
+        text = Path(self.descriptors[0]).read_text()
+        for i in range(10):
+            self.request('POST', '/convert/oah', text)
+        status, body = self.request('GET', '/metrics')
+        self.assertEqual(status, 200)
+        metrics = json.loads(body)['endpoints']['POST /convert']
+        self.assertGreaterEqual(metrics['count'], 10)
+        self.assertGreater(metrics['p50_us'], 0)
+        self.assertLessEqual(metrics['p50_us'], metrics['p99_us'])
+        self.assertLessEqual(metrics['p99_us'], metrics['max_us'])
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires Unix sockets')
+    def test_unix_socket(self):
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            socket_path = os.path.join(tmp_dir, 'converter.sock')
+            server = make_server(self.service, socket_path=socket_path)
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                connection = UnixHTTPConnection(socket_path)
+                connection.request('GET', '/health')
+                response = connection.getresponse()
+                self.assertEqual(response.status, 200)
+                response.read()
+                connection.close()
+            finally:
+                server.shutdown()
+                server.server_close()
+                thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
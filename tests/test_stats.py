@@ -0,0 +1,92 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import replace
+from metadata_converter.compiler import compile_template
+from metadata_converter.generate import generate_dlf_yaml
+from metadata_converter.generate import generate_oah_yaml_dict
+from metadata_converter.stats import ConversionStats
+from pathlib import Path
+from ruamel.yaml import YAML
+import unittest
+
+yaml = YAML()
+
+#
+# Tests conversion statistics (metadata_converter/stats.py)
+#
+
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+
+        self.in_yamls = yaml.load(Path('tests/inputs/annotations.yaml'))
+        self.template_yamls = \
+            list(yaml.load_all(Path('tests/templates/annotations.yaml')))[0]
+
+    def test_replace(self):
+
+        stats = ConversionStats()
+        replace(self.in_yamls, self.template_yamls, stats=stats)
+        # the template references {{hey.we_are_a_match}} twice; all
+        # other placeholders are @optional and not defined
+        self.assertEqual(stats.placeholders_resolved, 2)
+        self.assertEqual(stats.optional_dropped, 12)
+        self.assertEqual(stats.nodes_visited, 24)
+        self.assertIn('metadata', stats.timings)
+        self.assertIn('resolve', stats.timings)
+
+        # values accumulate across calls
+        replace(self.in_yamls, self.template_yamls, stats=stats)
+        self.assertEqual(stats.placeholders_resolved, 4)
+        stats.reset()
+        self.assertEqual(stats.as_dict()['placeholders_resolved'], 0)
+
+    def test_compiled_template(self):
+
+        # compiled templates report the same counters as replace()
+        expected = ConversionStats()
+        replace(self.in_yamls, self.template_yamls, stats=expected)
+
+        stats = ConversionStats()
+        compile_template(self.template_yamls).render(self.in_yamls,
+                                                     stats=stats)
+        self.assertEqual(stats.nodes_visited, expected.nodes_visited)
+        self.assertEqual(stats.placeholders_resolved,
+                         expected.placeholders_resolved)
+        self.assertEqual(stats.optional_dropped, expected.optional_dropped)
+        self.assertEqual(list(stats.timings.keys()), ['render'])
+
+    def test_generate(self):
+
+        in_yamls = yaml.load(Path('dax-data-set-descriptors/gmb.yaml'))
+
+        stats = ConversionStats()
+        dlf_yaml = generate_dlf_yaml(in_yamls, stats=stats)
+        self.assertEqual(stats.bytes_emitted, len(dlf_yaml.encode('utf-8')))
+        self.assertEqual(stats.placeholders_resolved, 4)
+        self.assertEqual(sorted(stats.timings.keys()),
+                         ['dump', 'load_template', 'render'])
+
+        stats = ConversionStats()
+        generate_oah_yaml_dict(in_yamls, stats=stats)
+        self.assertEqual(stats.bytes_emitted, 0)
+        self.assertEqual(stats.placeholders_resolved, 16)
+        self.assertNotIn('dump', stats.timings)
+
+
+if __name__ == '__main__':
+    unittest.main()
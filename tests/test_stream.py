@@ -0,0 +1,140 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.apply import replace
+from metadata_converter.stream import iter_documents
+from metadata_converter.stream import render_stream
+from pathlib import Path
+from ruamel.yaml import YAML
+import glob
+import io
+import json
+import subprocess
+import sys
+import unittest
+
+yaml = YAML()
+
+#
+# Tests multi-document stream processing (metadata_converter/stream.py)
+#
+
+
+class TestStream(unittest.TestCase):
+
+    def setUp(self):
+
+        self.template_file = 'templates/dlf_out.yaml'
+        self.template_yamls = yaml.load(Path(self.template_file))
+        self.descriptors = sorted(glob.glob('dax-data-set-descriptors/*.yaml'))
+        self.in_yamls = [yaml.load(Path(descriptor))
+                         for descriptor in self.descriptors]
+        self.expected = [replace(in_yaml, self.template_yamls)
+                         for in_yaml in self.in_yamls]
+
+    def yaml_stream(self):
+
+        buf = io.StringIO()
+        yaml.dump_all(self.in_yamls, buf)
+        buf.seek(0)
+        return buf
+
+    def jsonl_stream(self):
+
+        return io.StringIO(''.join(json.dumps(in_yaml, default=str) + '\n'
+                                   for in_yaml in self.in_yamls))
+
+    def test_yaml_stream(self):
+
+        out_stream = io.StringIO()
+        count = render_stream(self.template_file,
+                              self.yaml_stream(),
+                              out_stream)
+        self.assertEqual(count, len(self.descriptors))
+        self.assertEqual(list(yaml.load_all(out_stream.getvalue())),
+                         self.expected)
+
+    def test_jsonl_stream(self):
+
+        out_stream = io.StringIO()
+        count = render_stream(self.template_file,
+                              self.jsonl_stream(),
+                              out_stream,
+                              input_format='jsonl')
+        self.assertEqual(count, len(self.descriptors))
+        lines = out_stream.getvalue().splitlines()
+        self.assertEqual(len(lines), len(self.descriptors))
+        self.assertEqual([json.loads(line) for line in lines],
+                         self.expected)
+
+    def test_format_conversion(self):
+
+        out_stream = io.StringIO()
+        render_stream(self.template_file,
+                      self.yaml_stream(),
+                      out_stream,
+                      output_format='jsonl')
+        self.assertEqual([json.loads(line)
+                          for line in out_stream.getvalue().splitlines()],
+                         self.expected)
+
+    def test_lazy_input(self):
+
+        # documents are read one at a time; the second document
+        # is not parsed until it is requested
+        in_stream = io.StringIO('a: 1\n---\nb: [\n')
+        documents = iter_documents(in_stream)
+        self.assertEqual(next(documents), {'a': 1})
+        with self.assertRaises(Exception):
+            next(documents)
+
+    def test_errors(self):
+
+        with self.assertRaises(PlaceholderNotFoundError):
+            render_stream(self.template_file,
+                          io.StringIO('{"id": "a"}\n'),
+                          io.StringIO(),
+                          input_format='jsonl')
+
+        with self.assertRaises(ValueError):
+            render_stream(self.template_file,
+                          self.yaml_stream(),
+                          io.StringIO(),
+                          input_format='csv')
+
+    def test_cli_parse_errors(self):
+
+        # invalid documents are reported with their number
+        streams = [('yaml', self.yaml_stream().getvalue() + '---\nid: [\n'),
+                   ('jsonl', self.jsonl_stream().getvalue() + '{bad\n')]
+        for input_format, text in streams:
+            process = subprocess.run([sys.executable,
+                                      'metadata_converter/apply.py',
+                                      '--stream',
+                                      '--input-format', input_format,
+                                      '-', self.template_file],
+                                     input=text,
+                                     capture_output=True,
+                                     universal_newlines=True)
+            self.assertEqual(process.returncode, 1)
+            self.assertIn('Error parsing document {}'
+                          .format(len(self.in_yamls) + 1),
+                          process.stderr)
+            self.assertNotIn('Traceback', process.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from concurrent.futures import ThreadPoolExecutor
+from metadata_converter.generate import generate_dlf_yaml
+from metadata_converter.generate import generate_dlf_yaml_dict
+from metadata_converter.generate import generate_oah_yaml
+from metadata_converter.generate import invalidate_template_cache
+from metadata_converter.generate import write_oah_yaml
+from metadata_converter.loaders import load_values
+from metadata_converter.loaders import ThreadLocalYAML
+import glob
+import io
+import threading
+import unittest
+
+#
+# Tests concurrent conversions in multiple threads
+#
+
+THREADS = 16
+ROUNDS = 8
+
+
+class TestThreads(unittest.TestCase):
+
+    def setUp(self):
+
+        self.descriptors = sorted(glob.glob('dax-data-set-descriptors/*.yaml'))
+
+    def test_thread_local_yaml(self):
+
+        yaml = ThreadLocalYAML(indent=dict(mapping=2, sequence=4, offset=2),
+                               explicit_start=True)
+        instances = []
+
+        def get_instance():
+            instances.append(yaml.instance)
+
+        threads = [threading.Thread(target=get_instance) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        get_instance()
+        self.assertEqual(len(set(id(i) for i in instances)), 5)
+        # every instance has the same settings
+        for instance in instances:
+            self.assertTrue(instance.explicit_start)
+            self.assertEqual(instance.sequence_dash_offset, 2)
+
+    def test_generate(self):
+
+        # all threads load, render and dump at the same time
+        invalidate_template_cache()
+        expected = {}
+        for descriptor in self.descriptors:
+            in_yamls = load_values(descriptor)
+            expected[descriptor] = (generate_dlf_yaml(in_yamls),
+                                    generate_oah_yaml(in_yamls),
+                                    generate_dlf_yaml_dict(in_yamls))
+        invalidate_template_cache()
+        barrier = threading.Barrier(THREADS)
+
+        def convert(thread_number):
+            barrier.wait()
+            results = []
+            for round in range(ROUNDS):
+                descriptor = self.descriptors[(thread_number + round) %
+                                              len(self.descriptors)]
+                in_yamls = load_values(descriptor)
+                buf = io.StringIO()
+                write_oah_yaml(in_yamls, buf)
+                results.append((descriptor,
+                                generate_dlf_yaml(in_yamls),
+                                generate_oah_yaml(in_yamls),
+                                generate_dlf_yaml_dict(in_yamls),
+                                buf.getvalue()))
+            return results
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            futures = [executor.submit(convert, thread_number)
+                       for thread_number in range(THREADS)]
+            for future in futures:
+                for descriptor, dlf_yaml, oah_yaml, dlf_dict, oah_stream \
+                        in future.result():
+                    self.assertEqual((dlf_yaml, oah_yaml, dlf_dict),
+                                     expected[descriptor])
+                    self.assertEqual(oah_stream, oah_yaml)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+#
+# Copyright 2020 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from metadata_converter.apply import PlaceholderNotFoundError
+from metadata_converter.compiler import compile_template
+from metadata_converter.generate import get_builtin_template
+from metadata_converter.loaders import load_values
+from metadata_converter.validate import Requirements
+from metadata_converter.validate import validate_files
+from metadata_converter.validate import validation_report
+from metadata_converter.validate import Validator
+from ruamel.yaml import YAML
+import glob
+import json
+import unittest
+
+yaml = YAML()
+
+#
+# Tests bulk validation (metadata_converter/validate.py)
+#
+
+TEMPLATE = """
+name: '{{name}}'
+url: '{{repository.url}}'
+format: '{{repository.mime_type}}'
+tags: '{{tags}}'  # @optional
+spec:
+  label: '{{name}}'  # @optional
+  owner: '{{owner.email}}'  # @optional
+"""
+
+
+class TestValidate(unittest.TestCase):
+
+    def setUp(self):
+
+        self.template = compile_template(yaml.load(TEMPLATE))
+        self.validator = Validator({'t': self.template})
+        self.descriptors = sorted(glob.glob('dax-data-set-descriptors/*.yaml'))
+
+    def test_requirements(self):
+
+        requirements = Requirements(self.template)
+        # {{name}} is optional in one place only
+        self.assertEqual(requirements.required,
+                         {'name', 'repository.url', 'repository.mime_type'})
+        self.assertEqual(requirements.optional, {'tags', 'owner.email'})
+        self.assertEqual(requirements.paths['repository.url'],
+                         ('repository', 'url'))
+
+    def test_check(self):
+
+        missing, missing_optional = self.validator.check({
+            'repository': {'url': 'http://example.com', 'mime_type': None},
+            'owner': 'not a dict'
+        })
+        # every missing path is reported
+        self.assertEqual(missing, {'t': ['name', 'repository.mime_type']})
+        self.assertEqual(missing_optional, {'t': ['owner.email', 'tags']})
+        missing, missing_optional = self.validator.check({
+            'name': 'n',
+            'repository': {'url': 'u', 'mime_type': 'm'},
+            'tags': ['a']
+        })
+        self.assertEqual(missing, {'t': []})
+        self.assertEqual(missing_optional, {'t': ['owner.email']})
+        with self.assertRaises(ValueError):
+            self.validator.check([])
+
+    def test_agrees_with_rendering(self):
+
+        validator = Validator({'dlf': get_builtin_template('dlf'),
+                               'oah': get_builtin_template('oah')})
+        for descriptor in self.descriptors + ['tests/inputs/scalars.yaml']:
+            values = load_values(descriptor)
+            missing, _ = validator.check(values)
+            for name in ['dlf', 'oah']:
+                try:
+                    get_builtin_template(name).render(values)
+                    self.assertEqual(missing[name], [])
+                except PlaceholderNotFoundError as pnfe:
+                    self.assertIn(pnfe.placeholder, missing[name])
+
+    def test_validate_files(self):
+
+        templates = {'dlf': get_builtin_template('dlf'), 't': self.template}
+        for workers in [1, 2]:
+            validator, results = validate_files(
+                                    ['dax-data-set-descriptors',
+                                     'tests/inputs/scalars.yaml',
+                                     'missing.yaml'],
+                                    templates,
+                                    workers=workers,
+                                    chunksize=3)
+            self.assertEqual([result.input for result in results],
+                             self.descriptors +
+                             ['tests/inputs/scalars.yaml', 'missing.yaml'])
+            for result in results[:-2]:
+                self.assertIsNone(result.error)
+                self.assertEqual(result.missing['dlf'], [])
+            self.assertEqual(results[-2].missing['dlf'],
+                             ['id', 'repository.mime_type',
+                              'repository.url', 'version'])
+            self.assertIsNotNone(results[-1].error)
+
+    def test_report(self):
+
+        validator, results = validate_files(['dax-data-set-descriptors',
+                                             'tests/inputs/scalars.yaml',
+                                             'missing.yaml'],
+                                            {'dlf':
+                                             get_builtin_template('dlf')})
+        report = json.loads(json.dumps(validation_report(validator,
+                                                         results)))
+        self.assertEqual(report['summary'],
+                         {'inputs': len(self.descriptors) + 2,
+                          'valid': len(self.descriptors),
+                          'invalid': 1,
+                          'errors': 1})
+        self.assertEqual(report['templates']['dlf']['required'],
+                         ['id', 'repository.mime_type',
+                          'repository.url', 'version'])
+        entry = report['files'][-2]
+        self.assertEqual(entry['input'], 'tests/inputs/scalars.yaml')
+        self.assertFalse(entry['valid'])
+        self.assertEqual(len(entry['missing']['dlf']), 4)
+        self.assertIsNotNone(report['files'][-1]['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()